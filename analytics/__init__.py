@@ -0,0 +1,70 @@
+"""Batch analytics over journey events."""
+from config import settings
+from database import db
+from .anomaly import SegmentBaselines, compute_baselines, score_journeys
+from .cache import AnalyticsCache, AnalyticsSnapshot
+from .engine import CarrierStats, JourneyArrays, compute_carrier_stats, grouped_stats, grouped_histogram
+from .events import EventArrays
+from .forecast import BorderForecast, histogram_quantiles
+from .live import LiveBorderEstimator
+from .segments import SegmentMatrix, SegmentPairs, compute_segment_matrix, segment_pairs
+from .status import BorderStatus, BorderStatusCache
+
+# Global analytics cache
+analytics_cache = AnalyticsCache(
+    db,
+    window_days=settings.analytics_window_days,
+    ttl=settings.analytics_cache_ttl
+)
+
+# Global live estimate, fed by the event journal
+live_border = LiveBorderEstimator(
+    db,
+    stale_hours=settings.live_stale_hours,
+    recent_hours=settings.live_recent_hours
+)
+
+# Global hour-of-week forecast, updated by every completed journey
+forecast = BorderForecast(
+    db,
+    path=settings.forecast_path,
+    window_days=settings.forecast_window_days,
+    min_samples=settings.forecast_min_samples,
+    save_interval=settings.forecast_save_interval
+)
+
+# Global border status, refreshed in the background for inline mode and the board
+border_status = BorderStatusCache(
+    db,
+    live_border,
+    analytics_cache,
+    interval=settings.status_refresh_interval,
+    trend_minutes=settings.status_trend_minutes
+)
+
+__all__ = [
+    "AnalyticsCache",
+    "AnalyticsSnapshot",
+    "BorderForecast",
+    "BorderStatus",
+    "BorderStatusCache",
+    "CarrierStats",
+    "EventArrays",
+    "JourneyArrays",
+    "LiveBorderEstimator",
+    "SegmentBaselines",
+    "SegmentMatrix",
+    "SegmentPairs",
+    "analytics_cache",
+    "border_status",
+    "compute_baselines",
+    "compute_carrier_stats",
+    "compute_segment_matrix",
+    "forecast",
+    "grouped_histogram",
+    "grouped_stats",
+    "histogram_quantiles",
+    "live_border",
+    "score_journeys",
+    "segment_pairs"
+]
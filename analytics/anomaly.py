@@ -0,0 +1,82 @@
+"""Robust anomaly scoring of journey segment durations (median / MAD)."""
+from dataclasses import dataclass
+from typing import List, Tuple
+
+import numpy as np
+
+from database import JourneyEvent
+from .segments import SegmentPairs
+from .stats import grouped_quantiles
+
+# Scales MAD to a standard deviation for normally distributed data
+MAD_SCALE = 1.4826
+# Floor for the scaled MAD, seconds: a segment that always takes the same
+# time must not make a one-minute deviation an outlier
+MIN_SPREAD_SECONDS = 120.0
+
+
+@dataclass
+class SegmentBaselines:
+    """Median and scaled MAD of each segment's duration."""
+
+    segments: List[Tuple[str, str]]  # (from checkpoint name, to checkpoint name)
+    median: np.ndarray
+    spread: np.ndarray  # MAD * MAD_SCALE, at least MIN_SPREAD_SECONDS
+    count: np.ndarray
+
+    def z_scores(self, segment: np.ndarray, duration: np.ndarray, min_samples: int) -> np.ndarray:
+        """
+        Robust z-score of each duration against its segment's baseline.
+
+        Negative durations (checkpoints recorded out of order) score inf;
+        segments with fewer than `min_samples` samples score 0.
+        """
+        scores = np.abs(duration - self.median[segment]) / self.spread[segment]
+        scores = np.where(self.count[segment] >= min_samples, scores, 0.0)
+        return np.where(duration < 0, np.inf, scores)
+
+    def score_events(self, events: List[JourneyEvent], min_samples: int) -> float:
+        """
+        Highest segment z-score of one journey.
+
+        Args:
+            events: Journey events (DataLoader.journey_events)
+        """
+        times = {event.checkpoint_name: event.timestamp_utc for event in events}
+
+        segment, duration = [], []
+        for i, (start, end) in enumerate(self.segments):
+            if start in times and end in times:
+                segment.append(i)
+                duration.append((times[end] - times[start]).total_seconds())
+        if not segment:
+            return 0.0
+        return float(self.z_scores(np.array(segment), np.array(duration), min_samples).max())
+
+
+def compute_baselines(pairs: SegmentPairs) -> SegmentBaselines:
+    """Per-segment median and MAD over all in-order traversals."""
+    n_segments = len(pairs.segments)
+    valid = pairs.duration >= 0
+    segment = pairs.segment[valid]
+    duration = pairs.duration[valid]
+
+    counts, (median,) = grouped_quantiles(segment, duration, n_segments, (0.5,))
+    median = np.nan_to_num(median)
+    _, (mad,) = grouped_quantiles(segment, np.abs(duration - median[segment]), n_segments, (0.5,))
+    spread = np.maximum(np.nan_to_num(mad) * MAD_SCALE, MIN_SPREAD_SECONDS)
+
+    return SegmentBaselines(segments=pairs.segments, median=median, spread=spread, count=counts)
+
+
+def score_journeys(pairs: SegmentPairs, baselines: SegmentBaselines, n_journeys: int, min_samples: int) -> np.ndarray:
+    """
+    Highest segment z-score per journey code (0 for journeys without segments).
+
+    Returns:
+        Array of shape (n_journeys,)
+    """
+    scores = np.zeros(n_journeys)
+    z = baselines.z_scores(pairs.segment, pairs.duration, min_samples)
+    np.maximum.at(scores, pairs.journey, z)
+    return scores
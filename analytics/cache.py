@@ -0,0 +1,116 @@
+"""Cached analytics snapshot over a sliding window of completed journeys."""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+import pytz
+
+from utils import now_utc
+from .anomaly import SegmentBaselines, compute_baselines
+from .engine import CarrierStats, JourneyArrays, compute_carrier_stats
+from .events import EventArrays
+from .segments import SegmentMatrix, compute_segment_matrix, segment_pairs, LOCAL_TIMEZONE
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class AnalyticsSnapshot:
+    """
+    Everything computed from one load of the analytics window.
+
+    Statistics skip journeys flagged anomalous; anomaly baselines use all
+    journeys (median and MAD are robust to the outliers themselves).
+    """
+
+    events: EventArrays  # not anomalous
+    journeys: JourneyArrays
+    carriers: CarrierStats
+    segments: SegmentMatrix
+    baselines: SegmentBaselines
+    computed_at: datetime
+
+
+class AnalyticsCache:
+    """
+    Analytics snapshot recomputed at most once per `ttl` seconds.
+
+    A stale snapshot keeps being served while a single background refresh
+    runs; only the very first caller has to wait. The NumPy work runs in a
+    worker thread.
+    """
+
+    def __init__(self, database, window_days: int = 90, ttl: float = 900.0):
+        self.database = database
+        self.window_days = window_days
+        self.ttl = ttl
+        self._snapshot: Optional[AnalyticsSnapshot] = None
+        self._computed_monotonic = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def peek(self) -> Optional[AnalyticsSnapshot]:
+        """Last computed snapshot, without triggering a refresh."""
+        return self._snapshot
+
+    async def snapshot(self, wait: bool = True) -> Optional[AnalyticsSnapshot]:
+        """
+        Current snapshot, refreshing it in the background when stale.
+
+        Args:
+            wait: If nothing has been computed yet, wait for the first
+                refresh (True) or return None right away (False)
+        """
+        stale = time.monotonic() - self._computed_monotonic >= self.ttl
+        if (self._snapshot is None or stale) and self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._refresh())
+        if self._snapshot is None and wait and self._refresh_task is not None:
+            error = await asyncio.shield(self._refresh_task)
+            if self._snapshot is None and error is not None:
+                raise error
+        return self._snapshot
+
+    def invalidate(self) -> None:
+        """Treat the snapshot as stale: the next use starts a refresh (and still gets the old one meanwhile)."""
+        self._computed_monotonic = 0.0
+
+    async def _refresh(self) -> Optional[Exception]:
+        """Recompute the snapshot; failures are logged and returned, not raised."""
+        try:
+            self._snapshot = await self.compute()
+            self._computed_monotonic = time.monotonic()
+            return None
+        except Exception as e:
+            logger.warning(f"Analytics refresh failed: {e!r}")
+            return e
+        finally:
+            self._refresh_task = None
+
+    async def compute(self) -> AnalyticsSnapshot:
+        """Load the window and compute a fresh snapshot."""
+        started = time.perf_counter()
+        rows = await self.database.load_analytics_events(now_utc() - timedelta(days=self.window_days))
+        checkpoints = await self.database.get_mandatory_checkpoints()
+        offset = pytz.timezone(LOCAL_TIMEZONE).utcoffset(datetime.utcnow()).total_seconds()
+
+        def build() -> AnalyticsSnapshot:
+            all_events = EventArrays.from_rows(rows)
+            events = all_events.select(~all_events.anomalous)
+            journeys = JourneyArrays.from_events(events)
+            return AnalyticsSnapshot(
+                events=events,
+                journeys=journeys,
+                carriers=compute_carrier_stats(journeys),
+                segments=compute_segment_matrix(events, checkpoints, offset),
+                baselines=compute_baselines(segment_pairs(all_events, checkpoints)),
+                computed_at=now_utc()
+            )
+
+        snapshot = await asyncio.to_thread(build)
+        logger.info(
+            f"Analytics snapshot: {len(snapshot.events)} events, {len(snapshot.journeys)} journeys "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
+        return snapshot
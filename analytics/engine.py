@@ -0,0 +1,156 @@
+"""Vectorized per-journey and per-group duration statistics."""
+from dataclasses import dataclass
+from typing import Sequence, List, Dict, Any
+
+import numpy as np
+
+from .events import EventArrays
+from .stats import grouped_quantiles
+
+# Histogram bins of border crossing duration, minutes
+DURATION_BINS_MINUTES = (0, 30, 60, 90, 120, 180, 240, 360, 480, 720)
+
+
+@dataclass
+class JourneyArrays:
+    """
+    One entry per journey with at least two events: carrier code, first and
+    last event time (epoch seconds) and border crossing duration.
+    """
+
+    journey: np.ndarray  # int32 codes into journey_ids
+    carrier: np.ndarray  # int32 codes into carrier_ids
+    start: np.ndarray
+    end: np.ndarray
+    duration: np.ndarray
+    journey_ids: List[str]
+    carrier_ids: List[str]
+
+    def __len__(self) -> int:
+        return len(self.duration)
+
+    @classmethod
+    def from_events(cls, events: EventArrays) -> "JourneyArrays":
+        """Reduce event arrays to per-journey first/last event and duration."""
+        order = np.argsort(events.journey, kind="stable")
+        journey = events.journey[order]
+        ts = events.ts[order]
+        carrier = events.carrier[order]
+
+        boundaries = np.flatnonzero(np.diff(journey)) + 1
+        starts = np.concatenate(([0], boundaries)) if len(journey) else np.empty(0, dtype=np.int64)
+        counts = np.diff(np.append(starts, len(journey)))
+
+        if len(starts):
+            first = np.minimum.reduceat(ts, starts)
+            last = np.maximum.reduceat(ts, starts)
+        else:
+            first = last = np.empty(0)
+        keep = counts >= 2
+
+        return cls(
+            journey=journey[starts][keep],
+            carrier=carrier[starts][keep],
+            start=first[keep],
+            end=last[keep],
+            duration=(last - first)[keep],
+            journey_ids=events.journey_ids,
+            carrier_ids=events.carrier_ids
+        )
+
+
+def grouped_stats(
+    groups: np.ndarray,
+    values: np.ndarray,
+    n_groups: int,
+    quantiles: Sequence[float] = (0.5, 0.9)
+) -> Dict[str, np.ndarray]:
+    """
+    Count, mean and quantiles of `values` per group code.
+
+    Returns:
+        Dict of arrays of shape (n_groups,): count, mean, and p50/p90/... per
+        requested quantile (NaN for empty groups)
+    """
+    counts, quantile_values = grouped_quantiles(groups, values, n_groups, quantiles)
+    sums = np.bincount(groups, weights=values, minlength=n_groups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.where(counts > 0, sums / counts, np.nan)
+
+    result = {"count": counts, "mean": means}
+    for q, row in zip(quantiles, quantile_values):
+        result[f"p{round(q * 100)}"] = row
+    return result
+
+
+def grouped_histogram(groups: np.ndarray, values: np.ndarray, n_groups: int, bin_edges: Sequence[float]) -> np.ndarray:
+    """
+    Histogram of `values` per group code.
+
+    Bins are [edge_i, edge_i+1), the last one open-ended.
+
+    Returns:
+        Array of shape (n_groups, len(bin_edges))
+    """
+    n_bins = len(bin_edges)
+    bins = np.clip(np.searchsorted(np.asarray(bin_edges), values, side="right") - 1, 0, n_bins - 1)
+    return np.bincount(groups * n_bins + bins, minlength=n_groups * n_bins).reshape(n_groups, n_bins)
+
+
+@dataclass
+class CarrierStats:
+    """Duration statistics per carrier; the last index aggregates all carriers."""
+
+    carriers: List[str]  # carrier ids, then None for "all"
+    count: np.ndarray
+    mean_seconds: np.ndarray
+    median_seconds: np.ndarray
+    p90_seconds: np.ndarray
+    histogram: np.ndarray  # (carriers, bins) over DURATION_BINS_MINUTES
+
+    def row(self, carrier_id=None) -> Dict[str, Any]:
+        """Statistics of one carrier (or all carriers) as plain values."""
+        c = self.carriers.index(carrier_id) if carrier_id in self.carriers else len(self.carriers) - 1
+        count = int(self.count[c])
+        return {
+            "carrier_id": carrier_id,
+            "count": count,
+            "mean_seconds": float(self.mean_seconds[c]) if count else None,
+            "median_seconds": float(self.median_seconds[c]) if count else None,
+            "p90_seconds": float(self.p90_seconds[c]) if count else None
+        }
+
+    def share_faster(self, carrier_id, duration_seconds: float) -> float:
+        """Approximate share of journeys (0..1) that took longer than `duration_seconds`."""
+        c = self.carriers.index(carrier_id) if carrier_id in self.carriers else len(self.carriers) - 1
+        counts = self.histogram[c]
+        total = counts.sum()
+        if not total:
+            return 0.0
+        edges = np.asarray(DURATION_BINS_MINUTES, dtype=np.float64) * 60
+        b = max(int(np.searchsorted(edges, duration_seconds, side="right")) - 1, 0)
+        # Assume durations are spread evenly inside a bin (the open last bin: half longer)
+        if b + 1 < len(edges):
+            inside = (edges[b + 1] - duration_seconds) / (edges[b + 1] - edges[b])
+        else:
+            inside = 0.5
+        return float((counts[b + 1:].sum() + counts[b] * inside) / total)
+
+
+def compute_carrier_stats(journeys: JourneyArrays) -> CarrierStats:
+    """Duration statistics and histograms per carrier and for all carriers."""
+    n_groups = len(journeys.carrier_ids) + 1
+    carrier = journeys.carrier.astype(np.int64)
+    groups = np.concatenate((carrier, np.full_like(carrier, n_groups - 1)))
+    durations = np.tile(journeys.duration, 2)
+
+    stats = grouped_stats(groups, durations, n_groups)
+    histogram = grouped_histogram(groups, durations / 60, n_groups, DURATION_BINS_MINUTES)
+    return CarrierStats(
+        carriers=journeys.carrier_ids + [None],
+        count=stats["count"],
+        mean_seconds=stats["mean"],
+        median_seconds=stats["p50"],
+        p90_seconds=stats["p90"],
+        histogram=histogram
+    )
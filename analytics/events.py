@@ -0,0 +1,74 @@
+"""Columnar event arrays for batch analytics."""
+from dataclasses import dataclass
+from typing import List, Dict, Any
+
+import numpy as np
+
+
+@dataclass
+class EventArrays:
+    """
+    Journey events as parallel NumPy arrays.
+
+    Ids are replaced by integer codes into the `*_ids` lists, timestamps are
+    epoch seconds (float64), so grouping and sorting stay in NumPy.
+    """
+
+    journey: np.ndarray  # int32 codes into journey_ids
+    carrier: np.ndarray  # int32 codes into carrier_ids
+    checkpoint: np.ndarray  # int32 codes into checkpoint_ids
+    ts: np.ndarray  # float64 epoch seconds
+    anomalous: np.ndarray  # bool, flag of the event's journey
+    journey_ids: List[str]
+    carrier_ids: List[str]
+    checkpoint_ids: List[str]
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    @classmethod
+    def from_rows(cls, rows: List[Dict[str, Any]]) -> "EventArrays":
+        """Build arrays from `Database.load_analytics_events` rows."""
+        journey_codes: Dict[str, int] = {}
+        carrier_codes: Dict[str, int] = {}
+        checkpoint_codes: Dict[str, int] = {}
+        count = len(rows)
+
+        journey = np.fromiter(
+            (journey_codes.setdefault(row["journey_id"], len(journey_codes)) for row in rows),
+            dtype=np.int32, count=count
+        )
+        carrier = np.fromiter(
+            (carrier_codes.setdefault(row["carrier_id"], len(carrier_codes)) for row in rows),
+            dtype=np.int32, count=count
+        )
+        checkpoint = np.fromiter(
+            (checkpoint_codes.setdefault(row["checkpoint_id"], len(checkpoint_codes)) for row in rows),
+            dtype=np.int32, count=count
+        )
+        ts = np.fromiter((row["ts"] for row in rows), dtype=np.float64, count=count)
+        anomalous = np.fromiter((bool(row.get("anomalous")) for row in rows), dtype=bool, count=count)
+
+        return cls(
+            journey=journey,
+            carrier=carrier,
+            checkpoint=checkpoint,
+            ts=ts,
+            anomalous=anomalous,
+            journey_ids=list(journey_codes),
+            carrier_ids=list(carrier_codes),
+            checkpoint_ids=list(checkpoint_codes)
+        )
+
+    def select(self, mask: np.ndarray) -> "EventArrays":
+        """Subset of events; codes and id lists are kept as they are."""
+        return EventArrays(
+            journey=self.journey[mask],
+            carrier=self.carrier[mask],
+            checkpoint=self.checkpoint[mask],
+            ts=self.ts[mask],
+            anomalous=self.anomalous[mask],
+            journey_ids=self.journey_ids,
+            carrier_ids=self.carrier_ids,
+            checkpoint_ids=self.checkpoint_ids
+        )
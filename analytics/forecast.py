@@ -0,0 +1,404 @@
+"""Hour-of-week border wait forecast: duration histograms kept up to date incrementally."""
+import asyncio
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional, List, Dict, Any, Tuple
+
+import numpy as np
+import pytz
+
+from utils import now_utc, parse_db_timestamp
+from .live import OUTBOUND, INBOUND
+from .segments import HOURS_PER_WEEK, EPOCH_HOUR_OF_WEEK, LOCAL_TIMEZONE
+
+logger = logging.getLogger(__name__)
+
+# Histogram bins of the border duration: 15 minutes up to 24 hours, then one
+# open-ended bin
+BIN_SECONDS = 15 * 60
+N_BINS = 24 * 4 + 1
+# Direction index 0 aggregates both directions, carrier index 0 all carriers
+DIRECTION_INDEX = {None: 0, OUTBOUND: 1, INBOUND: 2}
+QUANTILES = (0.5, 0.9)
+# Neighbouring hours merged into a smoothed cell (one on each side)
+SMOOTHING_HOURS = 1
+# Catch-up re-reads this much before the watermark: rows stamped by
+# transactions that committed late (re-reading a journey is harmless)
+CATCH_UP_OVERLAP = timedelta(minutes=10)
+# Seconds between removals of journeys that left the window
+EXPIRE_INTERVAL = 3600.0
+
+# What a counted journey added: carrier, direction, hour and bin indexes,
+# departure (epoch seconds, for leaving the window)
+Cell = Tuple[int, int, int, int, int]
+
+
+def histogram_quantiles(counts: np.ndarray, quantiles=QUANTILES) -> np.ndarray:
+    """
+    Quantiles of duration histograms, interpolated linearly inside a bin.
+
+    Args:
+        counts: Histograms, bins on the last axis
+
+    Returns:
+        Array of shape (len(quantiles),) + counts.shape[:-1], seconds
+        (NaN for empty histograms)
+    """
+    cumulative = np.cumsum(counts, axis=-1)
+    total = cumulative[..., -1]
+    result = np.full((len(quantiles),) + total.shape, np.nan)
+    for i, q in enumerate(quantiles):
+        target = q * total
+        b = np.minimum((cumulative < target[..., None]).sum(axis=-1), N_BINS - 1)
+        in_bin = np.take_along_axis(counts, b[..., None], axis=-1)[..., 0]
+        before = np.take_along_axis(cumulative, b[..., None], axis=-1)[..., 0] - in_bin
+        with np.errstate(invalid="ignore", divide="ignore"):
+            fraction = np.where(in_bin > 0, (target - before) / in_bin, 0.0)
+        # The open-ended bin has no upper edge: report its lower edge
+        fraction = np.where(b == N_BINS - 1, 0.0, fraction)
+        result[i] = np.where(total > 0, (b + fraction) * BIN_SECONDS, np.nan)
+    return result
+
+
+class BorderForecast:
+    """
+    Expected border duration by departure hour of week, direction and carrier.
+
+    Durations of completed journeys are counted in histograms indexed
+    [carrier, direction, hour of week, bin] (hours in Minsk time). Median and
+    90th percentile of every cell, exact and smoothed over neighbouring hours,
+    are kept in lookup tables, so predict() is a handful of array reads.
+    A completed journey updates only the cells it touches.
+
+    Every counted journey is remembered with its cell, so a journey counted
+    again replaces its earlier count and discard() takes it out (cancelled
+    or flagged anomalous after completion). Journeys that departed more than
+    `window_days` ago are taken out on start and then hourly, so the
+    histograms and the remembered journeys stay within the window.
+
+    Histograms are saved to `path` together with the counted journeys and a
+    watermark: the latest `journeys.stats_changed_at` seen (migration 013,
+    database clock). On start the bot loads them and catches up from the
+    database with the journeys changed since, adding, replacing and
+    removing counts, instead of rebuilding the whole window.
+    """
+
+    def __init__(
+        self,
+        database,
+        path: str,
+        window_days: int = 365,
+        min_samples: int = 5,
+        save_interval: float = 300.0
+    ):
+        self.database = database
+        self.path = Path(path)
+        self.window_days = window_days
+        self.min_samples = min_samples
+        self.save_interval = save_interval
+        self.offset = pytz.timezone(LOCAL_TIMEZONE).utcoffset(datetime.utcnow()).total_seconds()
+
+        self._carrier_ids: List[str] = []
+        self._carrier_index: Dict[str, int] = {}  # carrier id -> index (0 is "all")
+        self._counts = np.zeros((1, len(DIRECTION_INDEX), HOURS_PER_WEEK, N_BINS), dtype=np.int32)
+        self._counted: Dict[str, Cell] = {}  # journey id -> its cell
+        self._watermark = 0.0  # epoch seconds
+        self._tables_from_counts()
+        self._dirty = False
+        self._saved_monotonic = time.monotonic()
+        self._expired_monotonic = time.monotonic()
+        self._save_task: Optional[asyncio.Task] = None
+
+    @property
+    def journeys(self) -> int:
+        """Journeys counted."""
+        return int(self._samples[0, 0, 0].sum())
+
+    async def start(self) -> None:
+        """Load saved histograms, apply journeys changed since and drop aged-out ones, or rebuild."""
+        loaded = await asyncio.to_thread(self._load)
+        if loaded:
+            since = datetime.fromtimestamp(self._watermark, tz=pytz.utc) - CATCH_UP_OVERLAP
+        else:
+            since = now_utc() - timedelta(days=self.window_days)
+        rows = await self.database.load_journey_stat_changes(since)
+        changed = self._apply_rows(rows)
+        expired = self._expire()
+        logger.info(
+            f"Border forecast: {self.journeys} journey(s), {changed} changed and {expired} aged out since "
+            f"{'the saved snapshot' if loaded else 'a full rebuild'}"
+        )
+        if changed or expired or not loaded:
+            await self.save()
+
+    # Updates
+    def record_journey(
+        self,
+        journey_id: str,
+        carrier_id: str,
+        direction: Optional[str],
+        departure_utc: datetime,
+        duration_seconds: float
+    ) -> None:
+        """Count one completed journey (replacing an earlier count of it) and refresh the cells it touches."""
+        if time.monotonic() - self._expired_monotonic >= EXPIRE_INTERVAL:
+            self._expire()
+        cell = self._cell(carrier_id, direction, departure_utc.timestamp(), duration_seconds)
+        previous = self._counted.get(journey_id)
+        if previous == cell:
+            return
+        if previous is not None:
+            self._count_cell(previous, -1)
+        self._counted[journey_id] = cell
+        self._count_cell(cell, 1)
+
+    def discard(self, journey_id: str) -> None:
+        """Stop counting a journey (cancelled or flagged anomalous after completion)."""
+        cell = self._counted.pop(journey_id, None)
+        if cell is not None:
+            self._count_cell(cell, -1)
+
+    def _cell(self, carrier_id: str, direction: Optional[str], departure: float, duration_seconds: float) -> Cell:
+        return (
+            self._carrier(carrier_id),
+            DIRECTION_INDEX.get(direction, 0),
+            self._hour(departure),
+            min(int(duration_seconds // BIN_SECONDS), N_BINS - 1),
+            int(departure)
+        )
+
+    def _count_cell(self, cell: Cell, delta: int) -> None:
+        c, d, h, b, _ = cell
+        carriers, directions = sorted({0, c}), sorted({0, d})
+        for ci in carriers:
+            for di in directions:
+                self._counts[ci, di, h, b] += delta
+        self._dirty = True
+
+        hours = [(h + shift) % HOURS_PER_WEEK for shift in range(-SMOOTHING_HOURS, SMOOTHING_HOURS + 1)]
+        self._update_tables(carriers, directions, hours)
+        self._schedule_save()
+
+    def _apply_rows(self, rows: List[Dict[str, Any]]) -> int:
+        """
+        Apply journeys whose statistics changed (bulk, then rebuild the tables).
+
+        Earlier counts of these journeys are replaced by their current
+        values, or removed if they are no longer counted. Returns how many
+        journeys changed.
+        """
+        removed, added, changed = [], {}, 0
+        window_start = self._window_start()
+        for row in rows:
+            self._watermark = max(self._watermark, parse_db_timestamp(row["changed_at"]).timestamp())
+            cell = None
+            departure = parse_db_timestamp(row["departure_utc"]).timestamp()
+            if row["counted"] and row["duration_seconds"] is not None and departure >= window_start:
+                cell = self._cell(row["carrier_id"], row.get("direction"), departure, float(row["duration_seconds"]))
+            previous = self._counted.get(row["journey_id"])
+            if cell == previous:
+                continue  # re-read (overlap) or counted live already
+            changed += 1
+            if previous is not None:
+                removed.append(self._counted.pop(row["journey_id"]))
+            if cell is not None:
+                added[row["journey_id"]] = cell
+        if not changed:
+            return 0
+
+        self._add_cells(removed, -1)
+        self._add_cells(list(added.values()), 1)
+        self._counted.update(added)
+        self._dirty = True
+        self._tables_from_counts()
+        return changed
+
+    def _window_start(self) -> float:
+        return now_utc().timestamp() - self.window_days * 86400
+
+    def _expire(self) -> int:
+        """Stop counting journeys that departed before the window (bulk, then rebuild the tables)."""
+        self._expired_monotonic = time.monotonic()
+        window_start = self._window_start()
+        aged = [journey_id for journey_id, cell in self._counted.items() if cell[4] < window_start]
+        if not aged:
+            return 0
+        self._add_cells([self._counted.pop(journey_id) for journey_id in aged], -1)
+        self._dirty = True
+        self._tables_from_counts()
+        return len(aged)
+
+    def _add_cells(self, cells: List[Cell], delta: int) -> None:
+        """Add `delta` to the histograms of journeys in `cells`, including the all-carrier/all-direction ones."""
+        if not cells:
+            return
+        carrier, direction, hour, bins, _ = (np.array(column) for column in zip(*cells))
+        zero = np.zeros_like(carrier)
+        # Cells [{0, c}, {0, d}], as in _count_cell
+        for ci in (zero, carrier):
+            for di in (zero, direction):
+                distinct = ((ci is zero) | (carrier != 0)) & ((di is zero) | (direction != 0))
+                np.add.at(self._counts, (ci[distinct], di[distinct], hour[distinct], bins[distinct]), delta)
+
+    def _carrier(self, carrier_id: str) -> int:
+        """Index of a carrier, growing the histograms for a new one."""
+        index = self._carrier_index.get(carrier_id)
+        if index is None:
+            self._carrier_ids.append(carrier_id)
+            index = self._carrier_index[carrier_id] = len(self._carrier_ids)
+            self._counts = np.concatenate((self._counts, np.zeros_like(self._counts[:1])))
+            self._samples = np.concatenate((self._samples, np.zeros_like(self._samples[:, :1])), axis=1)
+            self._quantiles = np.concatenate((self._quantiles, np.full_like(self._quantiles[:, :, :1], np.nan)), axis=2)
+        return index
+
+    def _hour(self, ts: float) -> int:
+        """Hour of week in Minsk time (same bucketing as the segment matrix)."""
+        return int(((ts + self.offset) // 3600 + EPOCH_HOUR_OF_WEEK) % HOURS_PER_WEEK)
+
+    # Lookup tables
+    def _smoothed(self, counts: np.ndarray, hours: Optional[List[int]] = None) -> np.ndarray:
+        """Histograms summed over neighbouring hours (hour axis is 2)."""
+        shifts = range(-SMOOTHING_HOURS, SMOOTHING_HOURS + 1)
+        if hours is None:
+            return sum(np.roll(counts, shift, axis=2) for shift in shifts)
+        return sum(
+            counts[:, :, [(h - shift) % HOURS_PER_WEEK for h in hours]] for shift in shifts
+        )
+
+    def _tables_from_counts(self) -> None:
+        """
+        Recompute all lookup tables.
+
+        _samples: [level, carrier, direction, hour], level 0 exact, 1 smoothed
+        _quantiles: [level, quantile, carrier, direction, hour]
+        """
+        levels = (self._counts, self._smoothed(self._counts))
+        self._samples = np.stack([counts.sum(axis=-1) for counts in levels])
+        self._quantiles = np.stack([histogram_quantiles(counts) for counts in levels])
+
+    def _update_tables(self, carriers: List[int], directions: List[int], hours: List[int]) -> None:
+        """Recompute the lookup tables of a few cells."""
+        cells = np.ix_(carriers, directions, hours)
+        counts = self._counts[np.ix_(carriers, directions, range(HOURS_PER_WEEK))]
+        for level, level_counts in enumerate((counts[:, :, hours], self._smoothed(counts, hours))):
+            self._samples[level][cells] = level_counts.sum(axis=-1)
+            for q, values in enumerate(histogram_quantiles(level_counts)):
+                self._quantiles[level, q][cells] = values
+
+    # Reads
+    def predict(
+        self,
+        carrier_id: Optional[str],
+        direction: Optional[str],
+        departure_utc: datetime
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Expected border duration for a departure time.
+
+        Falls back from the exact cell to neighbouring hours, then to all
+        directions and all carriers, until a cell has `min_samples` journeys.
+
+        Returns:
+            Dict: p50_seconds, p90_seconds, samples; None without enough data
+        """
+        h = self._hour(departure_utc.timestamp())
+        c = self._carrier_index.get(carrier_id, 0)
+        d = DIRECTION_INDEX.get(direction, 0)
+        for ci in ((c, 0) if c else (0,)):
+            for di in ((d, 0) if d else (0,)):
+                for level in (0, 1):
+                    samples = int(self._samples[level, ci, di, h])
+                    if samples >= self.min_samples:
+                        return {
+                            "p50_seconds": float(self._quantiles[level, 0, ci, di, h]),
+                            "p90_seconds": float(self._quantiles[level, 1, ci, di, h]),
+                            "samples": samples
+                        }
+        return None
+
+    # Persistence
+    def _schedule_save(self) -> None:
+        """Save in the background at most once per `save_interval`."""
+        if time.monotonic() - self._saved_monotonic < self.save_interval:
+            return
+        if self._save_task is None or self._save_task.done():
+            self._save_task = asyncio.create_task(self.save())
+
+    async def save(self) -> None:
+        """Write histograms, counted journeys and watermark atomically (in a worker thread)."""
+        if not self._dirty:
+            return
+        counts, carrier_ids, watermark = self._counts.copy(), list(self._carrier_ids), self._watermark
+        counted = dict(self._counted)
+        self._dirty = False
+        self._saved_monotonic = time.monotonic()
+        try:
+            await asyncio.to_thread(self._write, counts, carrier_ids, counted, watermark)
+        except Exception as e:
+            self._dirty = True
+            logger.warning(f"Border forecast not saved: {e}")
+
+    def _write(
+        self,
+        counts: np.ndarray,
+        carrier_ids: List[str],
+        counted: Dict[str, Cell],
+        watermark: float
+    ) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # A temporary file of its own: a scheduled save and the one on shutdown may overlap
+        tmp = tempfile.NamedTemporaryFile(
+            "wb", dir=self.path.parent, prefix=f".{self.path.name}.", suffix=".tmp", delete=False
+        )
+        try:
+            with tmp:
+                np.savez_compressed(
+                    tmp,
+                    counts=counts,
+                    carrier_ids=np.array(carrier_ids, dtype=str),
+                    journey_ids=np.array(list(counted), dtype=str),
+                    cells=np.array(list(counted.values()), dtype=np.int64).reshape(-1, 5),
+                    watermark=np.array(watermark)
+                )
+            os.replace(tmp.name, self.path)
+        except BaseException:
+            os.unlink(tmp.name)
+            raise
+
+    def _load(self) -> bool:
+        """Load saved histograms; False if there is no usable file."""
+        if not self.path.exists():
+            return False
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                if "journey_ids" not in data.files:
+                    # Saved before journeys were tracked: nothing to subtract from
+                    logger.warning(f"Border forecast file {self.path} has another layout, rebuilding")
+                    return False
+                counts = data["counts"]
+                carrier_ids = [str(carrier_id) for carrier_id in data["carrier_ids"]]
+                journey_ids = [str(journey_id) for journey_id in data["journey_ids"]]
+                cells = data["cells"]
+                watermark = float(data["watermark"])
+        except Exception as e:
+            logger.warning(f"Border forecast file {self.path} ignored: {e}")
+            return False
+        if (
+            counts.shape[1:] != self._counts.shape[1:]
+            or counts.shape[0] != len(carrier_ids) + 1
+            or cells.shape != (len(journey_ids), 5)
+        ):
+            logger.warning(f"Border forecast file {self.path} has another layout, rebuilding")
+            return False
+
+        self._counts = counts.astype(np.int32)
+        self._carrier_ids = carrier_ids
+        self._carrier_index = {carrier_id: i + 1 for i, carrier_id in enumerate(carrier_ids)}
+        self._counted = {journey_id: tuple(int(v) for v in cell) for journey_id, cell in zip(journey_ids, cells)}
+        self._watermark = watermark
+        self._tables_from_counts()
+        return True
@@ -0,0 +1,192 @@
+"""Live "border now" estimate from journeys in progress."""
+import bisect
+import heapq
+import logging
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Any
+
+from utils import now_utc, parse_db_timestamp
+
+logger = logging.getLogger(__name__)
+
+OUTBOUND = "outbound"  # Belarus -> Poland / Lithuania
+INBOUND = "inbound"  # Poland / Lithuania -> Belarus
+DIRECTIONS = (OUTBOUND, INBOUND)
+
+
+def direction_of(user_timezone: Optional[str]) -> str:
+    """
+    Guess the direction of travel from the timezone of a journey's first event.
+
+    Riders pick the timezone of where they are when the journey starts, so
+    Minsk time means they are leaving Belarus.
+    """
+    return OUTBOUND if (user_timezone or "Europe/Minsk") == "Europe/Minsk" else INBOUND
+
+
+@dataclass
+class _LiveJourney:
+    direction: str
+    start: float  # epoch seconds of the first checkpoint
+    last: float  # epoch seconds of the latest checkpoint
+    position: int  # index of the latest checkpoint in its crossing's mandatory sequence
+
+
+class _Direction:
+    """Incrementally maintained state of one direction."""
+
+    def __init__(self):
+        self.active_starts: List[float] = []  # sorted
+        self.recent: deque = deque()  # (end, duration) in completion order
+        self.recent_durations: List[float] = []  # sorted
+
+    @staticmethod
+    def median(values: List[float]) -> Optional[float]:
+        if not values:
+            return None
+        middle = len(values) // 2
+        if len(values) % 2:
+            return values[middle]
+        return (values[middle - 1] + values[middle]) / 2
+
+
+class LiveBorderEstimator:
+    """
+    Current border wait per direction, kept in memory.
+
+    Fed by every recorded checkpoint event (EventJournal listener): a journey
+    becomes active at its first checkpoint and finishes at the last mandatory
+    one. Reads are O(1) apart from expiring old entries:
+
+    - active journeys: median time since they reached the border (a lower
+      bound of the wait for those still in the queue)
+    - recent crossings: median duration of crossings finished within
+      `recent_hours`
+
+    The estimate is the larger of the two. Journeys without events for
+    `stale_hours` are dropped as abandoned.
+    """
+
+    def __init__(self, database, stale_hours: float = 6.0, recent_hours: float = 3.0):
+        self.database = database
+        self.stale_seconds = stale_hours * 3600
+        self.recent_seconds = recent_hours * 3600
+
+        # checkpoint id -> (position, last position) in its crossing's sequence
+        self._positions: Dict[str, tuple] = {}
+        self._journeys: Dict[str, _LiveJourney] = {}
+        self._expiry: List[tuple] = []  # heap of (last event, journey id)
+        self._directions = {direction: _Direction() for direction in DIRECTIONS}
+
+    async def load(self) -> None:
+        """Learn the checkpoint sequence and replay recent events from the database."""
+        checkpoints = await self.database.get_mandatory_checkpoints()
+        by_border: Dict[Any, List[Dict[str, Any]]] = {}
+        for checkpoint in checkpoints:
+            by_border.setdefault(checkpoint.get("border"), []).append(checkpoint)
+        self._positions = {
+            checkpoint["id"]: (i, len(sequence) - 1)
+            for sequence in by_border.values()
+            for i, checkpoint in enumerate(sequence)
+        }
+
+        since = now_utc() - timedelta(seconds=self.stale_seconds)
+        rows = await self.database.get_live_border_events(since)
+        rows.sort(key=lambda row: parse_db_timestamp(row["timestamp_utc"]))
+        for row in rows:
+            self.observe_event(row)
+        # Completed without reaching the last checkpoint (or cancelled later)
+        for row in rows:
+            if row["completed"]:
+                self.discard(row["journey_id"])
+        logger.info(f"Live border estimate: {len(self._journeys)} active journey(s) loaded")
+
+    # Updates
+    def observe_event(self, event: Dict[str, Any]) -> None:
+        """Apply one checkpoint event (journal or database row)."""
+        if event["checkpoint_id"] not in self._positions:
+            return
+        position, last_position = self._positions[event["checkpoint_id"]]
+        ts = parse_db_timestamp(event["timestamp_utc"]).timestamp()
+        journey_id = event["journey_id"]
+        journey = self._journeys.get(journey_id)
+
+        if journey is None:
+            if position == last_position:
+                return
+            journey = _LiveJourney(direction_of(event.get("user_timezone")), ts, ts, position)
+            self._journeys[journey_id] = journey
+            bisect.insort(self._directions[journey.direction].active_starts, ts)
+        elif ts >= journey.last:
+            journey.last = ts
+            journey.position = max(journey.position, position)
+        heapq.heappush(self._expiry, (journey.last, journey_id))
+
+        if journey.position == last_position:
+            self._finish(journey_id, journey)
+
+    def discard(self, journey_id: str) -> None:
+        """Forget a journey (cancelled or completed early)."""
+        journey = self._journeys.pop(journey_id, None)
+        if journey is not None:
+            self._remove_start(journey)
+
+    def _finish(self, journey_id: str, journey: _LiveJourney) -> None:
+        self._journeys.pop(journey_id, None)
+        self._remove_start(journey)
+        state = self._directions[journey.direction]
+        duration = journey.last - journey.start
+        state.recent.append((journey.last, duration))
+        bisect.insort(state.recent_durations, duration)
+
+    def _remove_start(self, journey: _LiveJourney) -> None:
+        starts = self._directions[journey.direction].active_starts
+        i = bisect.bisect_left(starts, journey.start)
+        if i < len(starts) and starts[i] == journey.start:
+            del starts[i]
+
+    def _expire(self, now: float) -> None:
+        """Drop stale active journeys and old crossings (amortized O(log n) each)."""
+        while self._expiry and self._expiry[0][0] < now - self.stale_seconds:
+            last, journey_id = heapq.heappop(self._expiry)
+            journey = self._journeys.get(journey_id)
+            if journey is not None and journey.last == last:
+                self.discard(journey_id)
+        for state in self._directions.values():
+            while state.recent and state.recent[0][0] < now - self.recent_seconds:
+                _, duration = state.recent.popleft()
+                i = bisect.bisect_left(state.recent_durations, duration)
+                del state.recent_durations[i]
+
+    # Reads
+    def estimate(self, direction: str, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Current wait estimate for one direction.
+
+        Returns:
+            Dict: active (journeys at the border), active_median_seconds,
+            recent (crossings finished recently), recent_median_seconds,
+            estimate_seconds (None without data)
+        """
+        now_ts = (now or now_utc()).timestamp()
+        self._expire(now_ts)
+        state = self._directions[direction]
+
+        median_start = _Direction.median(state.active_starts)
+        active_median = now_ts - median_start if median_start is not None else None
+        recent_median = _Direction.median(state.recent_durations)
+        known = [value for value in (active_median, recent_median) if value is not None]
+        return {
+            "active": len(state.active_starts),
+            "active_median_seconds": active_median,
+            "recent": len(state.recent_durations),
+            "recent_median_seconds": recent_median,
+            "estimate_seconds": max(known) if known else None
+        }
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Estimates for all directions."""
+        now = now_utc()
+        return {direction: self.estimate(direction, now) for direction in DIRECTIONS}
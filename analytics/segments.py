@@ -0,0 +1,173 @@
+"""Per-segment duration matrix: consecutive mandatory checkpoints by carrier and hour of week."""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Tuple
+
+import numpy as np
+
+from utils import now_utc
+from .events import EventArrays
+from .stats import grouped_quantiles
+
+HOURS_PER_WEEK = 168
+# 1970-01-01 was a Thursday; shifts epoch hours so that Monday 00:00 is hour 0
+EPOCH_HOUR_OF_WEEK = 3 * 24
+# Hours of week are bucketed in Minsk time (fixed UTC+3, no DST)
+LOCAL_TIMEZONE = "Europe/Minsk"
+
+QUANTILES = (0.5, 0.9)
+
+
+def hour_of_week(ts: np.ndarray, utc_offset_seconds: float) -> np.ndarray:
+    """Local hour of week (Monday 00:00 = 0 ... Sunday 23:00 = 167) of epoch seconds."""
+    hours = np.floor((ts + utc_offset_seconds) / 3600).astype(np.int64)
+    return (hours + EPOCH_HOUR_OF_WEEK) % HOURS_PER_WEEK
+
+
+@dataclass
+class SegmentMatrix:
+    """
+    Duration distributions of segments between consecutive mandatory checkpoints.
+
+    Arrays are indexed [carrier, segment, hour]. The last carrier index
+    aggregates all carriers, hour index HOURS_PER_WEEK aggregates all hours.
+    """
+
+    carriers: List[str]  # carrier ids, then None for "all"
+    segments: List[Tuple[str, str]]  # (from checkpoint name, to checkpoint name)
+    counts: np.ndarray
+    median_seconds: np.ndarray
+    p90_seconds: np.ndarray
+    events: int
+    computed_at: datetime
+
+    def lookup(self, carrier_id: Optional[str] = None, hour: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Per-segment distribution for one carrier (or all) and hour of week (or all).
+
+        Returns:
+            One dict per segment: from, to, count, median_seconds, p90_seconds
+            (None if there is no data)
+        """
+        c = self.carriers.index(carrier_id) if carrier_id in self.carriers else len(self.carriers) - 1
+        h = HOURS_PER_WEEK if hour is None else hour
+        rows = []
+        for s, (start, end) in enumerate(self.segments):
+            count = int(self.counts[c, s, h])
+            rows.append({
+                "from": start,
+                "to": end,
+                "count": count,
+                "median_seconds": float(self.median_seconds[c, s, h]) if count else None,
+                "p90_seconds": float(self.p90_seconds[c, s, h]) if count else None
+            })
+        return rows
+
+
+@dataclass
+class SegmentPairs:
+    """
+    One entry per segment traversal: a pair of neighbouring events of one
+    journey whose checkpoints are consecutive in the mandatory sequence.
+    """
+
+    journey: np.ndarray  # int64 codes into EventArrays.journey_ids
+    carrier: np.ndarray  # int64 codes into EventArrays.carrier_ids
+    segment: np.ndarray  # int64 index into `segments`
+    start: np.ndarray  # epoch seconds of the first checkpoint
+    duration: np.ndarray  # seconds, negative if recorded out of order
+    segments: List[Tuple[str, str]]  # (from checkpoint name, to checkpoint name)
+
+    def __len__(self) -> int:
+        return len(self.duration)
+
+
+def segment_pairs(events: EventArrays, checkpoints: List[Dict[str, Any]]) -> SegmentPairs:
+    """
+    Find segment traversals in event arrays.
+
+    Args:
+        events: Events of completed journeys
+        checkpoints: Mandatory checkpoints ordered by border crossing, then
+            order_index (as returned by get_mandatory_checkpoints)
+    """
+    # A segment joins neighbouring checkpoints of the same border crossing
+    segments = []
+    segment_of_rank = np.full(max(len(checkpoints), 1), -1, dtype=np.int64)
+    for i in range(len(checkpoints) - 1):
+        if checkpoints[i].get("border") == checkpoints[i + 1].get("border"):
+            segment_of_rank[i] = len(segments)
+            segments.append((checkpoints[i]["name"], checkpoints[i + 1]["name"]))
+
+    # Position of each checkpoint code in the mandatory sequences, -1 if optional
+    position = {checkpoint["id"]: i for i, checkpoint in enumerate(checkpoints)}
+    rank_of_code = np.array([position.get(cid, -1) for cid in events.checkpoint_ids] or [-1], dtype=np.int32)
+    rank = rank_of_code[events.checkpoint] if len(events) else np.empty(0, dtype=np.int32)
+
+    mandatory = rank >= 0
+    journey = events.journey[mandatory]
+    carrier = events.carrier[mandatory]
+    rank = rank[mandatory]
+    ts = events.ts[mandatory]
+
+    # Order by journey, then by checkpoint sequence (not by time, so that
+    # events recorded out of order show up as negative durations)
+    order = np.lexsort((rank, journey))
+    journey, carrier, rank, ts = journey[order], carrier[order], rank[order], ts[order]
+
+    segment = segment_of_rank[rank[:-1]]
+    consecutive = (journey[1:] == journey[:-1]) & (rank[1:] == rank[:-1] + 1) & (segment >= 0)
+    return SegmentPairs(
+        journey=journey[:-1][consecutive].astype(np.int64),
+        carrier=carrier[:-1][consecutive].astype(np.int64),
+        segment=segment[consecutive],
+        start=ts[:-1][consecutive],
+        duration=(ts[1:] - ts[:-1])[consecutive],
+        segments=segments
+    )
+
+
+def compute_segment_matrix(
+    events: EventArrays,
+    checkpoints: List[Dict[str, Any]],
+    utc_offset_seconds: float
+) -> SegmentMatrix:
+    """
+    Build the segment matrix from event arrays.
+
+    Args:
+        events: Events of completed journeys
+        checkpoints: Mandatory checkpoints ordered by order_index
+        utc_offset_seconds: Offset of the local time used for hours of week
+    """
+    pairs = segment_pairs(events, checkpoints)
+    n_segments = len(pairs.segments)
+    n_carriers = len(events.carrier_ids) + 1
+    n_hours = HOURS_PER_WEEK + 1
+
+    valid = pairs.duration >= 0
+    durations = pairs.duration[valid]
+    segment = pairs.segment[valid]
+    carrier = pairs.carrier[valid]
+    hours = hour_of_week(pairs.start[valid], utc_offset_seconds)
+
+    # Every segment counts towards its carrier and "all", its hour and "all"
+    all_carriers = np.full_like(carrier, n_carriers - 1)
+    all_hours = np.full_like(hours, HOURS_PER_WEEK)
+    group_carrier = np.concatenate((carrier, carrier, all_carriers, all_carriers))
+    group_hour = np.concatenate((hours, all_hours, hours, all_hours))
+    group_segment = np.tile(segment, 4)
+    groups = (group_carrier * n_segments + group_segment) * n_hours + group_hour
+
+    shape = (n_carriers, n_segments, n_hours)
+    counts, quantiles = grouped_quantiles(groups, np.tile(durations, 4), int(np.prod(shape)), QUANTILES)
+
+    return SegmentMatrix(
+        carriers=events.carrier_ids + [None],
+        segments=pairs.segments,
+        counts=counts.reshape(shape),
+        median_seconds=quantiles[0].reshape(shape),
+        p90_seconds=quantiles[1].reshape(shape),
+        events=len(events),
+        computed_at=now_utc()
+    )
@@ -0,0 +1,144 @@
+"""Periodically refreshed border status shared by inline mode and other readers."""
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Any, Callable
+
+from utils import now_utc
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class BorderStatus:
+    """Everything needed to render the border status, computed in one go."""
+
+    live: Dict[str, Dict[str, Any]]  # direction -> LiveBorderEstimator.estimate()
+    trend: Dict[str, Optional[float]]  # direction -> change of the estimate over trend_minutes, seconds
+    summary: Optional[Dict[str, Any]]  # get_border_duration_summary() over summary_days
+    summary_days: int
+    carriers: List[Dict[str, Any]]  # CarrierStats rows with `name`, fastest first
+    latest: List[Dict[str, Any]]  # get_latest_border_stats()
+    computed_at: datetime
+
+
+class BorderStatusCache:
+    """
+    Border status recomputed every `interval` seconds in the background.
+
+    Readers get the last computed status from memory (`current`) and never
+    wait for the database. Listeners are called with every new status, so
+    they can pre-render whatever they serve.
+
+    The trend compares the live estimate with the one computed about
+    `trend_minutes` ago (None until there is half that much history).
+    """
+
+    def __init__(
+        self,
+        database,
+        live,
+        analytics,
+        interval: float = 60.0,
+        summary_days: int = 7,
+        latest_limit: int = 5,
+        min_journeys: int = 10,
+        trend_minutes: int = 60
+    ):
+        self.database = database
+        self.live = live
+        self.analytics = analytics
+        self.interval = interval
+        self.summary_days = summary_days
+        self.latest_limit = latest_limit
+        self.min_journeys = min_journeys
+        self.trend_seconds = trend_minutes * 60
+
+        self.current: Optional[BorderStatus] = None
+        self._task: Optional[asyncio.Task] = None
+        self._listeners: List[Callable[[BorderStatus], None]] = []
+        self._history: deque = deque()  # (epoch seconds, direction -> estimate seconds)
+
+    def add_listener(self, listener: Callable[[BorderStatus], None]) -> None:
+        """Call `listener(status)` for every status computed from now on."""
+        self._listeners.append(listener)
+
+    async def refresh(self) -> BorderStatus:
+        """Compute a new status and notify listeners."""
+        summary = await self.database.get_border_duration_summary(
+            since=now_utc() - timedelta(days=self.summary_days)
+        )
+        latest = await self.database.get_latest_border_stats(limit=self.latest_limit)
+
+        carriers = []
+        snapshot = await self.analytics.snapshot(wait=False)
+        if snapshot:
+            names = {carrier["id"]: carrier["name"] for carrier in await self.database.get_carriers()}
+            rows = [snapshot.carriers.row(carrier_id) for carrier_id in snapshot.carriers.carriers[:-1]]
+            carriers = sorted(
+                (
+                    {**row, "name": names.get(row["carrier_id"], "Неизвестно")}
+                    for row in rows if row["count"] >= self.min_journeys
+                ),
+                key=lambda row: row["median_seconds"]
+            )
+
+        live = self.live.snapshot()
+        self.current = BorderStatus(
+            live=live,
+            trend=self._trend(live),
+            summary=summary if summary and summary["journeys"] else None,
+            summary_days=self.summary_days,
+            carriers=carriers,
+            latest=latest,
+            computed_at=now_utc()
+        )
+        for listener in self._listeners:
+            try:
+                listener(self.current)
+            except Exception:
+                logger.exception("Border status listener failed")
+        return self.current
+
+    def _trend(self, live: Dict[str, Dict[str, Any]]) -> Dict[str, Optional[float]]:
+        """Change of each direction's estimate since about `trend_seconds` ago."""
+        now = now_utc().timestamp()
+        estimates = {direction: estimate["estimate_seconds"] for direction, estimate in live.items()}
+        self._history.append((now, estimates))
+        while len(self._history) > 1 and self._history[1][0] <= now - self.trend_seconds:
+            self._history.popleft()
+
+        then, previous = self._history[0]
+        ready = now - then >= self.trend_seconds / 2
+        trend = {}
+        for direction, estimate in estimates.items():
+            before = previous.get(direction)
+            known = ready and estimate is not None and before is not None
+            trend[direction] = estimate - before if known else None
+        return trend
+
+    async def start(self) -> None:
+        """Start the background refresh."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background refresh."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"Border status not refreshed, serving the previous one: {e}")
+            await asyncio.sleep(self.interval)
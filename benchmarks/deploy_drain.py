@@ -0,0 +1,201 @@
+"""
+Measure what a deploy (stop + start) does to updates under load.
+
+Runs against a local Bot API stand-in (aiohttp server answering getUpdates
+from a generated stream of messages and recording sendMessage), so no
+request reaches Telegram. Each message is handled like a checkpoint:
+some work (`--work-ms`), then a reply. Mid-stream the running instance is
+stopped, as SIGTERM would, and a new one is started; new messages keep
+arriving meanwhile.
+
+Compared:
+
+- start_polling: Dispatcher.start_polling stopped with stop_polling (the
+  lifecycle before lifecycle.py); handlers still running when it returns
+  die with the process
+- graceful: lifecycle.serve — stop fetching, drain handlers with a
+  deadline (`--drain-timeout`), acknowledge the last batch
+
+Reported per mode: messages answered, cut off (handling started but not
+answered by the stopped instance), lost (never answered), answered twice,
+and how long the stop took.
+
+Usage:
+    python3 benchmarks/deploy_drain.py [--rate 200] [--work-ms 300] [--run 3]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from aiohttp import web  # noqa: E402
+from aiogram import Bot, Dispatcher, Router  # noqa: E402
+from aiogram.client.session.aiohttp import AiohttpSession  # noqa: E402
+from aiogram.client.telegram import TelegramAPIServer  # noqa: E402
+from aiogram.fsm.storage.memory import MemoryStorage  # noqa: E402
+from aiogram.types import Message  # noqa: E402
+
+from lifecycle import serve  # noqa: E402
+
+TOKEN = "42:TEST"
+BOT_USER = {"id": 42, "is_bot": True, "first_name": "Granica", "username": "granica_bot"}
+
+
+class BotApiStandIn:
+    """Just enough of the Bot API: getMe, getUpdates (long polling, offsets) and sendMessage."""
+
+    def __init__(self, chats: int):
+        self.chats = chats
+        self.updates = []
+        self.confirmed = 0  # update ids below this were acknowledged
+        self.replies = Counter()  # update id -> replies sent
+        self._arrived = asyncio.Event()
+
+    def produce(self) -> None:
+        update_id = len(self.updates) + 1
+        chat = {"id": 1000 + update_id % self.chats, "type": "private"}
+        self.updates.append({
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id, "date": int(time.time()), "chat": chat,
+                "from": {"id": chat["id"], "is_bot": False, "first_name": "User"}, "text": str(update_id)
+            }
+        })
+        self._arrived.set()
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        form = await request.post()
+        if method == "getMe":
+            return web.json_response({"ok": True, "result": BOT_USER})
+        if method == "getUpdates":
+            self.confirmed = max(self.confirmed, int(form.get("offset") or 0))
+            deadline = time.monotonic() + float(form.get("timeout") or 0)
+            while True:
+                pending = self.updates[max(self.confirmed, 1) - 1:]  # update ids start at 1
+                if pending or time.monotonic() >= deadline:
+                    return web.json_response({"ok": True, "result": pending[:int(form.get("limit") or 100)]})
+                self._arrived.clear()
+                try:
+                    await asyncio.wait_for(self._arrived.wait(), deadline - time.monotonic())
+                except asyncio.TimeoutError:
+                    pass
+        if method == "sendMessage":
+            self.replies[int(form["text"])] += 1
+            message = {
+                "message_id": sum(self.replies.values()), "date": int(time.time()),
+                "chat": {"id": int(form["chat_id"]), "type": "private"}, "from": BOT_USER, "text": form["text"]
+            }
+            return web.json_response({"ok": True, "result": message})
+        return web.json_response({"ok": False, "error_code": 404, "description": "Not Found"}, status=404)
+
+
+def instance(base_url: str, work: float, started: set):
+    """A bot and dispatcher whose handler works like a checkpoint: record, wait, reply."""
+    bot = Bot(token=TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(base_url)))
+    dp = Dispatcher(storage=MemoryStorage())
+    router = Router()
+
+    @router.message()
+    async def checkpoint(message: Message) -> None:
+        started.add(int(message.text))
+        await asyncio.sleep(work)
+        await message.answer(message.text)
+
+    dp.include_router(router)
+    return bot, dp
+
+
+async def run_start_polling(bot: Bot, dp: Dispatcher, run: float) -> float:
+    polling = asyncio.create_task(dp.start_polling(bot, handle_signals=False, polling_timeout=1))
+    await asyncio.sleep(run)
+    stopping = time.monotonic()
+    await dp.stop_polling()
+    await polling
+    # The process exits here: whatever is still running dies with it
+    for task in list(dp._handle_update_tasks):
+        task.cancel()
+    await asyncio.sleep(0)
+    stop_seconds = time.monotonic() - stopping
+    await bot.session.close()  # reopened by handlers answering after it was closed
+    return stop_seconds
+
+
+async def run_graceful(bot: Bot, dp: Dispatcher, run: float, drain_timeout: float) -> float:
+    stop = asyncio.Event()
+    asyncio.get_running_loop().call_later(run, stop.set)
+    report = await serve(bot, dp, stop, drain_timeout)
+    await bot.session.close()
+    return report["shutdown_seconds"]
+
+
+async def deploy(mode: str, args) -> None:
+    api = BotApiStandIn(args.chats)
+    app = web.Application()
+    app.router.add_post("/bot{token}/{method}", api.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    base_url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+
+    async def producer():
+        while True:
+            api.produce()
+            await asyncio.sleep(1 / args.rate)
+
+    producing = asyncio.create_task(producer())
+    started_old, started_new = set(), set()
+
+    # Old instance, stopped mid-stream
+    bot, dp = instance(base_url, args.work_ms / 1000, started_old)
+    if mode == "start_polling":
+        stop_seconds = await run_start_polling(bot, dp, args.run)
+    else:
+        stop_seconds = await run_graceful(bot, dp, args.run, args.drain_timeout)
+    answered_old = sum(1 for update_id in started_old if api.replies[update_id])
+
+    # New instance takes over; messages stop arriving after a while, then it catches up
+    bot, dp = instance(base_url, args.work_ms / 1000, started_new)
+    stop = asyncio.Event()
+    taking_over = asyncio.create_task(serve(bot, dp, stop, args.drain_timeout))
+    await asyncio.sleep(args.run)
+    producing.cancel()
+    await asyncio.sleep(args.work_ms / 1000 + 2)
+    stop.set()
+    await taking_over
+    await bot.session.close()
+    await runner.cleanup()
+
+    produced = len(api.updates)
+    answered = sum(1 for update in api.updates if api.replies[update["update_id"]])
+    twice = sum(1 for count in api.replies.values() if count > 1)
+    cut_off = len(started_old) - answered_old
+    print(
+        f"{mode:<14} {produced:>8} {answered:>9} {cut_off:>8} {produced - answered:>6} "
+        f"{twice:>6} {stop_seconds:>9.2f}s"
+    )
+
+
+async def main_async(args) -> None:
+    print(f"{'mode':<14} {'produced':>8} {'answered':>9} {'cut off':>8} {'lost':>6} {'twice':>6} {'stop took':>10}")
+    for mode in ("start_polling", "graceful"):
+        await deploy(mode, args)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=200, help="messages per second")
+    parser.add_argument("--chats", type=int, default=500)
+    parser.add_argument("--work-ms", type=float, default=300, help="handler time before the reply")
+    parser.add_argument("--run", type=float, default=3, help="seconds each instance runs")
+    parser.add_argument("--drain-timeout", type=float, default=15)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
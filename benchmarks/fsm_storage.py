@@ -0,0 +1,136 @@
+"""
+Benchmark FSM storage footprint over weeks of simulated traffic.
+
+Every simulated day new users go through the journey dialog; most finish
+(state cleared), the rest abandon it at a random step, and many more only
+look (a button press reads the state of a chat with no dialog). Compared:
+
+- MemoryStorage with the dialog data the handlers kept before (carrier
+  name, checkpoint id and creation fields copied along the whole journey)
+- CompactMemoryStorage with the data kept now (creation fields dropped
+  once the journey exists), records expiring after `--ttl-hours`
+
+Memory is measured with tracemalloc after each simulated week and should
+stay flat for the compact storage.
+
+Usage:
+    python3 benchmarks/fsm_storage.py [--weeks 8] [--journeys 2000] [--lookers 5000]
+"""
+import argparse
+import asyncio
+import gc
+import random
+import sys
+import tracemalloc
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from aiogram.fsm.storage.base import StorageKey  # noqa: E402
+from aiogram.fsm.storage.memory import MemoryStorage  # noqa: E402
+
+from handlers.journey import CHECKPOINT_STATE_KEYS  # noqa: E402
+from handlers.states import JourneyStates  # noqa: E402
+from handlers.storage import CompactMemoryStorage  # noqa: E402
+
+BOT_ID = 42
+DAY = 24 * 3600
+CARRIER_IDS = [str(uuid.uuid4()) for _ in range(5)]
+CHECKPOINT_IDS = [str(uuid.uuid4()) for _ in range(6)]
+
+# Dialog steps with the data each one adds (as the handlers did before compaction)
+STEPS = [
+    (JourneyStates.choosing_carrier, lambda: {"main_message_id": random.randint(1, 10**6)}),
+    (JourneyStates.entering_departure_date, lambda: {
+        "carrier_id": random.choice(CARRIER_IDS), "carrier_name": "Ecolines"
+    }),
+    (JourneyStates.entering_departure_time, lambda: {"departure_date": "2025-06-01"}),
+    (JourneyStates.choosing_initial_timezone, lambda: {
+        "journey_id": str(uuid.uuid4()), "departure_time": "06:00", "border": "default", "current_checkpoint_index": 0
+    }),
+    (JourneyStates.checkpoint, lambda: {
+        "user_timezone": "Europe/Minsk", "current_checkpoint_id": random.choice(CHECKPOINT_IDS),
+        "checkpoint_message_id": random.randint(1, 10**6), "current_checkpoint_index": random.randint(0, 5)
+    }),
+]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+async def journey(storage, key: StorageKey, compact: bool, abandon_at: int) -> None:
+    for step, (state, added) in enumerate(STEPS):
+        if step == abandon_at:
+            return
+        await storage.set_state(key, state)
+        data = {**await storage.get_data(key), **added()}
+        if compact:
+            data.pop("carrier_name", None)
+            data.pop("current_checkpoint_id", None)
+            if state == JourneyStates.checkpoint:
+                data = {k: data[k] for k in CHECKPOINT_STATE_KEYS if k in data}
+        await storage.set_data(key, data)
+    await storage.set_state(key, None)
+    await storage.set_data(key, {})
+
+
+async def simulate(storage, clock: Clock, compact: bool, args) -> None:
+    user_id = 0
+    for week in range(1, args.weeks + 1):
+        for _ in range(7):
+            clock.now += DAY
+            for _ in range(args.journeys):
+                user_id += 1
+                key = StorageKey(bot_id=BOT_ID, chat_id=user_id, user_id=user_id)
+                abandon_at = random.randrange(1, len(STEPS)) if random.random() < args.abandon else len(STEPS)
+                await journey(storage, key, compact, abandon_at)
+            for _ in range(args.lookers):
+                user_id += 1
+                key = StorageKey(bot_id=BOT_ID, chat_id=user_id, user_id=user_id)
+                await storage.get_state(key)
+                await storage.get_data(key)
+
+        gc.collect()
+        size, _ = tracemalloc.get_traced_memory()
+        line = f"  week {week:>2}: {size / 2**20:>7.1f} MiB"
+        if isinstance(storage, CompactMemoryStorage):
+            report = storage.report()
+            line += f"  records={report['records']} expired={report['expired']} ~{report['bytes'] / 2**20:.1f} MiB"
+        else:
+            line += f"  records={len(storage.storage)}"
+        print(line)
+
+
+async def run(args) -> None:
+    for label, compact in (("MemoryStorage, full data", False), ("CompactMemoryStorage, compact data", True)):
+        random.seed(1)
+        clock = Clock()
+        if compact:
+            storage = CompactMemoryStorage(ttl=args.ttl_hours * 3600, clock=clock)
+        else:
+            storage = MemoryStorage()
+        print(label)
+        gc.collect()
+        tracemalloc.start()
+        await simulate(storage, clock, compact, args)
+        tracemalloc.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--weeks", type=int, default=8)
+    parser.add_argument("--journeys", type=int, default=2_000, help="new journeys per day")
+    parser.add_argument("--lookers", type=int, default=5_000, help="chats per day that only press buttons")
+    parser.add_argument("--abandon", type=float, default=0.3, help="share of dialogs abandoned")
+    parser.add_argument("--ttl-hours", type=float, default=72.0)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
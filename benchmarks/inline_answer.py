@@ -0,0 +1,97 @@
+"""
+Benchmark inline query answer construction.
+
+Builds a synthetic border status (live estimates, weekly summary, carrier
+rows), pre-renders inline results once like the BorderStatusCache listener
+does, then times what happens per inline query:
+
+- match: filter the pre-rendered results by the query text
+- answer: match and build the AnswerInlineQuery request (what the handler
+  does before awaiting it)
+- serialized: answer, then serialize it the way the aiohttp session does
+  (everything before the HTTP call to Telegram; pydantic's dump of the
+  result union dominates and grows with the number of results)
+
+Usage:
+    python3 benchmarks/inline_answer.py [--carriers 5] [--queries 5000]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from aiogram import Bot  # noqa: E402
+from aiogram.client.session.aiohttp import AiohttpSession  # noqa: E402
+from aiogram.methods import AnswerInlineQuery  # noqa: E402
+
+from analytics.live import OUTBOUND, INBOUND  # noqa: E402
+from analytics.status import BorderStatus  # noqa: E402
+from handlers.analytics import InlineStatusResults  # noqa: E402
+from utils import now_utc  # noqa: E402
+
+
+def synthetic_status(carriers: int) -> BorderStatus:
+    """Border status with `carriers` carrier rows."""
+    estimate = {
+        "active": 12, "active_median_seconds": 5400.0,
+        "recent": 30, "recent_median_seconds": 7800.0, "estimate_seconds": 7800.0
+    }
+    return BorderStatus(
+        live={OUTBOUND: estimate, INBOUND: {**estimate, "estimate_seconds": None}},
+        trend={OUTBOUND: 600.0, INBOUND: None},
+        summary={"journeys": 420, "avg_seconds": 8000.0, "median_seconds": 7600.0, "p90_seconds": 12600.0},
+        summary_days=7,
+        carriers=[
+            {
+                "carrier_id": f"carrier-{i}", "name": f"Перевозчик {i}", "count": 100 + i,
+                "mean_seconds": 8000.0, "median_seconds": 7000.0 + 60 * i, "p90_seconds": 12000.0 + 60 * i
+            }
+            for i in range(carriers)
+        ],
+        latest=[],
+        computed_at=now_utc()
+    )
+
+
+def timed(label: str, queries: int, func) -> None:
+    started = time.perf_counter()
+    for i in range(queries):
+        func(i)
+    per_query = (time.perf_counter() - started) / queries
+    print(f"{label:<28} {per_query * 1e6:>10.1f} us/query")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--carriers", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=5_000)
+    args = parser.parse_args()
+
+    results = InlineStatusResults()
+    status = synthetic_status(args.carriers)
+    started = time.perf_counter()
+    results.rebuild(status)
+    print(f"Pre-render {args.carriers + 1} results (once per status): {(time.perf_counter() - started) * 1e3:.2f} ms")
+
+    texts = ["", "перевозчик 1", "7", "нет такого"]
+
+    def answer(i: int) -> AnswerInlineQuery:
+        return AnswerInlineQuery(
+            inline_query_id=str(i),
+            results=results.match(texts[i % len(texts)]),
+            cache_time=60,
+            is_personal=False
+        )
+
+    # Serialized offline: the bot is never started and no request is sent
+    session = AiohttpSession()
+    bot = Bot(token="42:TEST", session=session)
+
+    timed("match", args.queries, lambda i: results.match(texts[i % len(texts)]))
+    timed("answer", args.queries, answer)
+    timed("answer + serialized", args.queries, lambda i: session.build_form_data(bot, answer(i)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark PostgREST throughput through the pooled transport.
+
+Runs against a local PostgREST stand-in (a threaded HTTP server answering
+every request with a small JSON body after a fixed delay), so it measures
+the client side: connection reuse, pool limits and worker threads.
+
+Usage:
+    python3 benchmarks/postgrest_pool.py [--latency-ms 5] [--requests 3]
+"""
+import argparse
+import asyncio
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from postgrest import SyncPostgrestClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from database.transport import PooledTransport, create_pooled_session  # noqa: E402
+
+BODY = json.dumps([{"id": "00000000-0000-0000-0000-000000000001", "name": "FlixBus"}]).encode()
+
+
+def start_stand_in(latency: float) -> ThreadingHTTPServer:
+    """Start a PostgREST stand-in on a free local port."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            # postgrest-py sends a JSON body even with GET; drain it for keep-alive
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(BODY)))
+            self.end_headers()
+            self.wfile.write(BODY)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    server.request_queue_size = 2048
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def run_users(client: SyncPostgrestClient, executor: ThreadPoolExecutor, users: int, requests: int) -> float:
+    """Run `users` concurrent users doing `requests` sequential reads each; return req/s."""
+    loop = asyncio.get_running_loop()
+
+    async def user():
+        for _ in range(requests):
+            query = client.from_("carriers").select("*")
+            await loop.run_in_executor(executor, query.execute)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(users)))
+    return users * requests / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="stand-in response delay")
+    parser.add_argument("--requests", type=int, default=3, help="requests per user")
+    parser.add_argument("--pool-size", type=int, default=20)
+    args = parser.parse_args()
+
+    server = start_stand_in(args.latency_ms / 1000)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    print(f"PostgREST stand-in at {base_url}, latency {args.latency_ms:.0f} ms\n")
+    print(f"{'users':>6} | {'default client':>15} | {'pooled':>10} | pool metrics")
+    print("-" * 100)
+
+    for users in (10, 100, 1000):
+        # Default: library session, default executor
+        default_client = SyncPostgrestClient(base_url)
+        with ThreadPoolExecutor() as executor:
+            default_rps = asyncio.run(run_users(default_client, executor, users, args.requests))
+        default_client.session.close()
+
+        # Pooled: explicit transport, one worker thread per connection
+        transport = PooledTransport(pool_size=args.pool_size, keepalive_connections=args.pool_size)
+        pooled_client = SyncPostgrestClient(base_url)
+        pooled_client.session.close()
+        pooled_client.session = create_pooled_session(base_url, {}, transport)
+        with ThreadPoolExecutor(max_workers=args.pool_size) as executor:
+            pooled_rps = asyncio.run(run_users(pooled_client, executor, users, args.requests))
+        metrics = transport.metrics()
+        pooled_client.session.close()
+
+        print(
+            f"{users:>6} | {default_rps:>11.0f} r/s | {pooled_rps:>6.0f} r/s | "
+            f"active={metrics['active_connections']} idle={metrics['idle_connections']} "
+            f"wait avg={metrics['wait_avg_ms']:.2f} ms max={metrics['wait_max_ms']:.2f} ms"
+        )
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Benchmark per-update routing cost: filter chain vs dispatch table.
+
+Builds two dispatchers with no-op handlers laid out like the journey and
+analytics routers, and feeds them the same updates offline (no request is
+sent to Telegram):
+
+- filter chain: buttons and callbacks as `F.text == ...` /
+  `F.data.startswith(...)` handlers between the state handlers, checked
+  one by one by aiogram (the layout before handlers/dispatch.py)
+- dispatch table: the same buttons and callbacks in a DispatchTable whose
+  router goes first, state handlers after it
+
+Everything between the update reaching the dispatcher and the handler
+being called is measured: outer middlewares (FSM context), filters, and
+handler invocation.
+
+Usage:
+    python3 benchmarks/routing.py [--updates 5000]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from aiogram import Bot, Dispatcher, F, Router  # noqa: E402
+from aiogram.filters import Command  # noqa: E402
+from aiogram.fsm.storage.base import StorageKey  # noqa: E402
+from aiogram.fsm.storage.memory import MemoryStorage  # noqa: E402
+from aiogram.types import Update  # noqa: E402
+
+from handlers.dispatch import DispatchTable  # noqa: E402
+from handlers.states import JourneyStates  # noqa: E402
+
+USER_ID = 1
+BUTTONS = ["🆕 Новая поездка", "🌍 Сменить таймзону", "❌ Отменить поездку", "📊 Статистика", "⏰ Ввести время"]
+
+calls = 0
+
+
+async def handled(*args, **kwargs) -> None:
+    global calls
+    calls += 1
+
+
+def state_handlers(router: Router) -> None:
+    router.message(JourneyStates.choosing_carrier)(handled)
+    router.message(JourneyStates.entering_departure_date)(handled)
+    router.message(JourneyStates.entering_departure_time)(handled)
+    router.message(JourneyStates.choosing_initial_timezone)(handled)
+    router.message(JourneyStates.changing_timezone)(handled)
+
+
+def filter_chain() -> Dispatcher:
+    dp = Dispatcher(storage=MemoryStorage())
+    router = Router()
+    router.message(Command("start"))(handled)
+    router.message(Command("new"))(handled)
+    router.message(F.text == BUTTONS[0])(handled)
+    state_handlers(router)
+    router.message(F.text == BUTTONS[1])(handled)
+    router.message(JourneyStates.checkpoint)(handled)
+    router.message(Command("cancel"))(handled)
+    router.message(F.text == BUTTONS[2])(handled)
+    router.message(Command("stats"))(handled)
+    router.message(F.text == BUTTONS[3])(handled)
+    router.message(F.text == BUTTONS[4])(handled)
+    router.callback_query(F.data.startswith("cal_"))(handled)
+    router.callback_query(F.data.startswith("time_"))(handled)
+    router.callback_query(F.data == "confirm_cancel_yes")(handled)
+    router.callback_query(F.data == "confirm_cancel_no")(handled)
+    dp.include_router(router)
+    return dp
+
+
+def dispatch_table() -> Dispatcher:
+    dp = Dispatcher(storage=MemoryStorage())
+    table = DispatchTable()
+    table.button(*BUTTONS)(handled)
+    table.callback("confirm_cancel_yes", "confirm_cancel_no")(handled)
+    table.callback(prefix="cal_")(handled)
+    table.callback(prefix="time_")(handled)
+    router = Router()
+    router.message(Command("start"))(handled)
+    router.message(Command("new"))(handled)
+    state_handlers(router)
+    router.message(JourneyStates.checkpoint)(handled)
+    router.message(Command("cancel"))(handled)
+    router.message(Command("stats"))(handled)
+    dp.include_router(table.router())
+    dp.include_router(router)
+    return dp
+
+
+def message_update(update_id: int, text: str) -> Update:
+    chat = {"id": USER_ID, "type": "private"}
+    user = {"id": USER_ID, "is_bot": False, "first_name": "Test"}
+    return Update.model_validate({
+        "update_id": update_id,
+        "message": {"message_id": update_id, "date": datetime.now(), "chat": chat, "from": user, "text": text}
+    })
+
+
+def callback_update(update_id: int, data: str) -> Update:
+    chat = {"id": USER_ID, "type": "private"}
+    user = {"id": USER_ID, "is_bot": False, "first_name": "Test"}
+    return Update.model_validate({
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id), "from": user, "chat_instance": "1", "data": data,
+            "message": {"message_id": 1, "date": datetime.now(), "chat": chat, "text": "..."}
+        }
+    })
+
+
+CASES = [
+    # (label, FSM state, update factory)
+    ("button: new journey", None, lambda i: message_update(i, BUTTONS[0])),
+    ("button: statistics", None, lambda i: message_update(i, BUTTONS[3])),
+    ("button: enter time", JourneyStates.checkpoint, lambda i: message_update(i, BUTTONS[4])),
+    ("checkpoint time input", JourneyStates.checkpoint, lambda i: message_update(i, "14:30")),
+    ("callback: calendar", None, lambda i: callback_update(i, "cal_day_2025_06_01")),
+    ("callback: confirm cancel", None, lambda i: callback_update(i, "confirm_cancel_no")),
+]
+
+
+async def route(dp: Dispatcher, bot: Bot, state, make_update, updates: int) -> float:
+    await dp.storage.set_state(StorageKey(bot_id=bot.id, chat_id=USER_ID, user_id=USER_ID), state)
+    batch = [make_update(i) for i in range(updates)]
+    started = time.perf_counter()
+    for update in batch:
+        await dp.feed_update(bot, update)
+    return (time.perf_counter() - started) / updates
+
+
+async def run(updates: int) -> None:
+    global calls
+    # Offline: the bot is never started and handlers send nothing
+    bot = Bot(token="42:TEST")
+    dispatchers = {"filter chain": filter_chain(), "dispatch table": dispatch_table()}
+
+    print(f"{'update':<28}" + "".join(f"{name:>18}" for name in dispatchers))
+    for label, state, make_update in CASES:
+        row = f"{label:<28}"
+        for dp in dispatchers.values():
+            calls = 0
+            per_update = await route(dp, bot, state, make_update, updates)
+            assert calls == updates, f"{label}: {calls} of {updates} updates handled"
+            row += f"{per_update * 1e6:>13.1f} us/u"
+        print(row)
+    await bot.session.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--updates", type=int, default=5_000)
+    args = parser.parse_args()
+    asyncio.run(run(args.updates))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Benchmark typed row models against raw dict rows.
+
+Builds synthetic journey-event rows in the shape get_journey_events
+returns (timestamps as ISO strings, checkpoint embedded as `checkpoints`)
+and compares:
+
+- memory: a result set kept as dicts of every column (`select *`), as dicts
+  of the projected columns, and as JourneyEvent models
+- convert: building the models from projected rows (paid once, at the
+  DataLoader)
+- render: the handlers' history/summary loop over the events (time shown,
+  duration since the previous event), parsing timestamps from dict rows
+  on every access vs reading the already parsed model attributes
+
+Usage:
+    python3 benchmarks/row_models.py [--rows 100000]
+"""
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from database.models import JourneyEvent, JOURNEY_EVENT_COLUMNS, CHECKPOINT_COLUMNS  # noqa: E402
+from utils import parse_db_timestamp, format_datetime_for_user  # noqa: E402
+
+CHECKPOINTS = [
+    {
+        "id": str(uuid.uuid4()), "name": name, "type": "mandatory", "order_index": i + 1,
+        "required": True, "border": "default", "description": None,
+        "created_at": "2025-01-01T00:00:00+00:00"
+    }
+    for i, name in enumerate([
+        "approaching_border", "entering_checkpoint_1", "passed_passport_control_1",
+        "entering_checkpoint_2", "passed_passport_control_2", "leaving_checkpoint_2"
+    ])
+]
+
+
+def full_rows(n: int):
+    """Rows of `select *, checkpoints(*)`: every column, a fresh embedded dict per row."""
+    journey_id = str(uuid.uuid4())
+    start = datetime(2025, 6, 1, 6, 0, tzinfo=timezone.utc)
+    rows = []
+    for i in range(n):
+        if i % len(CHECKPOINTS) == 0:
+            journey_id = str(uuid.uuid4())
+        rows.append({
+            "id": str(uuid.uuid4()), "journey_id": journey_id,
+            "checkpoint_id": CHECKPOINTS[i % len(CHECKPOINTS)]["id"],
+            "timestamp_utc": (start + timedelta(minutes=7 * i)).isoformat(),
+            "source": "manual", "user_timezone": "Europe/Minsk", "lat": None, "lon": None,
+            "created_at": (start + timedelta(minutes=7 * i, seconds=3)).isoformat(),
+            "checkpoints": dict(CHECKPOINTS[i % len(CHECKPOINTS)])
+        })
+    return rows
+
+
+def project(rows):
+    return [
+        {
+            **{column: row[column] for column in JOURNEY_EVENT_COLUMNS},
+            "checkpoints": {column: row["checkpoints"][column] for column in CHECKPOINT_COLUMNS}
+        }
+        for row in rows
+    ]
+
+
+def measure(label: str, build) -> object:
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28} {size / 2**20:>8.1f} MiB  {size / len(result):>6.0f} B/row")
+    return result
+
+
+def render_dicts(events) -> int:
+    lines = 0
+    for i, event in enumerate(events):
+        format_datetime_for_user(
+            parse_db_timestamp(event["timestamp_utc"]), event.get("user_timezone") or "Europe/Minsk"
+        )
+        if i:
+            parse_db_timestamp(event["timestamp_utc"]) - parse_db_timestamp(events[i - 1]["timestamp_utc"])
+        event["checkpoints"]["name"]
+        lines += 1
+    return lines
+
+
+def render_models(events) -> int:
+    lines = 0
+    for i, event in enumerate(events):
+        format_datetime_for_user(event.timestamp_utc, event.user_timezone or "Europe/Minsk")
+        if i:
+            event.timestamp_utc - events[i - 1].timestamp_utc
+        event.checkpoint_name
+        lines += 1
+    return lines
+
+
+def timed(label: str, rows: int, func) -> None:
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {elapsed * 1e3:>8.1f} ms   {elapsed / rows * 1e6:>6.2f} us/row")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    source = full_rows(args.rows)
+    projected = project(source)
+
+    print(f"Memory of {args.rows} rows:")
+    measure("dict (select *)", lambda: full_rows(args.rows))
+    measure("dict (projected)", lambda: project(source))
+    models = measure("JourneyEvent", lambda: [JourneyEvent.from_row(row) for row in projected])
+
+    print("\nThroughput:")
+    timed("convert to JourneyEvent", args.rows, lambda: [JourneyEvent.from_row(row) for row in projected])
+    timed("render from dicts", args.rows, lambda: render_dicts(projected))
+    timed("render from models", args.rows, lambda: render_models(models))
+
+
+if __name__ == "__main__":
+    main()
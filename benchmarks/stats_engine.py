@@ -0,0 +1,136 @@
+"""
+Benchmark the vectorized statistics engine against the per-row Python path.
+
+Generates synthetic completed journeys (one event per mandatory checkpoint)
+and computes per-carrier count, mean, median, p90 and a duration histogram
+both ways:
+
+- per-row: timestamps parsed one by one with parse_db_timestamp, durations
+  grouped in dicts, statistics module for aggregates (what the handlers did)
+- engine: rows loaded into columnar arrays (EventArrays), reduced to
+  journeys and aggregated per carrier in NumPy
+
+Usage:
+    python3 benchmarks/stats_engine.py [--journeys 100000] [--carriers 5]
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from analytics.engine import DURATION_BINS_MINUTES, JourneyArrays, compute_carrier_stats  # noqa: E402
+from analytics.events import EventArrays  # noqa: E402
+from utils import parse_db_timestamp  # noqa: E402
+
+EVENTS_PER_JOURNEY = 6
+
+
+def generate(journeys: int, carriers: int):
+    """Same events twice: DB-shaped rows (ISO strings) and analytics rows (epoch seconds)."""
+    rng = random.Random(42)
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    db_rows, analytics_rows = [], []
+    for j in range(journeys):
+        journey_id = f"journey-{j}"
+        carrier_id = f"carrier-{j % carriers}"
+        ts = start + timedelta(seconds=rng.uniform(0, 90 * 86400))
+        for checkpoint in range(EVENTS_PER_JOURNEY):
+            ts += timedelta(seconds=rng.expovariate(1 / 1800))
+            db_rows.append({
+                "journey_id": journey_id,
+                "carrier_id": carrier_id,
+                "checkpoint_id": f"checkpoint-{checkpoint}",
+                "timestamp_utc": ts.replace(tzinfo=None).isoformat()
+            })
+            analytics_rows.append({
+                "journey_id": journey_id,
+                "carrier_id": carrier_id,
+                "checkpoint_id": f"checkpoint-{checkpoint}",
+                "ts": ts.timestamp()
+            })
+    return db_rows, analytics_rows
+
+
+def per_row(rows):
+    """Per-carrier statistics with per-row timestamp parsing and Python loops."""
+    bounds = {}
+    for row in rows:
+        ts = parse_db_timestamp(row["timestamp_utc"])
+        key = row["journey_id"]
+        if key not in bounds:
+            bounds[key] = [row["carrier_id"], ts, ts, 0]
+        entry = bounds[key]
+        entry[1] = min(entry[1], ts)
+        entry[2] = max(entry[2], ts)
+        entry[3] += 1
+
+    durations = defaultdict(list)
+    for carrier_id, first, last, count in bounds.values():
+        if count >= 2:
+            durations[carrier_id].append((last - first).total_seconds())
+
+    result = {}
+    for carrier_id, values in durations.items():
+        histogram = [0] * len(DURATION_BINS_MINUTES)
+        for value in values:
+            b = max(i for i, edge in enumerate(DURATION_BINS_MINUTES) if value / 60 >= edge)
+            histogram[b] += 1
+        result[carrier_id] = {
+            "count": len(values),
+            "mean": statistics.fmean(values),
+            "median": statistics.median(values),
+            "p90": statistics.quantiles(values, n=10, method="inclusive")[-1],
+            "histogram": histogram
+        }
+    return result
+
+
+def engine(rows):
+    """Per-carrier statistics through the columnar engine."""
+    journeys = JourneyArrays.from_events(EventArrays.from_rows(rows))
+    return compute_carrier_stats(journeys)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--journeys", type=int, default=100_000)
+    parser.add_argument("--carriers", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"Generating {args.journeys} journeys ({args.journeys * EVENTS_PER_JOURNEY} events)...")
+    db_rows, analytics_rows = generate(args.journeys, args.carriers)
+
+    started = time.perf_counter()
+    expected = per_row(db_rows)
+    per_row_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    events = EventArrays.from_rows(analytics_rows)
+    load_time = time.perf_counter() - started
+    started = time.perf_counter()
+    stats = compute_carrier_stats(JourneyArrays.from_events(events))
+    compute_time = time.perf_counter() - started
+
+    # Same answers, up to float rounding of epoch seconds
+    for carrier_id, row in expected.items():
+        c = stats.carriers.index(carrier_id)
+        assert stats.count[c] == row["count"]
+        assert abs(stats.median_seconds[c] - row["median"]) < 1e-3
+        assert abs(stats.p90_seconds[c] - row["p90"]) < 1e-3
+        assert list(stats.histogram[c]) == row["histogram"]
+
+    engine_time = load_time + compute_time
+    print(f"{'path':<22} {'seconds':>8} {'journeys/s':>12}")
+    print(f"{'per-row':<22} {per_row_time:>8.2f} {args.journeys / per_row_time:>12,.0f}")
+    print(f"{'engine (load+compute)':<22} {engine_time:>8.2f} {args.journeys / engine_time:>12,.0f}")
+    print(f"{'engine (compute only)':<22} {compute_time:>8.2f} {args.journeys / compute_time:>12,.0f}")
+    print(f"Speedup: {per_row_time / engine_time:.1f}x end to end, {per_row_time / compute_time:.0f}x on arrays")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,33 @@
 """Main bot entry point."""
-import asyncio
-import logging
-from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
+import time
 
-from config import settings
-from handlers import journey_router
+STARTED = time.perf_counter()  # before the imports below: the startup profile counts them
+
+import asyncio  # noqa: E402
+import logging  # noqa: E402
+import signal  # noqa: E402
+from typing import Any, Dict, Optional  # noqa: E402
+
+from aiogram import Bot, Dispatcher  # noqa: E402
+from aiogram.fsm.storage.base import BaseStorage  # noqa: E402
+
+from config import settings  # noqa: E402
+from lifecycle import StartupProfile, serve  # noqa: E402
+from analytics import analytics_cache, live_border, forecast, border_status  # noqa: E402
+from database import db, journal, sweeper, reference, changes  # noqa: E402
+from handlers import (  # noqa: E402
+    dispatch_router,
+    journey_router,
+    analytics_router,
+    errors_router,
+    inline_results,
+    BoardPublisher,
+    parse_chat_ids,
+    UserSequencingMiddleware,
+    DataLoaderMiddleware,
+    CompactMemoryStorage,
+    create_storage
+)
 
 # Configure logging
 logging.basicConfig(
@@ -19,24 +41,165 @@ if settings.environment == "development":
     logging.getLogger("aiogram").setLevel(logging.DEBUG)
 
 
+def create_dispatcher(storage: BaseStorage) -> Dispatcher:
+    """Dispatcher with the bot's middlewares and routers."""
+    dp = Dispatcher(storage=storage)
+
+    # One update at a time per user (double taps must not race), users in parallel
+    dp.update.outer_middleware(UserSequencingMiddleware())
+    # Reads repeated while one update is handled hit the database once
+    dp.update.outer_middleware(DataLoaderMiddleware(db, journal, reference))
+
+    # Register routers; buttons and callbacks are resolved by a lookup before any filter chain
+    dp.include_router(dispatch_router)
+    dp.include_router(journey_router)
+    dp.include_router(analytics_router)
+    dp.include_router(errors_router)
+    return dp
+
+
+def on_reference_change(change: Dict[str, Any]) -> None:
+    """A carrier or checkpoint was added, edited or deleted."""
+    if change["table"] == "carriers":
+        db.invalidate("get_carriers")
+        db.invalidate("get_carrier_by_id", change["id"])
+    else:
+        db.invalidate("get_mandatory_checkpoints")
+        db.invalidate("get_checkpoint_by_id", change["id"])
+    # Rebuilds the checkpoint sequences if anything differs
+    reference.refresh_soon()
+
+
+def on_journey_change(change: Dict[str, Any]) -> None:
+    """A journey was started, completed, cancelled, flagged or deleted."""
+    db.invalidate("get_journey", change["id"])
+    db.invalidate("get_user_active_journey", change["user_id"])
+    if change["cancelled"] or change["op"] == "DELETE":
+        live_border.discard(change["id"])
+    if change["cancelled"] or change["anomalous"] or change["op"] == "DELETE":
+        # Flagged by scripts/score_anomalies.py or cancelled after completion
+        forecast.discard(change["id"])
+    if change["completed"] and change["op"] != "INSERT":
+        # Statistics count completed journeys
+        analytics_cache.invalidate()
+
+
+def on_changes_missed() -> None:
+    """Reconnected to the change notifications: anything may have changed meanwhile."""
+    db.invalidate()
+    reference.refresh_soon()
+    analytics_cache.invalidate()
+
+
+async def start_services(
+    bot: Bot,
+    primary: bool = True,
+    profile: Optional[StartupProfile] = None
+) -> Optional[BoardPublisher]:
+    """
+    Start background services; returns the board publisher, if any.
+
+    With several worker processes only the primary one sweeps abandoned
+    journeys and edits the channel board. Each step is timed in `profile`,
+    logged as "Startup: ..." at the end.
+    """
+    profile = profile or StartupProfile()
+
+    # Carriers and checkpoints from the local snapshot, refreshed in the background
+    await reference.start()
+    profile.mark("reference data")
+
+    # Changes made by other instances or by hand drop exactly the cached rows they touch
+    if settings.change_notifications and settings.supabase_direct_url:
+        changes.add_listener("carriers", on_reference_change)
+        changes.add_listener("checkpoints", on_reference_change)
+        changes.add_listener("journeys", on_journey_change)
+        changes.add_resync_listener(on_changes_missed)
+        await changes.start()
+
+    # Live "border now" estimate: fed by every recorded event, seeded from the database
+    journal.add_listener(live_border.observe_event)
+    try:
+        await live_border.load()
+    except Exception as e:
+        logger.warning(f"Live border estimate starts empty: {e}")
+    profile.mark("live border")
+
+    # Hour-of-week forecast: saved histograms plus journeys completed since
+    try:
+        await forecast.start()
+    except Exception as e:
+        logger.warning(f"Border forecast starts empty: {e}")
+    profile.mark("forecast")
+
+    # Deliver checkpoint events left over from a previous run
+    await journal.start()
+    profile.mark("journal")
+
+    # Close journeys users abandoned mid-border
+    if primary:
+        sweeper.add_listener(live_border.discard)
+        await sweeper.start()
+
+    # Border status for inline mode and the channel board, refreshed in the background
+    border_status.add_listener(inline_results.rebuild)
+    board = None
+    if primary and settings.board_chat_ids:
+        board = BoardPublisher(bot, parse_chat_ids(settings.board_chat_ids), settings.board_edit_interval)
+        border_status.add_listener(board.update)
+        await board.start()
+    await border_status.start()
+    profile.mark("background services")
+    logger.info(f"Startup: {profile.report()}")
+    return board
+
+
+async def stop_services(board: Optional[BoardPublisher]) -> None:
+    """Stop background services and flush what they keep in memory."""
+    await border_status.stop()
+    await changes.stop()
+    await reference.stop()
+    await sweeper.stop()
+    if board:
+        await board.stop()
+    await journal.stop(timeout=settings.shutdown_flush_timeout)
+    await forecast.save()
+    await db.close()
+
+
 async def main():
     """Start the bot."""
+    profile = StartupProfile(STARTED)
+    profile.mark("imports")
+    if settings.bot_workers > 1:
+        from supervisor import Supervisor
+        await Supervisor(settings.bot_workers).run()
+        return
+
     # Initialize bot and dispatcher
     bot = Bot(token=settings.telegram_bot_token)
-    storage = MemoryStorage()
-    dp = Dispatcher(storage=storage)
-
-    # Register routers
-    dp.include_router(journey_router)
+    storage = create_storage()
+    dp = create_dispatcher(storage)
 
     # Log startup
     logger.info("Starting Granica Bot...")
     logger.info(f"Environment: {settings.environment}")
 
-    # Start polling
+    board = await start_services(bot, profile=profile)
+
+    # SIGTERM (deploys) and SIGINT stop fetching updates; running handlers get to finish
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
     try:
-        await dp.start_polling(bot)
+        await serve(bot, dp, stop, settings.shutdown_drain_timeout)
     finally:
+        # Handlers are done: deliver their journaled events, save the forecast
+        await stop_services(board)
+        if isinstance(storage, CompactMemoryStorage):
+            logger.info(f"FSM storage: {storage.report()}")
         await bot.session.close()
 
 
@@ -45,4 +208,3 @@ if __name__ == "__main__":
         asyncio.run(main())
     except (KeyboardInterrupt, SystemExit):
         logger.info("Bot stopped")
-
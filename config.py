@@ -9,9 +9,87 @@ class Settings(BaseSettings):
     telegram_bot_token: str
     supabase_url: str
     supabase_key: str
-    supabase_direct_url: Optional[str] = None  # For migrations, optional
+    supabase_direct_url: Optional[str] = None  # For migrations and the postgres backend
     environment: str = "development"
 
+    # Database backend: "supabase" (PostgREST over HTTP), "postgres" (asyncpg,
+    # direct) or "sqlite" (embedded, single node)
+    database_backend: str = "supabase"
+    sqlite_path: str = "data/granica.sqlite3"
+
+    # Database resilience
+    db_timeout: float = 5.0  # Seconds per database call
+    db_read_retries: int = 2
+    db_breaker_threshold: int = 5  # Consecutive failures before failing fast
+    db_breaker_reset_timeout: float = 30.0  # Seconds before a trial call
+    db_max_concurrency: int = 20
+    db_max_pending: int = 100  # Calls allowed to wait before shedding load
+
+    # PostgREST HTTP transport
+    db_pool_size: int = 20  # Max connections (and worker threads)
+    db_keepalive_connections: int = 10
+    db_keepalive_expiry: float = 30.0
+    db_http2: bool = True
+    db_connect_timeout: float = 5.0
+
+    # Carriers and checkpoints: served from memory, saved locally for fast restarts
+    reference_snapshot_path: str = "data/reference.json"
+    reference_refresh_interval: float = 600.0  # Seconds between reloads from the database
+    # Drop cached rows changed elsewhere as soon as Postgres reports it
+    # (LISTEN over SUPABASE_DIRECT_URL, migration 012)
+    change_notifications: bool = True
+
+    # Local write-ahead journal for checkpoint events
+    journal_path: str = "data/journal.sqlite3"
+    journal_flush_interval: float = 2.0  # Seconds between flush attempts
+    journal_batch_size: int = 50
+    journal_max_attempts: int = 5  # Rejections before an event is moved to the dead-letter table
+
+    # Shutdown (SIGTERM/SIGINT): keep the sum below the platform's stop grace period
+    shutdown_drain_timeout: float = 15.0  # Seconds running handlers get to finish
+    shutdown_flush_timeout: float = 10.0  # Seconds for the last journal flush
+
+    # Journeys without events this long are closed as abandoned
+    abandoned_journey_hours: float = 48.0
+    abandoned_sweep_interval: float = 3600.0  # Seconds between sweeps
+    abandoned_sweep_batch_size: int = 500
+
+    # FSM state of users idle this long is dropped (longer than the journey horizon)
+    fsm_state_ttl_hours: float = 72.0
+    fsm_max_records: int = 100_000  # Least recently used states evicted above this
+    fsm_storage_url: str = ""  # redis://... to share FSM state between processes, empty for memory
+
+    # Worker processes: >1 runs a supervisor that polls Telegram and routes
+    # each update to a worker by chat id
+    bot_workers: int = 1
+    worker_heartbeat_interval: float = 5.0  # Seconds between worker heartbeats
+    worker_timeout: float = 60.0  # Workers silent this long are restarted
+
+    # Batch analytics (segment matrix)
+    analytics_window_days: int = 90
+    analytics_cache_ttl: float = 900.0  # Seconds before recomputing
+    anomaly_threshold: float = 5.0  # Robust z-score (median/MAD) of a segment
+    anomaly_min_samples: int = 20  # Segment baselines with fewer samples are not used
+
+    # Live "border now" estimate
+    live_stale_hours: float = 6.0  # Active journeys without events this long are dropped
+    live_recent_hours: float = 3.0  # Finished crossings counted as recent
+
+    # Hour-of-week border forecast (time picker annotations)
+    forecast_path: str = "data/forecast.npz"
+    forecast_window_days: int = 365  # Rebuilt from this window when there is no saved file
+    forecast_min_samples: int = 5  # Cells with fewer journeys fall back to coarser ones
+    forecast_save_interval: float = 300.0  # Seconds between saves
+
+    # Shared border status (inline mode)
+    status_refresh_interval: float = 60.0  # Seconds between recomputations
+    inline_cache_time: int = 60  # Seconds Telegram may cache inline answers
+    status_trend_minutes: int = 60  # Live estimate compared with this long ago
+
+    # Public border board: one message per channel, edited in place
+    board_chat_ids: str = ""  # Comma-separated channel ids or @usernames, empty to disable
+    board_edit_interval: float = 60.0  # Min seconds between edits of the board
+
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
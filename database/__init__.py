@@ -1,5 +1,47 @@
 """Database package."""
-from .db import db, Database
-
-__all__ = ["db", "Database"]
+from .base import Database, DEFAULT_BORDER
+from .db import db, SupabaseDatabase, LazyDatabase, create_database
+from .reference import reference, ReferenceData
+from .changes import changes, ChangeListener
+from .checkpoints import checkpoint_sequences, CheckpointSequence, CheckpointSequences
+from .journal import journal, EventJournal
+from .loader import DataLoader
+from .sweeper import sweeper, AbandonedJourneySweeper
+from .models import Carrier, Checkpoint, Journey, JourneyEvent
+from .resilience import (
+    ResilientDatabase,
+    CircuitBreaker,
+    DatabaseUnavailableError,
+    CircuitOpenError,
+    DatabaseOverloadedError
+)
 
+__all__ = [
+    "db",
+    "Database",
+    "DEFAULT_BORDER",
+    "SupabaseDatabase",
+    "LazyDatabase",
+    "create_database",
+    "reference",
+    "ReferenceData",
+    "changes",
+    "ChangeListener",
+    "checkpoint_sequences",
+    "CheckpointSequence",
+    "CheckpointSequences",
+    "journal",
+    "EventJournal",
+    "DataLoader",
+    "sweeper",
+    "AbandonedJourneySweeper",
+    "Carrier",
+    "Checkpoint",
+    "Journey",
+    "JourneyEvent",
+    "ResilientDatabase",
+    "CircuitBreaker",
+    "DatabaseUnavailableError",
+    "CircuitOpenError",
+    "DatabaseOverloadedError"
+]
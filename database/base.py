@@ -0,0 +1,176 @@
+"""Abstract database interface shared by all storage backends."""
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Optional, List, Dict, Any
+
+# Border crossing of checkpoints and journeys that predate crossings (migration 010)
+DEFAULT_BORDER = "default"
+
+
+class Database(ABC):
+    """
+    Database interface used by handlers.
+
+    Backends return plain dict rows shaped like PostgREST responses: ids and
+    timestamps as strings (UTC, no offset), embedded relations as nested
+    dicts (`checkpoints`, `carriers`, `journey_events`).
+    """
+
+    # Errors meaning the backend answered (constraint, bad input) rather than
+    # being unreachable; see ResilientDatabase
+    non_transient_errors: tuple = ()
+
+    async def close(self) -> None:
+        """Release connections held by the backend."""
+
+    # Carriers
+    @abstractmethod
+    async def get_carriers(self) -> List[Dict[str, Any]]:
+        """Get all carriers."""
+
+    @abstractmethod
+    async def get_carrier_by_id(self, carrier_id: str) -> Optional[Dict[str, Any]]:
+        """Get carrier by ID."""
+
+    # Checkpoints
+    @abstractmethod
+    async def get_mandatory_checkpoints(self) -> List[Dict[str, Any]]:
+        """Get mandatory checkpoints of all border crossings, ordered by crossing, then sequence."""
+
+    @abstractmethod
+    async def get_checkpoint_by_id(self, checkpoint_id: str) -> Optional[Dict[str, Any]]:
+        """Get checkpoint by ID."""
+
+    # Journeys
+    @abstractmethod
+    async def create_journey(
+        self,
+        user_id: int,
+        carrier_id: str,
+        departure_utc: datetime,
+        border: str = DEFAULT_BORDER,
+        journey_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Create a new journey on a border crossing.
+
+        With a client-generated `journey_id` the call is idempotent: if the
+        journey already exists (an earlier attempt did commit), it is
+        returned instead of a second one being created.
+        """
+
+    @abstractmethod
+    async def get_journey(self, journey_id: str) -> Optional[Dict[str, Any]]:
+        """Get journey by ID."""
+
+    @abstractmethod
+    async def get_journeys(self, journey_ids: List[str]) -> List[Dict[str, Any]]:
+        """Get journeys by IDs in one query (unknown IDs are skipped, order is arbitrary)."""
+
+    @abstractmethod
+    async def complete_journey(self, journey_id: str) -> Dict[str, Any]:
+        """Mark journey as completed and store its metrics.
+
+        In the same transaction sets first_event_utc, last_event_utc,
+        border_seconds (None with fewer than two events), segment_seconds
+        (checkpoint name -> seconds since the previous event, or since
+        departure for the first one) and event_count.
+        """
+
+    @abstractmethod
+    async def cancel_journey(self, journey_id: str) -> Dict[str, Any]:
+        """Mark journey as cancelled."""
+
+    @abstractmethod
+    async def set_journeys_anomalous(self, journey_ids: List[str], anomalous: bool) -> None:
+        """Set the `anomalous` flag of the given journeys."""
+
+    @abstractmethod
+    async def get_user_active_journey(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Get user's active (incomplete) journey."""
+
+    # Journey Events
+    @abstractmethod
+    async def create_journey_event(
+        self,
+        journey_id: str,
+        checkpoint_id: str,
+        timestamp_utc: datetime,
+        source: str = "manual",
+        user_timezone: str = "Europe/Minsk",
+        lat: Optional[float] = None,
+        lon: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Create a journey event (checkpoint timestamp)."""
+
+    @abstractmethod
+    async def upsert_journey_events(self, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Insert a batch of journey events, skipping ones already stored.
+
+        UNIQUE(journey_id, checkpoint_id) is used as the idempotency key, so
+        the same batch can be safely retried.
+        """
+
+    @abstractmethod
+    async def backfill_journey_metrics(self, batch_size: int = 500) -> int:
+        """Compute metrics of up to `batch_size` completed journeys that have none.
+
+        Returns the number of journeys processed; call until it returns 0.
+        """
+
+    @abstractmethod
+    async def close_abandoned_journeys(self, before: datetime, batch_size: int = 500) -> List[str]:
+        """Close up to `batch_size` incomplete journeys abandoned before `before`.
+
+        A journey is abandoned when it was created and departed before
+        `before` and has no event at or after it. Closed journeys are
+        marked cancelled (notes 'Abandoned'). Returns their ids; call until
+        fewer than `batch_size` come back.
+        """
+
+    @abstractmethod
+    async def get_journey_events(self, journey_id: str) -> List[Dict[str, Any]]:
+        """Get all events for a journey, ordered by timestamp."""
+
+    @abstractmethod
+    async def load_analytics_events(self, since: datetime) -> List[Dict[str, Any]]:
+        """Load events of completed, not cancelled journeys that ended after `since`.
+
+        Rows: journey_id, carrier_id, checkpoint_id, ts (epoch seconds), anomalous.
+        Not a `get_*` read on purpose: results are large, so ResilientDatabase
+        neither retries nor caches them; the analytics layer caches its own
+        aggregates instead.
+        """
+
+    @abstractmethod
+    async def load_journey_stat_changes(self, since: datetime) -> List[Dict[str, Any]]:
+        """Load journeys whose statistics changed at or after `since` (database clock).
+
+        Rows: journey_id, carrier_id, departure_utc, end_utc, duration_seconds,
+        direction, changed_at, counted. `counted` is whether the journey is in
+        the statistics now (completed, not cancelled, not anomalous, with a
+        duration); journeys that left them come with counted = False. Not a
+        `get_*` read, same as load_analytics_events.
+        """
+
+    @abstractmethod
+    async def get_live_border_events(self, since: datetime) -> List[Dict[str, Any]]:
+        """Get events recorded after `since` of journeys that are not cancelled.
+
+        Rows: journey_id, checkpoint_id, timestamp_utc, user_timezone, completed.
+        """
+
+    @abstractmethod
+    async def get_latest_border_stats(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Get latest completed journeys with their border crossing duration.
+
+        Rows: journey_id, carrier, start_utc, end_utc, duration_seconds.
+        Journeys with fewer than two events have no duration and are skipped.
+        """
+
+    @abstractmethod
+    async def get_border_duration_summary(self, since: datetime) -> Dict[str, Any]:
+        """Get duration aggregates of completed journeys that ended after `since`.
+
+        Keys: journeys, avg_seconds, median_seconds, p90_seconds (None if no journeys).
+        """
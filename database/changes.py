@@ -0,0 +1,128 @@
+"""Row change notifications from Postgres (LISTEN/NOTIFY), for dropping stale in-process caches."""
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "granica_changes"  # see migrations/012_change_notifications.sql
+PING_INTERVAL = 60.0  # Seconds between checks that the connection is alive
+MAX_RECONNECT_DELAY = 60.0
+
+
+class ChangeListener:
+    """
+    Changes to carriers, checkpoints and journeys, made by any instance or by hand.
+
+    Triggers from migration 012 publish a JSON payload
+    (`{"table", "op", "id", ...}`) on CHANNEL for every changed row;
+    listeners added for the table get it as a dict. Holds one connection
+    to `dsn` (SUPABASE_DIRECT_URL: LISTEN needs a session, not PostgREST or
+    a transaction-mode pooler) and reconnects when it drops.
+
+    Notifications sent while disconnected are lost, so after a reconnect
+    the resync listeners run: they reload whatever may have gone stale.
+    """
+
+    def __init__(self, dsn: str, channel: str = CHANNEL, reconnect_delay: float = 1.0):
+        self.dsn = dsn
+        self.channel = channel
+        self.reconnect_delay = reconnect_delay
+        self.received = 0
+        self._listeners: Dict[str, List[Callable[[Dict[str, Any]], None]]] = defaultdict(list)
+        self._resync_listeners: List[Callable[[], None]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def add_listener(self, table: str, listener: Callable[[Dict[str, Any]], None]) -> None:
+        """Call `listener(change)` for every change to a row of `table`."""
+        self._listeners[table].append(listener)
+
+    def add_resync_listener(self, listener: Callable[[], None]) -> None:
+        """Call `listener()` after a reconnect, when changes may have been missed."""
+        self._resync_listeners.append(listener)
+
+    def _notify(self, connection, pid: int, channel: str, payload: str) -> None:
+        try:
+            change = json.loads(payload)
+        except ValueError:
+            logger.warning(f"Unreadable change notification: {payload!r}")
+            return
+        self.received += 1
+        for listener in self._listeners.get(change.get("table"), ()):
+            try:
+                listener(change)
+            except Exception:
+                logger.exception(f"Change listener failed for {change}")
+
+    def _resync(self) -> None:
+        for listener in self._resync_listeners:
+            try:
+                listener()
+            except Exception:
+                logger.exception("Resync listener failed")
+
+    async def start(self) -> None:
+        """Listen in the background."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        import asyncpg
+
+        delay = self.reconnect_delay
+        missed = False  # whether changes may have gone unnoticed since start()
+        while True:
+            try:
+                conn = await asyncpg.connect(self.dsn, statement_cache_size=0)
+            except Exception as e:
+                logger.warning(f"Change notifications unavailable, retrying in {delay:.0f}s: {e}")
+                missed = True
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, MAX_RECONNECT_DELAY)
+                continue
+
+            lost = asyncio.Event()
+            conn.add_termination_listener(lambda _: lost.set())
+            try:
+                await conn.add_listener(self.channel, self._notify)
+                logger.info(f"Listening for database changes on {self.channel}")
+                if missed:
+                    self._resync()
+                missed = True  # from the next connection on
+                delay = self.reconnect_delay
+                while not lost.is_set():
+                    try:
+                        await asyncio.wait_for(lost.wait(), PING_INTERVAL)
+                    except asyncio.TimeoutError:
+                        # A silently dropped connection only shows when used
+                        await asyncio.wait_for(conn.fetchval("SELECT 1"), PING_INTERVAL)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Change notifications interrupted: {e}")
+            finally:
+                if not conn.is_closed():
+                    try:
+                        await asyncio.wait_for(conn.close(), 5)
+                    except Exception:
+                        conn.terminate()
+            logger.warning("Change notifications connection lost, reconnecting")
+            await asyncio.sleep(delay)
+
+
+# Global listener; started by the bot when SUPABASE_DIRECT_URL is set
+changes = ChangeListener(settings.supabase_direct_url or "")
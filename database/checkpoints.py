@@ -0,0 +1,101 @@
+"""Mandatory checkpoint sequences of border crossings, loaded once and cached."""
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Optional, List, Dict, Any, Tuple
+
+from .base import Database, DEFAULT_BORDER
+from .reference import reference
+from .models import Checkpoint
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CheckpointSequence:
+    """Mandatory checkpoints of one border crossing, in the order they are passed."""
+
+    border: str
+    checkpoints: Tuple[Checkpoint, ...]
+    positions: Dict[str, int] = field(default_factory=dict)  # checkpoint id -> index
+
+    @classmethod
+    def from_rows(cls, border: str, rows: List[Dict[str, Any]]) -> "CheckpointSequence":
+        checkpoints = tuple(sorted(map(Checkpoint.from_row, rows), key=lambda checkpoint: checkpoint.order_index))
+        return cls(
+            border=border,
+            checkpoints=checkpoints,
+            positions={checkpoint.id: i for i, checkpoint in enumerate(checkpoints)}
+        )
+
+    def __len__(self) -> int:
+        return len(self.checkpoints)
+
+    def __getitem__(self, index: int) -> Checkpoint:
+        return self.checkpoints[index]
+
+
+class CheckpointSequences:
+    """
+    Sequences of all border crossings, compiled from the `checkpoints` table.
+
+    Loaded on first use with a single query and kept in memory: the journey
+    flow asks for the next checkpoint on every step without touching the
+    database. invalidate() drops them so the next use reloads.
+    """
+
+    def __init__(self, database: Database):
+        self.database = database
+        self._sequences: Optional[Dict[str, CheckpointSequence]] = None
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        self._lock = asyncio.Lock()
+
+    async def load(self) -> Dict[str, CheckpointSequence]:
+        """(Re)load all sequences."""
+        rows = await self.database.get_mandatory_checkpoints()
+        by_border: Dict[str, List[Dict[str, Any]]] = {}
+        for row in rows:
+            by_border.setdefault(row.get("border") or DEFAULT_BORDER, []).append(row)
+
+        self._sequences = {
+            border: CheckpointSequence.from_rows(border, border_rows)
+            for border, border_rows in by_border.items()
+        }
+        self._by_id = {row["id"]: row for row in rows}
+        logger.info(
+            "Checkpoint sequences: "
+            + ", ".join(f"{border} ({len(sequence)})" for border, sequence in self._sequences.items())
+        )
+        return self._sequences
+
+    async def _loaded(self) -> Dict[str, CheckpointSequence]:
+        if self._sequences is None:
+            async with self._lock:
+                if self._sequences is None:
+                    await self.load()
+        return self._sequences
+
+    async def get(self, border: str = DEFAULT_BORDER) -> CheckpointSequence:
+        """Sequence of a border crossing (empty if the crossing has no checkpoints)."""
+        sequences = await self._loaded()
+        return sequences.get(border) or CheckpointSequence(border=border, checkpoints=())
+
+    async def borders(self) -> List[str]:
+        """Border crossings that have checkpoints, the default one first."""
+        sequences = await self._loaded()
+        borders = [border for border, sequence in sequences.items() if len(sequence)]
+        return sorted(borders, key=lambda border: (border != DEFAULT_BORDER, border))
+
+    async def checkpoint(self, checkpoint_id: str) -> Optional[Dict[str, Any]]:
+        """Mandatory checkpoint row by id (None for optional or unknown ids)."""
+        await self._loaded()
+        return self._by_id.get(checkpoint_id)
+
+    def invalidate(self) -> None:
+        """Forget loaded sequences; the next use reloads them."""
+        self._sequences = None
+
+
+# Global sequences, shared by handlers and the journal; rebuilt when the reference data changes
+checkpoint_sequences = CheckpointSequences(reference)
+reference.add_listener(checkpoint_sequences.invalidate)
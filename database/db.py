@@ -1,46 +1,125 @@
 """Database interface for Supabase."""
-from typing import Optional, List, Dict, Any
+import asyncio
+import logging
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Callable, Optional, List, Dict, Any
 from datetime import datetime
-from supabase import create_client, Client
 from config import settings
+from .base import Database, DEFAULT_BORDER
+from .models import (
+    CARRIER_COLUMNS,
+    CHECKPOINT_COLUMNS,
+    JOURNEY_COLUMNS,
+    JOURNEY_EVENT_COLUMNS,
+    select_list
+)
+from .resilience import ResilientDatabase
 
+if TYPE_CHECKING:
+    from supabase import Client
 
-class Database:
+logger = logging.getLogger(__name__)
+
+
+# PostgREST caps rows per response (1000 by default on Supabase)
+ANALYTICS_PAGE_SIZE = 1000
+# Explicit column lists instead of `*` (see database/models.py)
+CARRIER_SELECT = select_list(CARRIER_COLUMNS)
+CHECKPOINT_SELECT = select_list(CHECKPOINT_COLUMNS)
+JOURNEY_SELECT = select_list(JOURNEY_COLUMNS)
+JOURNEY_EVENT_SELECT = f"{select_list(JOURNEY_EVENT_COLUMNS)}, checkpoints({CHECKPOINT_SELECT})"
+# Ids filtered with `in` travel in the URL; keep each request well under URL length limits
+ID_LIST_CHUNK = 100
+
+
+class SupabaseDatabase(Database):
     """Supabase database interface."""
 
     def __init__(self):
-        self.client: Client = create_client(
+        # supabase and httpx take a while to import: only when this backend is used
+        from supabase import create_client
+        from postgrest.exceptions import APIError
+        from .transport import PooledTransport, create_pooled_session
+
+        # PostgREST answered with an error - retrying or tripping the breaker would not help
+        self.non_transient_errors = (APIError,)
+
+        self.client: "Client" = create_client(
             settings.supabase_url,
             settings.supabase_key
         )
 
+        # Replace the default PostgREST session with an explicitly pooled one
+        self.transport = PooledTransport(
+            pool_size=settings.db_pool_size,
+            keepalive_connections=settings.db_keepalive_connections,
+            keepalive_expiry=settings.db_keepalive_expiry,
+            http2=settings.db_http2
+        )
+        postgrest = self.client.postgrest
+        default_session = postgrest.session
+        postgrest.session = create_pooled_session(
+            str(default_session.base_url),
+            dict(default_session.headers),
+            self.transport,
+            connect_timeout=settings.db_connect_timeout,
+            timeout=settings.db_timeout
+        )
+        default_session.close()
+
+        # One worker thread per pooled connection
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.db_pool_size,
+            thread_name_prefix="postgrest"
+        )
+
+    async def _execute(self, query):
+        """Run a blocking PostgREST request without stalling the event loop."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, query.execute)
+
+    def pool_metrics(self) -> Dict[str, Any]:
+        """Connection pool usage of the PostgREST transport."""
+        return self.transport.metrics()
+
+    async def close(self) -> None:
+        """Close pooled connections and worker threads."""
+        self.client.postgrest.session.close()
+        self._executor.shutdown(wait=False)
+
     # Carriers
     async def get_carriers(self) -> List[Dict[str, Any]]:
         """Get all carriers."""
-        response = self.client.table("carriers").select("*").execute()
+        response = await self._execute(self.client.table("carriers").select(CARRIER_SELECT))
         return response.data
 
     async def get_carrier_by_id(self, carrier_id: str) -> Optional[Dict[str, Any]]:
         """Get carrier by ID."""
-        response = self.client.table("carriers").select("*").eq("id", carrier_id).single().execute()
+        response = await self._execute(
+            self.client.table("carriers").select(CARRIER_SELECT).eq("id", carrier_id).single()
+        )
         return response.data
 
     # Checkpoints
     async def get_mandatory_checkpoints(self) -> List[Dict[str, Any]]:
-        """Get all mandatory checkpoints ordered by sequence."""
-        response = (
+        """Get mandatory checkpoints of all border crossings, ordered by crossing, then sequence."""
+        response = await self._execute(
             self.client.table("checkpoints")
-            .select("*")
+            .select(CHECKPOINT_SELECT)
             .eq("type", "mandatory")
             .eq("required", True)
+            .order("border")
             .order("order_index")
-            .execute()
         )
         return response.data
 
     async def get_checkpoint_by_id(self, checkpoint_id: str) -> Optional[Dict[str, Any]]:
         """Get checkpoint by ID."""
-        response = self.client.table("checkpoints").select("*").eq("id", checkpoint_id).single().execute()
+        response = await self._execute(
+            self.client.table("checkpoints").select(CHECKPOINT_SELECT).eq("id", checkpoint_id).single()
+        )
         return response.data
 
     # Journeys
@@ -48,37 +127,69 @@ class Database:
         self,
         user_id: int,
         carrier_id: str,
-        departure_utc: datetime
+        departure_utc: datetime,
+        border: str = DEFAULT_BORDER,
+        journey_id: Optional[str] = None
     ) -> Dict[str, Any]:
-        """Create a new journey."""
+        """Create a new journey; idempotent for a given `journey_id` (see Database)."""
         data = {
+            "id": journey_id or str(uuid.uuid4()),
             "user_id": user_id,
             "carrier_id": carrier_id,
             "departure_utc": departure_utc.isoformat(),
+            "border": border,
             "completed": False,
             "anomalous": False
         }
-        response = self.client.table("journeys").insert(data).execute()
-        return response.data[0]
+        response = await self._execute(
+            self.client.table("journeys").upsert(data, on_conflict="id", ignore_duplicates=True)
+        )
+        if response.data:
+            return response.data[0]
+        # Already created by an earlier attempt
+        return await self.get_journey(data["id"])
 
     async def get_journey(self, journey_id: str) -> Optional[Dict[str, Any]]:
         """Get journey by ID."""
-        response = self.client.table("journeys").select("*").eq("id", journey_id).single().execute()
+        response = await self._execute(
+            self.client.table("journeys").select(JOURNEY_SELECT).eq("id", journey_id).single()
+        )
         return response.data
 
+    async def get_journeys(self, journey_ids: List[str]) -> List[Dict[str, Any]]:
+        """Get journeys by IDs in one query (unknown IDs are skipped, order is arbitrary)."""
+        journeys = []
+        for i in range(0, len(journey_ids), ID_LIST_CHUNK):
+            response = await self._execute(
+                self.client.table("journeys").select(JOURNEY_SELECT).in_("id", journey_ids[i:i + ID_LIST_CHUNK])
+            )
+            journeys.extend(response.data)
+        return journeys
+
     async def complete_journey(self, journey_id: str) -> Dict[str, Any]:
-        """Mark journey as completed."""
-        response = (
-            self.client.table("journeys")
-            .update({"completed": True})
-            .eq("id", journey_id)
-            .execute()
+        """Mark journey as completed and store its metrics (one transaction)."""
+        response = await self._execute(
+            self.client.rpc("complete_journey_with_metrics", {"p_journey_id": journey_id})
         )
-        return response.data[0]
+        return response.data
+
+    async def backfill_journey_metrics(self, batch_size: int = 500) -> int:
+        """Compute metrics of up to `batch_size` completed journeys that have none."""
+        response = await self._execute(
+            self.client.rpc("backfill_journey_metrics", {"batch_size": batch_size})
+        )
+        return response.data
+
+    async def close_abandoned_journeys(self, before: datetime, batch_size: int = 500) -> List[str]:
+        """Close up to `batch_size` incomplete journeys abandoned before `before`."""
+        response = await self._execute(
+            self.client.rpc("close_abandoned_journeys", {"p_before": before.isoformat(), "p_batch_size": batch_size})
+        )
+        return [row["journey_id"] for row in response.data]
 
     async def cancel_journey(self, journey_id: str) -> Dict[str, Any]:
         """Mark journey as cancelled."""
-        response = (
+        response = await self._execute(
             self.client.table("journeys")
             .update({
                 "completed": True,
@@ -86,20 +197,27 @@ class Database:
                 "notes": "Cancelled by user"
             })
             .eq("id", journey_id)
-            .execute()
         )
         return response.data[0]
 
+    async def set_journeys_anomalous(self, journey_ids: List[str], anomalous: bool) -> None:
+        """Set the `anomalous` flag of the given journeys."""
+        for i in range(0, len(journey_ids), ID_LIST_CHUNK):
+            await self._execute(
+                self.client.table("journeys")
+                .update({"anomalous": anomalous})
+                .in_("id", journey_ids[i:i + ID_LIST_CHUNK])
+            )
+
     async def get_user_active_journey(self, user_id: int) -> Optional[Dict[str, Any]]:
         """Get user's active (incomplete) journey."""
-        response = (
+        response = await self._execute(
             self.client.table("journeys")
-            .select("*")
+            .select(JOURNEY_SELECT)
             .eq("user_id", user_id)
             .eq("completed", False)
             .order("created_at", desc=True)
             .limit(1)
-            .execute()
         )
         return response.data[0] if response.data else None
 
@@ -124,33 +242,155 @@ class Database:
             "lat": lat,
             "lon": lon
         }
-        response = self.client.table("journey_events").insert(data).execute()
+        response = await self._execute(self.client.table("journey_events").insert(data))
         return response.data[0]
 
+    async def upsert_journey_events(self, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Insert a batch of journey events, skipping ones already stored.
+
+        UNIQUE(journey_id, checkpoint_id) is used as the idempotency key, so
+        the same batch can be safely retried.
+        """
+        response = await self._execute(
+            self.client.table("journey_events")
+            .upsert(events, on_conflict="journey_id,checkpoint_id", ignore_duplicates=True)
+        )
+        return response.data
+
     async def get_journey_events(self, journey_id: str) -> List[Dict[str, Any]]:
         """Get all events for a journey, ordered by timestamp."""
-        response = (
+        response = await self._execute(
             self.client.table("journey_events")
-            .select("*, checkpoints(*)")
+            .select(JOURNEY_EVENT_SELECT)
             .eq("journey_id", journey_id)
             .order("timestamp_utc")
-            .execute()
         )
         return response.data
 
+    async def load_analytics_events(self, since: datetime) -> List[Dict[str, Any]]:
+        """Load events of completed, not cancelled journeys that ended after `since`."""
+        rows = []
+        while True:
+            response = await self._execute(
+                self.client.table("analytics_events")
+                .select("journey_id, carrier_id, checkpoint_id, ts, anomalous")
+                .gte("journey_end_utc", since.isoformat())
+                .order("journey_id")
+                .order("checkpoint_id")
+                .range(len(rows), len(rows) + ANALYTICS_PAGE_SIZE - 1)
+            )
+            rows.extend(response.data)
+            if len(response.data) < ANALYTICS_PAGE_SIZE:
+                return rows
+
+    async def load_journey_stat_changes(self, since: datetime) -> List[Dict[str, Any]]:
+        """Load journeys whose statistics changed at or after `since`."""
+        rows = []
+        while True:
+            response = await self._execute(
+                self.client.table("journey_stat_changes")
+                .select(
+                    "journey_id, carrier_id, departure_utc, end_utc, duration_seconds, direction, changed_at, counted"
+                )
+                .gte("changed_at", since.isoformat())
+                .order("journey_id")
+                .range(len(rows), len(rows) + ANALYTICS_PAGE_SIZE - 1)
+            )
+            rows.extend(response.data)
+            if len(response.data) < ANALYTICS_PAGE_SIZE:
+                return rows
+
+    async def get_live_border_events(self, since: datetime) -> List[Dict[str, Any]]:
+        """Get events recorded after `since` of journeys that are not cancelled."""
+        response = await self._execute(
+            self.client.table("journey_events")
+            .select("journey_id, checkpoint_id, timestamp_utc, user_timezone, journeys!inner(completed)")
+            .eq("journeys.cancelled", False)
+            .gte("timestamp_utc", since.isoformat())
+        )
+        return [
+            {
+                **{key: value for key, value in row.items() if key != "journeys"},
+                "completed": row["journeys"]["completed"]
+            }
+            for row in response.data
+        ]
+
     async def get_latest_border_stats(self, limit: int = 10) -> List[Dict[str, Any]]:
-        """Get latest completed journeys with their events."""
-        response = (
-            self.client.table("journeys")
-            .select("*, carriers(name), journey_events(*, checkpoints(name, order_index))")
-            .eq("completed", True)
+        """Get latest completed journeys with their border crossing duration."""
+        response = await self._execute(
+            self.client.table("journey_stats")
+            .select("journey_id, carrier, start_utc, end_utc, duration_seconds")
             .order("created_at", desc=True)
             .limit(limit)
-            .execute()
         )
         return response.data
 
+    async def get_border_duration_summary(self, since: datetime) -> Dict[str, Any]:
+        """Get duration aggregates of completed journeys that ended after `since`."""
+        response = await self._execute(
+            self.client.rpc("border_duration_summary", {"since": since.isoformat()})
+        )
+        return response.data[0]
+
+
+def create_database() -> Database:
+    """Create the database backend selected by settings.database_backend."""
+    if settings.database_backend == "postgres":
+        if not settings.supabase_direct_url:
+            raise ValueError("DATABASE_BACKEND=postgres requires SUPABASE_DIRECT_URL")
+        from .postgres import PostgresDatabase
+        return PostgresDatabase(
+            settings.supabase_direct_url,
+            max_size=settings.db_pool_size,
+            command_timeout=settings.db_timeout
+        )
+    if settings.database_backend == "sqlite":
+        from .sqlite import SQLiteDatabase
+        return SQLiteDatabase(settings.sqlite_path)
+    return SupabaseDatabase()
+
+
+class LazyDatabase:
+    """
+    Database backend created on first use rather than at import.
+
+    Importing the bot (or a script that only needs settings and models)
+    does not load the Supabase client or open anything; the first call
+    does. close() before any call has nothing to close.
+    """
+
+    def __init__(self, factory: Callable[[], Database] = create_database):
+        self._factory = factory
+        self._backend: Optional[Database] = None
+
+    @property
+    def backend(self) -> Database:
+        if self._backend is None:
+            started = time.perf_counter()
+            self._backend = self._factory()
+            logger.info(
+                f"Database backend {type(self._backend).__name__} created in {time.perf_counter() - started:.2f}s"
+            )
+        return self._backend
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.backend, name)
+
+    async def close(self) -> None:
+        if self._backend is not None:
+            await self._backend.close()
 
-# Global database instance
-db = Database()
 
+# Global database instance (with timeouts, retries and circuit breaker)
+db = ResilientDatabase(
+    LazyDatabase(create_database),
+    timeout=settings.db_timeout,
+    read_retries=settings.db_read_retries,
+    failure_threshold=settings.db_breaker_threshold,
+    reset_timeout=settings.db_breaker_reset_timeout,
+    max_concurrency=settings.db_max_concurrency,
+    max_pending=settings.db_max_pending
+)
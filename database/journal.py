@@ -0,0 +1,337 @@
+"""Durable local write-ahead journal for checkpoint events."""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Callable
+
+from config import settings
+from utils import parse_db_timestamp
+from .base import Database
+from .checkpoints import CheckpointSequences, checkpoint_sequences
+from .db import db
+from .resilience import DatabaseUnavailableError
+
+logger = logging.getLogger(__name__)
+
+
+class EventJournal:
+    """
+    Append-only local journal for journey events.
+
+    Each event is committed to a local SQLite file (WAL, synchronous=FULL)
+    before the user is acknowledged, then flushed to the database in batches
+    by a background task. UNIQUE(journey_id, checkpoint_id) is the
+    idempotency key, so re-sending an event after a crash or a lost response
+    never creates duplicates. Pending events are replayed on start.
+
+    An event the database rejects (a bad checkpoint id, a journey deleted
+    meanwhile) must not hold back the ones after it: a failed batch is
+    retried event by event, and an event rejected `max_attempts` times is
+    moved to the `dead_letter` table of the journal file and logged. Only
+    an unreachable database (DatabaseUnavailableError) stops a flush.
+    """
+
+    def __init__(
+        self,
+        database: Database,
+        path: str,
+        flush_interval: float = 2.0,
+        batch_size: int = 50,
+        max_backoff: float = 60.0,
+        max_attempts: int = 5,
+        sequences: Optional[CheckpointSequences] = None
+    ):
+        self.database = database
+        self.sequences = sequences or CheckpointSequences(database)
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_backoff = max_backoff
+        self.max_attempts = max_attempts
+
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+
+    # Storage
+    def _connection(self) -> sqlite3.Connection:
+        """Open the journal file on first use."""
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=FULL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS journal (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    journey_id TEXT NOT NULL,
+                    checkpoint_id TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    UNIQUE(journey_id, checkpoint_id)
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS dead_letter (
+                    seq INTEGER PRIMARY KEY,
+                    journey_id TEXT NOT NULL,
+                    checkpoint_id TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    attempts INTEGER NOT NULL,
+                    error TEXT,
+                    failed_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+                )
+                """
+            )
+            self._conn = conn
+        return self._conn
+
+    def _append(self, event: Dict[str, Any]) -> None:
+        with self._lock:
+            self._connection().execute(
+                "INSERT OR IGNORE INTO journal (journey_id, checkpoint_id, payload) VALUES (?, ?, ?)",
+                (event["journey_id"], event["checkpoint_id"], json.dumps(event))
+            )
+
+    def _read_batch(self, after: int, limit: int) -> List[tuple]:
+        with self._lock:
+            return self._connection().execute(
+                "SELECT seq, payload FROM journal WHERE seq > ? ORDER BY seq LIMIT ?",
+                (after, limit)
+            ).fetchall()
+
+    def _read_journey(self, journey_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT payload FROM journal WHERE journey_id = ? ORDER BY seq",
+                (journey_id,)
+            ).fetchall()
+        return [json.loads(payload) for (payload,) in rows]
+
+    def _delete(self, seqs: List[int]) -> None:
+        with self._lock:
+            self._connection().executemany(
+                "DELETE FROM journal WHERE seq = ?",
+                [(seq,) for seq in seqs]
+            )
+
+    def _reject(self, seq: int, error: str) -> bool:
+        """Count a rejection of one event; returns whether it was moved to the dead-letter table."""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("UPDATE journal SET attempts = attempts + 1 WHERE seq = ?", (seq,))
+                moved = conn.execute(
+                    """
+                    INSERT INTO dead_letter (seq, journey_id, checkpoint_id, payload, attempts, error)
+                    SELECT seq, journey_id, checkpoint_id, payload, attempts, ?
+                    FROM journal WHERE seq = ? AND attempts >= ?
+                    """,
+                    (error, seq, self.max_attempts)
+                ).rowcount
+                if moved:
+                    conn.execute("DELETE FROM journal WHERE seq = ?", (seq,))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return bool(moved)
+
+    def pending_count(self) -> int:
+        """Number of events not yet delivered to the database."""
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM journal").fetchone()[0]
+
+    def dead_letter_count(self) -> int:
+        """Number of events given up on after `max_attempts` rejections."""
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM dead_letter").fetchone()[0]
+
+    # Public API
+    def add_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        """Call `listener(event)` for every event recorded from now on."""
+        self._listeners.append(listener)
+
+    async def record_event(
+        self,
+        journey_id: str,
+        checkpoint_id: str,
+        timestamp_utc: datetime,
+        source: str = "manual",
+        user_timezone: str = "Europe/Minsk",
+        lat: Optional[float] = None,
+        lon: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Durably record a journey event and schedule it for delivery.
+
+        Returns as soon as the event is on local disk; the database write
+        happens in the background.
+        """
+        event = {
+            "journey_id": journey_id,
+            "checkpoint_id": checkpoint_id,
+            "timestamp_utc": timestamp_utc.isoformat(),
+            "source": source,
+            "user_timezone": user_timezone,
+            "lat": lat,
+            "lon": lon
+        }
+        await asyncio.to_thread(self._append, event)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        for listener in self._listeners:
+            try:
+                listener(event)
+            except Exception:
+                logger.exception("Journal listener failed")
+        return event
+
+    async def get_journey_events(self, journey_id: str) -> List[Dict[str, Any]]:
+        """
+        Get all events for a journey, including ones not flushed yet.
+
+        Same shape and ordering as Database.get_journey_events.
+        """
+        events, pending = await asyncio.gather(
+            self.database.get_journey_events(journey_id),
+            asyncio.to_thread(self._read_journey, journey_id)
+        )
+
+        stored = {event["checkpoint_id"] for event in events}
+        pending = [event for event in pending if event["checkpoint_id"] not in stored]
+        if not pending:
+            return events
+
+        for event in pending:
+            checkpoint = await self.sequences.checkpoint(event["checkpoint_id"])
+            if checkpoint is None:
+                checkpoint = await self.database.get_checkpoint_by_id(event["checkpoint_id"])
+            event["checkpoints"] = checkpoint
+
+        return sorted(events + pending, key=lambda e: parse_db_timestamp(e["timestamp_utc"]))
+
+    async def flush(self) -> int:
+        """
+        Deliver all pending events in batches.
+
+        Events the database rejects stay pending (or go to the dead-letter
+        table) without stopping the rest.
+
+        Returns:
+            Number of events delivered
+
+        Raises:
+            DatabaseUnavailableError if the database cannot be reached
+            (undelivered events stay pending)
+        """
+        flushed = 0
+        after = 0  # events up to this seq were tried in this flush
+        while True:
+            rows = await asyncio.to_thread(self._read_batch, after, self.batch_size)
+            if not rows:
+                return flushed
+            after = rows[-1][0]
+
+            try:
+                await self.database.upsert_journey_events([json.loads(payload) for _, payload in rows])
+            except DatabaseUnavailableError:
+                raise
+            except Exception as e:
+                # Find the rejected event(s), deliver the rest
+                logger.warning(f"Journal batch rejected, delivering event by event: {e!r}")
+                flushed += await self._flush_each(rows)
+                continue
+
+            await asyncio.to_thread(self._delete, [seq for seq, _ in rows])
+            flushed += len(rows)
+
+    async def _flush_each(self, rows: List[tuple]) -> int:
+        flushed = 0
+        for seq, payload in rows:
+            event = json.loads(payload)
+            try:
+                await self.database.upsert_journey_events([event])
+            except DatabaseUnavailableError:
+                raise
+            except Exception as e:
+                if await asyncio.to_thread(self._reject, seq, repr(e)):
+                    logger.error(
+                        f"Journal event moved to dead letter after {self.max_attempts} rejections: {event}: {e!r}"
+                    )
+                else:
+                    logger.warning(f"Journal event rejected, will retry: {event}: {e!r}")
+                continue
+            await asyncio.to_thread(self._delete, [seq])
+            flushed += 1
+        return flushed
+
+    # Lifecycle
+    async def start(self) -> None:
+        """Start the background flusher, replaying anything left from a previous run."""
+        if self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        pending = await asyncio.to_thread(self.pending_count)
+        if pending:
+            logger.info(f"Replaying {pending} journaled event(s)")
+            self._wakeup.set()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Stop the flusher after a final best-effort flush."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        try:
+            await asyncio.wait_for(self.flush(), timeout=timeout)
+        except Exception as e:
+            logger.warning(f"Journal not fully flushed on shutdown, will replay on start: {e}")
+
+    async def _run(self) -> None:
+        """Flush loop with exponential backoff while the database is unreachable."""
+        delay = self.flush_interval
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            try:
+                flushed = await self.flush()
+                if flushed:
+                    logger.info(f"Flushed {flushed} journaled event(s)")
+                delay = self.flush_interval
+            except Exception as e:
+                delay = min(delay * 2, self.max_backoff)
+                logger.warning(f"Journal flush failed, retrying in {delay:.0f}s: {e}")
+
+
+# Global journal instance
+journal = EventJournal(
+    db,
+    settings.journal_path,
+    flush_interval=settings.journal_flush_interval,
+    batch_size=settings.journal_batch_size,
+    max_attempts=settings.journal_max_attempts,
+    sequences=checkpoint_sequences
+)
@@ -0,0 +1,102 @@
+"""Per-update read loader: identical reads deduplicated, journey reads batched."""
+import asyncio
+from typing import Optional, List, Dict, Any, Awaitable, Callable, Hashable, Set
+
+from .base import Database
+from .models import Carrier, Journey, JourneyEvent
+
+
+class DataLoader:
+    """
+    Reads made while handling one update.
+
+    Identical reads share one query: the first caller starts it and every
+    later or concurrent caller awaits the same result. Journeys requested in
+    the same event loop iteration (e.g. from `asyncio.gather`) are fetched
+    together with one `get_journeys` (`in`) query.
+
+    Rows come back as typed models with timestamps already parsed.
+    Results live as long as the loader, which DataLoaderMiddleware creates
+    for every update, so nothing is served stale across updates. Call
+    forget_journey() after a write that changes what was already read.
+    Carriers are read from `reference` (ReferenceData) if given, so they
+    cost no query at all.
+    """
+
+    def __init__(self, database: Database, journal, reference=None):
+        self.database = database
+        self.journal = journal
+        self.reference = reference or database
+        self.queries = 0  # reads actually sent, for diagnostics
+
+        self._results: Dict[Hashable, asyncio.Future] = {}
+        self._queued: Dict[str, asyncio.Future] = {}  # journey id -> result, batch not sent yet
+        self._batches: Set[asyncio.Task] = set()  # held until done (the loop keeps only weak references)
+
+    async def _load(self, key: Hashable, read: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._results.get(key)
+        if future is None:
+            self.queries += 1
+            future = self._results[key] = asyncio.ensure_future(read())
+        # A cancelled caller must not cancel the read for the others
+        return await asyncio.shield(future)
+
+    async def journey(self, journey_id: str) -> Optional[Journey]:
+        """Journey by ID, batched with other journeys requested meanwhile."""
+        key = ("journey", journey_id)
+        future = self._results.get(key)
+        if future is None:
+            future = self._results[key] = asyncio.get_running_loop().create_future()
+            if not self._queued:
+                # No batch waiting to start (a running one has taken its ids
+                # already); runs after callers scheduled in this iteration queued theirs
+                batch = asyncio.create_task(self._load_journeys())
+                self._batches.add(batch)
+                batch.add_done_callback(self._batches.discard)
+            self._queued[journey_id] = future
+        return await asyncio.shield(future)
+
+    async def _load_journeys(self) -> None:
+        queued, self._queued = self._queued, {}
+        self.queries += 1
+        try:
+            if len(queued) == 1:
+                # Single-row read keeps the resilient layer's fallback for it
+                (journey_id,) = queued
+                journeys = [await self.database.get_journey(journey_id)]
+            else:
+                journeys = await self.database.get_journeys(list(queued))
+        except Exception as e:
+            for future in queued.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        by_id = {journey["id"]: Journey.from_row(journey) for journey in journeys if journey}
+        for journey_id, future in queued.items():
+            if not future.done():
+                future.set_result(by_id.get(journey_id))
+
+    async def journey_events(self, journey_id: str) -> List[JourneyEvent]:
+        """Events of a journey, including ones still in the journal."""
+        async def read():
+            return [JourneyEvent.from_row(row) for row in await self.journal.get_journey_events(journey_id)]
+        return await self._load(("events", journey_id), read)
+
+    async def user_active_journey(self, user_id: int) -> Optional[Journey]:
+        """User's active (incomplete) journey."""
+        async def read():
+            row = await self.database.get_user_active_journey(user_id)
+            return Journey.from_row(row) if row else None
+        return await self._load(("active", user_id), read)
+
+    async def carriers(self) -> List[Carrier]:
+        """All carriers."""
+        async def read():
+            return [Carrier.from_row(row) for row in await self.reference.get_carriers()]
+        return await self._load(("carriers",), read)
+
+    def forget_journey(self, journey_id: str) -> None:
+        """Drop what was read about a journey; the next read queries again."""
+        self._results.pop(("journey", journey_id), None)
+        self._results.pop(("events", journey_id), None)
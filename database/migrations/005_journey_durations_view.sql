@@ -0,0 +1,56 @@
+-- Server-side journey duration aggregation
+-- Stats no longer ship every event of every journey: Postgres returns one
+-- row per journey (start, end, duration) and summary percentiles.
+-- Requires 001_add_cancelled_field.sql
+
+-- One row per journey with its border crossing duration
+CREATE OR REPLACE VIEW journey_durations AS
+SELECT
+    j.id AS journey_id,
+    j.user_id,
+    j.carrier_id,
+    c.name AS carrier,
+    j.departure_utc,
+    j.created_at,
+    j.completed,
+    j.cancelled,
+    j.anomalous,
+    MIN(e.timestamp_utc) AS start_utc,
+    MAX(e.timestamp_utc) AS end_utc,
+    EXTRACT(EPOCH FROM MAX(e.timestamp_utc) - MIN(e.timestamp_utc))::INTEGER AS duration_seconds,
+    COUNT(e.id)::INTEGER AS event_count
+FROM journeys j
+JOIN carriers c ON c.id = j.carrier_id
+LEFT JOIN journey_events e ON e.journey_id = j.id
+GROUP BY j.id, c.name;
+
+COMMENT ON VIEW journey_durations IS 'Per-journey border crossing duration (first to last checkpoint)';
+
+-- Aggregates over completed journeys that ended after `since`
+CREATE OR REPLACE FUNCTION border_duration_summary(since TIMESTAMP WITHOUT TIME ZONE)
+RETURNS TABLE (
+    journeys BIGINT,
+    avg_seconds DOUBLE PRECISION,
+    median_seconds DOUBLE PRECISION,
+    p90_seconds DOUBLE PRECISION
+)
+LANGUAGE sql STABLE AS $$
+    SELECT
+        COUNT(*),
+        AVG(duration_seconds),
+        percentile_cont(0.5) WITHIN GROUP (ORDER BY duration_seconds),
+        percentile_cont(0.9) WITHIN GROUP (ORDER BY duration_seconds)
+    FROM journey_durations
+    WHERE completed = true
+      AND cancelled = false
+      AND event_count >= 2
+      AND end_utc >= since;
+$$;
+
+-- Latest completed journeys are read by created_at
+CREATE INDEX IF NOT EXISTS idx_journeys_completed_created
+ON journeys(created_at DESC)
+WHERE completed = true;
+
+-- Verify
+SELECT * FROM journey_durations ORDER BY created_at DESC LIMIT 5;
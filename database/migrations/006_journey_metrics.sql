@@ -0,0 +1,157 @@
+-- Denormalized journey metrics written at completion
+-- Summaries, stats and analytics read indexed numeric columns on `journeys`
+-- instead of joining and re-aggregating `journey_events` on every render.
+-- Requires 005_journey_durations_view.sql
+
+-- Metric columns
+ALTER TABLE journeys
+ADD COLUMN IF NOT EXISTS first_event_utc TIMESTAMP WITHOUT TIME ZONE,
+ADD COLUMN IF NOT EXISTS last_event_utc TIMESTAMP WITHOUT TIME ZONE,
+ADD COLUMN IF NOT EXISTS border_seconds INTEGER,
+ADD COLUMN IF NOT EXISTS segment_seconds JSONB,
+ADD COLUMN IF NOT EXISTS event_count INTEGER;
+
+COMMENT ON COLUMN journeys.border_seconds IS 'First to last checkpoint, NULL with fewer than two events';
+COMMENT ON COLUMN journeys.segment_seconds IS 'Seconds to reach each checkpoint from the previous one (first one: from departure), keyed by checkpoint name';
+COMMENT ON COLUMN journeys.event_count IS 'NULL until metrics are computed';
+
+-- (Re)compute metrics of one journey from its events
+CREATE OR REPLACE FUNCTION refresh_journey_metrics(p_journey_id UUID)
+RETURNS VOID
+LANGUAGE sql AS $$
+    UPDATE journeys j SET
+        first_event_utc = m.first_event_utc,
+        last_event_utc = m.last_event_utc,
+        border_seconds = m.border_seconds,
+        segment_seconds = m.segment_seconds,
+        event_count = m.event_count
+    FROM (
+        SELECT
+            MIN(s.timestamp_utc) AS first_event_utc,
+            MAX(s.timestamp_utc) AS last_event_utc,
+            CASE WHEN COUNT(*) >= 2
+                THEN EXTRACT(EPOCH FROM MAX(s.timestamp_utc) - MIN(s.timestamp_utc))::INTEGER
+            END AS border_seconds,
+            COALESCE(jsonb_object_agg(s.name, s.seconds) FILTER (WHERE s.name IS NOT NULL), '{}'::jsonb) AS segment_seconds,
+            COUNT(*)::INTEGER AS event_count
+        FROM (
+            SELECT
+                c.name,
+                e.timestamp_utc,
+                EXTRACT(EPOCH FROM e.timestamp_utc - COALESCE(
+                    LAG(e.timestamp_utc) OVER (ORDER BY e.timestamp_utc),
+                    jj.departure_utc
+                ))::INTEGER AS seconds
+            FROM journey_events e
+            JOIN checkpoints c ON c.id = e.checkpoint_id
+            JOIN journeys jj ON jj.id = e.journey_id
+            WHERE e.journey_id = p_journey_id
+        ) s
+    ) m
+    WHERE j.id = p_journey_id;
+$$;
+
+-- Complete a journey and persist its metrics in the same transaction
+CREATE OR REPLACE FUNCTION complete_journey_with_metrics(p_journey_id UUID)
+RETURNS journeys
+LANGUAGE plpgsql AS $$
+DECLARE
+    result journeys;
+BEGIN
+    PERFORM refresh_journey_metrics(p_journey_id);
+    UPDATE journeys SET completed = true
+    WHERE id = p_journey_id
+    RETURNING * INTO result;
+    RETURN result;
+END;
+$$;
+
+-- Events delivered after completion (e.g. from the bot's local journal)
+-- keep metrics up to date
+CREATE OR REPLACE FUNCTION journey_events_refresh_metrics()
+RETURNS TRIGGER
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM journeys WHERE id = NEW.journey_id AND completed) THEN
+        PERFORM refresh_journey_metrics(NEW.journey_id);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_journey_events_refresh_metrics ON journey_events;
+CREATE TRIGGER trg_journey_events_refresh_metrics
+AFTER INSERT ON journey_events
+FOR EACH ROW EXECUTE FUNCTION journey_events_refresh_metrics();
+
+-- Backfill completed journeys in batches; returns number of journeys processed
+-- Run until it returns 0: scripts/backfill_journey_metrics.py
+CREATE OR REPLACE FUNCTION backfill_journey_metrics(batch_size INTEGER DEFAULT 500)
+RETURNS INTEGER
+LANGUAGE plpgsql AS $$
+DECLARE
+    processed INTEGER := 0;
+    pending_id UUID;
+BEGIN
+    FOR pending_id IN
+        SELECT id FROM journeys
+        WHERE completed = true AND event_count IS NULL
+        LIMIT batch_size
+    LOOP
+        PERFORM refresh_journey_metrics(pending_id);
+        processed := processed + 1;
+    END LOOP;
+    RETURN processed;
+END;
+$$;
+
+-- Completed journeys with a duration, no join on journey_events
+CREATE OR REPLACE VIEW journey_stats AS
+SELECT
+    j.id AS journey_id,
+    j.user_id,
+    j.carrier_id,
+    c.name AS carrier,
+    j.departure_utc,
+    j.created_at,
+    j.cancelled,
+    j.anomalous,
+    j.first_event_utc AS start_utc,
+    j.last_event_utc AS end_utc,
+    j.border_seconds AS duration_seconds,
+    j.segment_seconds,
+    j.event_count
+FROM journeys j
+JOIN carriers c ON c.id = j.carrier_id
+WHERE j.completed = true AND j.border_seconds IS NOT NULL;
+
+-- Summary now reads the denormalized columns
+CREATE OR REPLACE FUNCTION border_duration_summary(since TIMESTAMP WITHOUT TIME ZONE)
+RETURNS TABLE (
+    journeys BIGINT,
+    avg_seconds DOUBLE PRECISION,
+    median_seconds DOUBLE PRECISION,
+    p90_seconds DOUBLE PRECISION
+)
+LANGUAGE sql STABLE AS $$
+    SELECT
+        COUNT(*),
+        AVG(duration_seconds),
+        percentile_cont(0.5) WITHIN GROUP (ORDER BY duration_seconds),
+        percentile_cont(0.9) WITHIN GROUP (ORDER BY duration_seconds)
+    FROM journey_stats
+    WHERE cancelled = false
+      AND end_utc >= since;
+$$;
+
+-- Indexes for filtering and sorting on metrics
+CREATE INDEX IF NOT EXISTS idx_journeys_last_event
+ON journeys(last_event_utc)
+WHERE completed = true AND border_seconds IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_journeys_border_seconds
+ON journeys(border_seconds)
+WHERE completed = true AND border_seconds IS NOT NULL;
+
+-- Backfill everything that is already completed
+SELECT backfill_journey_metrics(1000000) AS backfilled;
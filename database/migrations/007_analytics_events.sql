@@ -0,0 +1,15 @@
+-- Flat event rows for batch analytics
+-- One row per event of a completed, not cancelled journey, with the event
+-- time as epoch seconds so it loads straight into numeric arrays.
+-- Requires 006_journey_metrics.sql
+
+CREATE OR REPLACE VIEW analytics_events AS
+SELECT
+    e.journey_id,
+    j.carrier_id,
+    e.checkpoint_id,
+    EXTRACT(EPOCH FROM e.timestamp_utc)::DOUBLE PRECISION AS ts,
+    j.last_event_utc AS journey_end_utc
+FROM journey_events e
+JOIN journeys j ON j.id = e.journey_id
+WHERE j.completed = true AND j.cancelled = false;
@@ -0,0 +1,46 @@
+-- Exclude anomalous journeys from statistics
+-- `journeys.anomalous` is set by the bot on completion and by
+-- scripts/score_anomalies.py (robust median/MAD scoring of segment durations).
+-- Requires 007_analytics_events.sql
+
+-- Analytics rows carry the flag, so the scorer can re-evaluate flagged journeys
+CREATE OR REPLACE VIEW analytics_events AS
+SELECT
+    e.journey_id,
+    j.carrier_id,
+    e.checkpoint_id,
+    EXTRACT(EPOCH FROM e.timestamp_utc)::DOUBLE PRECISION AS ts,
+    j.last_event_utc AS journey_end_utc,
+    j.anomalous
+FROM journey_events e
+JOIN journeys j ON j.id = e.journey_id
+WHERE j.completed = true AND j.cancelled = false;
+
+-- Statistics (latest crossings, duration summary) skip anomalous journeys
+CREATE OR REPLACE VIEW journey_stats AS
+SELECT
+    j.id AS journey_id,
+    j.user_id,
+    j.carrier_id,
+    c.name AS carrier,
+    j.departure_utc,
+    j.created_at,
+    j.cancelled,
+    j.anomalous,
+    j.first_event_utc AS start_utc,
+    j.last_event_utc AS end_utc,
+    j.border_seconds AS duration_seconds,
+    j.segment_seconds,
+    j.event_count
+FROM journeys j
+JOIN carriers c ON c.id = j.carrier_id
+WHERE j.completed = true AND j.anomalous = false AND j.border_seconds IS NOT NULL;
+
+-- Partial indexes matching the journey_stats predicate
+CREATE INDEX IF NOT EXISTS idx_journeys_stats_created
+ON journeys(created_at)
+WHERE completed = true AND anomalous = false AND border_seconds IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_journeys_stats_end
+ON journeys(last_event_utc)
+WHERE completed = true AND anomalous = false AND border_seconds IS NOT NULL;
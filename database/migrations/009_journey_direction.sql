@@ -0,0 +1,85 @@
+-- Direction of travel stored with journey metrics
+-- Guessed from the timezone of the first event, like the bot's live
+-- estimate: riders in Minsk time are leaving Belarus.
+-- Requires 008_anomalous_journeys.sql
+
+ALTER TABLE journeys
+ADD COLUMN IF NOT EXISTS direction TEXT CHECK (direction IN ('outbound', 'inbound'));
+
+COMMENT ON COLUMN journeys.direction IS 'outbound: from Belarus, inbound: to Belarus (from the first event timezone)';
+
+-- Same as in 006, plus direction
+CREATE OR REPLACE FUNCTION refresh_journey_metrics(p_journey_id UUID)
+RETURNS VOID
+LANGUAGE sql AS $$
+    UPDATE journeys j SET
+        first_event_utc = m.first_event_utc,
+        last_event_utc = m.last_event_utc,
+        border_seconds = m.border_seconds,
+        segment_seconds = m.segment_seconds,
+        event_count = m.event_count,
+        direction = m.direction
+    FROM (
+        SELECT
+            MIN(s.timestamp_utc) AS first_event_utc,
+            MAX(s.timestamp_utc) AS last_event_utc,
+            CASE WHEN COUNT(*) >= 2
+                THEN EXTRACT(EPOCH FROM MAX(s.timestamp_utc) - MIN(s.timestamp_utc))::INTEGER
+            END AS border_seconds,
+            COALESCE(jsonb_object_agg(s.name, s.seconds) FILTER (WHERE s.name IS NOT NULL), '{}'::jsonb) AS segment_seconds,
+            COUNT(*)::INTEGER AS event_count,
+            CASE
+                WHEN COUNT(*) = 0 THEN NULL
+                WHEN (array_agg(s.user_timezone ORDER BY s.timestamp_utc))[1] = 'Europe/Minsk' THEN 'outbound'
+                ELSE 'inbound'
+            END AS direction
+        FROM (
+            SELECT
+                c.name,
+                e.timestamp_utc,
+                COALESCE(e.user_timezone, 'Europe/Minsk') AS user_timezone,
+                EXTRACT(EPOCH FROM e.timestamp_utc - COALESCE(
+                    LAG(e.timestamp_utc) OVER (ORDER BY e.timestamp_utc),
+                    jj.departure_utc
+                ))::INTEGER AS seconds
+            FROM journey_events e
+            JOIN checkpoints c ON c.id = e.checkpoint_id
+            JOIN journeys jj ON jj.id = e.journey_id
+            WHERE e.journey_id = p_journey_id
+        ) s
+    ) m
+    WHERE j.id = p_journey_id;
+$$;
+
+-- Backfill direction of existing journeys
+UPDATE journeys j SET direction = CASE first.user_timezone
+        WHEN 'Europe/Minsk' THEN 'outbound'
+        ELSE 'inbound'
+    END
+FROM (
+    SELECT DISTINCT ON (journey_id) journey_id, COALESCE(user_timezone, 'Europe/Minsk') AS user_timezone
+    FROM journey_events
+    ORDER BY journey_id, timestamp_utc
+) first
+WHERE first.journey_id = j.id AND j.direction IS NULL;
+
+-- Expose direction to statistics (appended, so the view can be replaced)
+CREATE OR REPLACE VIEW journey_stats AS
+SELECT
+    j.id AS journey_id,
+    j.user_id,
+    j.carrier_id,
+    c.name AS carrier,
+    j.departure_utc,
+    j.created_at,
+    j.cancelled,
+    j.anomalous,
+    j.first_event_utc AS start_utc,
+    j.last_event_utc AS end_utc,
+    j.border_seconds AS duration_seconds,
+    j.segment_seconds,
+    j.event_count,
+    j.direction
+FROM journeys j
+JOIN carriers c ON c.id = j.carrier_id
+WHERE j.completed = true AND j.anomalous = false AND j.border_seconds IS NOT NULL;
@@ -0,0 +1,20 @@
+-- Migration: Border crossings for checkpoint sequences
+-- Every checkpoint belongs to a border crossing; a journey follows the
+-- mandatory sequence of its crossing. Existing rows form the 'default'
+-- crossing, new crossings are added as checkpoint rows with their own code.
+
+ALTER TABLE checkpoints ADD COLUMN IF NOT EXISTS border TEXT NOT NULL DEFAULT 'default';
+ALTER TABLE journeys ADD COLUMN IF NOT EXISTS border TEXT NOT NULL DEFAULT 'default';
+
+-- The same checkpoint names may repeat on every crossing
+ALTER TABLE checkpoints DROP CONSTRAINT IF EXISTS checkpoints_name_order_index_key;
+ALTER TABLE checkpoints DROP CONSTRAINT IF EXISTS checkpoints_border_name_order_index_key;
+ALTER TABLE checkpoints ADD CONSTRAINT checkpoints_border_name_order_index_key UNIQUE (border, name, order_index);
+
+-- Mandatory sequences, loaded once and cached by the bot
+CREATE INDEX IF NOT EXISTS idx_checkpoints_sequence
+    ON checkpoints(border, order_index)
+    WHERE type = 'mandatory' AND required = true;
+
+COMMENT ON COLUMN checkpoints.border IS 'Border crossing code; mandatory checkpoints of one crossing form its sequence';
+COMMENT ON COLUMN journeys.border IS 'Border crossing of the journey (see checkpoints.border)';
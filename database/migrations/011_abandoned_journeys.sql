@@ -0,0 +1,38 @@
+-- Migration: Close abandoned journeys
+-- Journeys a user stopped reporting stay incomplete forever: the active
+-- journey lookup keeps finding them and the incomplete set only grows.
+-- The bot's sweeper closes them in batches with close_abandoned_journeys().
+
+-- Active journey lookup (user_id = $1 AND completed = false) reads only the
+-- few incomplete rows
+CREATE INDEX IF NOT EXISTS idx_journeys_user_active
+    ON journeys(user_id)
+    WHERE completed = false;
+
+-- Close (as cancelled, excluded from statistics) up to p_batch_size
+-- incomplete journeys created and departed before p_before that have no
+-- event at or after p_before. Returns the closed ids; run until it returns
+-- fewer than p_batch_size rows. SKIP LOCKED lets several bot instances sweep.
+CREATE OR REPLACE FUNCTION close_abandoned_journeys(
+    p_before TIMESTAMP WITHOUT TIME ZONE,
+    p_batch_size INTEGER DEFAULT 500
+)
+RETURNS TABLE (journey_id UUID)
+LANGUAGE sql AS $$
+    UPDATE journeys j
+    SET completed = true, cancelled = true, notes = 'Abandoned'
+    WHERE j.id IN (
+        SELECT s.id FROM journeys s
+        WHERE s.completed = false
+          AND s.created_at < p_before
+          AND s.departure_utc < p_before
+          AND NOT EXISTS (
+              SELECT 1 FROM journey_events e
+              WHERE e.journey_id = s.id AND e.timestamp_utc >= p_before
+          )
+        ORDER BY s.created_at
+        LIMIT p_batch_size
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING j.id;
+$$;
@@ -0,0 +1,67 @@
+-- Migration: Change notifications for in-process caches
+-- Every bot instance keeps carriers, checkpoints and journey reads in
+-- memory. These triggers publish each change on the `granica_changes`
+-- channel (NOTIFY, delivered on commit), so instances listening with
+-- LISTEN drop exactly the entries a change makes stale.
+--
+-- Payload (JSON): {"table", "op", "id"} plus, for journeys,
+-- {"user_id", "completed", "cancelled", "anomalous"}.
+
+CREATE OR REPLACE FUNCTION notify_granica_change()
+RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    r RECORD;
+    payload JSONB;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        r := OLD;
+    ELSE
+        r := NEW;
+    END IF;
+
+    payload := jsonb_build_object('table', TG_TABLE_NAME, 'op', TG_OP, 'id', r.id);
+    IF TG_TABLE_NAME = 'journeys' THEN
+        payload := payload || jsonb_build_object(
+            'user_id', r.user_id,
+            'completed', r.completed,
+            'cancelled', r.cancelled,
+            'anomalous', r.anomalous
+        );
+    END IF;
+
+    PERFORM pg_notify('granica_changes', payload::text);
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS carriers_notify_change ON carriers;
+CREATE TRIGGER carriers_notify_change
+    AFTER INSERT OR UPDATE OR DELETE ON carriers
+    FOR EACH ROW EXECUTE FUNCTION notify_granica_change();
+
+DROP TRIGGER IF EXISTS checkpoints_notify_change ON checkpoints;
+CREATE TRIGGER checkpoints_notify_change
+    AFTER INSERT OR UPDATE OR DELETE ON checkpoints
+    FOR EACH ROW EXECUTE FUNCTION notify_granica_change();
+
+-- Journeys: new and deleted rows, and updates of what the bot caches or
+-- counts (not the metrics complete_journey_with_metrics() fills in)
+DROP TRIGGER IF EXISTS journeys_notify_change ON journeys;
+CREATE TRIGGER journeys_notify_change
+    AFTER INSERT OR DELETE ON journeys
+    FOR EACH ROW EXECUTE FUNCTION notify_granica_change();
+
+DROP TRIGGER IF EXISTS journeys_notify_update ON journeys;
+CREATE TRIGGER journeys_notify_update
+    AFTER UPDATE ON journeys
+    FOR EACH ROW
+    WHEN (
+        OLD.completed IS DISTINCT FROM NEW.completed
+        OR OLD.cancelled IS DISTINCT FROM NEW.cancelled
+        OR OLD.anomalous IS DISTINCT FROM NEW.anomalous
+        OR OLD.carrier_id IS DISTINCT FROM NEW.carrier_id
+        OR OLD.departure_utc IS DISTINCT FROM NEW.departure_utc
+        OR OLD.border IS DISTINCT FROM NEW.border
+    )
+    EXECUTE FUNCTION notify_granica_change();
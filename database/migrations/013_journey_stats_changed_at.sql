@@ -0,0 +1,67 @@
+-- Migration: When a journey's statistics last changed
+-- The bot's hour-of-week forecast saves its histograms locally and catches
+-- up from the database on start. The end of a crossing (last_event_utc) is
+-- user-reported time, so it cannot tell what changed since the last save:
+-- a journey completed later but ending earlier was never counted, and a
+-- journey flagged anomalous afterwards was never removed.
+-- stats_changed_at is set by the database whenever a journey enters, leaves
+-- or changes in the statistics; catch-up reads the rows changed since.
+-- Requires 009_journey_direction.sql
+
+ALTER TABLE journeys
+ADD COLUMN IF NOT EXISTS stats_changed_at TIMESTAMP WITHOUT TIME ZONE;
+
+COMMENT ON COLUMN journeys.stats_changed_at IS 'Last change of completion, flags or metrics (UTC, database clock)';
+
+-- Existing completed journeys: as of their last event
+UPDATE journeys SET stats_changed_at = COALESCE(last_event_utc, created_at)
+WHERE completed = true AND stats_changed_at IS NULL;
+
+CREATE OR REPLACE FUNCTION touch_journey_stats_changed_at()
+RETURNS TRIGGER
+LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.stats_changed_at := NOW() AT TIME ZONE 'UTC';
+    RETURN NEW;
+END;
+$$;
+
+-- Completion, cancellation, the anomaly flag and metrics refreshed by late
+-- events (migration 006) all go through UPDATE
+DROP TRIGGER IF EXISTS journeys_stats_changed ON journeys;
+CREATE TRIGGER journeys_stats_changed
+    BEFORE UPDATE ON journeys
+    FOR EACH ROW
+    WHEN (
+        OLD.completed IS DISTINCT FROM NEW.completed
+        OR OLD.cancelled IS DISTINCT FROM NEW.cancelled
+        OR OLD.anomalous IS DISTINCT FROM NEW.anomalous
+        OR OLD.carrier_id IS DISTINCT FROM NEW.carrier_id
+        OR OLD.departure_utc IS DISTINCT FROM NEW.departure_utc
+        OR OLD.last_event_utc IS DISTINCT FROM NEW.last_event_utc
+        OR OLD.border_seconds IS DISTINCT FROM NEW.border_seconds
+        OR OLD.direction IS DISTINCT FROM NEW.direction
+    )
+    EXECUTE FUNCTION touch_journey_stats_changed_at();
+
+CREATE INDEX IF NOT EXISTS idx_journeys_stats_changed
+ON journeys(stats_changed_at)
+WHERE stats_changed_at IS NOT NULL;
+
+-- Changed journeys for the forecast catch-up; `counted` tells whether the
+-- journey belongs in the statistics now (journey_stats, not cancelled)
+CREATE OR REPLACE VIEW journey_stat_changes AS
+SELECT
+    j.id AS journey_id,
+    j.carrier_id,
+    j.departure_utc,
+    j.last_event_utc AS end_utc,
+    j.border_seconds AS duration_seconds,
+    j.direction,
+    j.stats_changed_at AS changed_at,
+    COALESCE(
+        j.completed AND j.cancelled = false AND j.anomalous = false AND j.border_seconds IS NOT NULL,
+        false
+    ) AS counted
+FROM journeys j
+WHERE j.stats_changed_at IS NOT NULL;
@@ -0,0 +1,27 @@
+-- Migration: Statistics skip cancelled journeys
+-- A cancelled journey is marked completed, and its metrics are still
+-- computed (backfill, late events), so journey_stats listed it: the latest
+-- crossings showed it while the duration summary filtered it out. The view
+-- now excludes it for every reader.
+-- Requires 009_journey_direction.sql
+
+-- Same as in 009, plus the cancelled filter
+CREATE OR REPLACE VIEW journey_stats AS
+SELECT
+    j.id AS journey_id,
+    j.user_id,
+    j.carrier_id,
+    c.name AS carrier,
+    j.departure_utc,
+    j.created_at,
+    j.cancelled,
+    j.anomalous,
+    j.first_event_utc AS start_utc,
+    j.last_event_utc AS end_utc,
+    j.border_seconds AS duration_seconds,
+    j.segment_seconds,
+    j.event_count,
+    j.direction
+FROM journeys j
+JOIN carriers c ON c.id = j.carrier_id
+WHERE j.completed = true AND j.cancelled = false AND j.anomalous = false AND j.border_seconds IS NOT NULL;
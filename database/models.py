@@ -0,0 +1,93 @@
+"""Typed rows handed to handlers, built once from backend rows."""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, Dict, Any
+
+from utils import parse_db_timestamp
+from .base import DEFAULT_BORDER
+
+# Columns the backends select for these rows (instead of `*`)
+CARRIER_COLUMNS = ("id", "name")
+CHECKPOINT_COLUMNS = ("id", "name", "order_index", "border")
+JOURNEY_COLUMNS = ("id", "user_id", "carrier_id", "departure_utc", "border", "completed", "cancelled", "anomalous")
+JOURNEY_EVENT_COLUMNS = ("journey_id", "checkpoint_id", "timestamp_utc", "source", "user_timezone")
+
+
+def select_list(columns, table: str = "") -> str:
+    """Comma-separated column list for SQL / PostgREST select, optionally qualified."""
+    prefix = f"{table}." if table else ""
+    return ", ".join(prefix + column for column in columns)
+
+
+@dataclass(frozen=True, slots=True)
+class Carrier:
+    id: str
+    name: str
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> "Carrier":
+        return cls(id=row["id"], name=row["name"])
+
+
+@dataclass(frozen=True, slots=True)
+class Checkpoint:
+    id: str
+    name: str
+    order_index: int
+    border: str
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> "Checkpoint":
+        return cls(
+            id=row["id"],
+            name=row["name"],
+            order_index=row["order_index"],
+            border=row.get("border") or DEFAULT_BORDER
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class Journey:
+    id: str
+    user_id: int
+    carrier_id: str
+    departure_utc: datetime  # aware, UTC
+    border: str
+    completed: bool
+    cancelled: bool
+    anomalous: bool
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> "Journey":
+        return cls(
+            id=row["id"],
+            user_id=row["user_id"],
+            carrier_id=row["carrier_id"],
+            departure_utc=parse_db_timestamp(row["departure_utc"]),
+            border=row.get("border") or DEFAULT_BORDER,
+            completed=bool(row.get("completed")),
+            cancelled=bool(row.get("cancelled")),
+            anomalous=bool(row.get("anomalous"))
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class JourneyEvent:
+    journey_id: str
+    checkpoint_id: str
+    checkpoint_name: str
+    timestamp_utc: datetime  # aware, UTC
+    source: str
+    user_timezone: Optional[str]
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> "JourneyEvent":
+        """From a get_journey_events row (checkpoint embedded as `checkpoints`)."""
+        return cls(
+            journey_id=row["journey_id"],
+            checkpoint_id=row["checkpoint_id"],
+            checkpoint_name=row["checkpoints"]["name"],
+            timestamp_utc=parse_db_timestamp(row["timestamp_utc"]),
+            source=row.get("source") or "manual",
+            user_timezone=row.get("user_timezone")
+        )
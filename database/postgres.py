@@ -0,0 +1,335 @@
+"""Direct Postgres database interface (asyncpg)."""
+import asyncio
+import json
+import uuid
+from datetime import datetime
+from typing import Optional, List, Dict, Any
+
+import asyncpg
+
+from utils import to_utc
+from .base import Database, DEFAULT_BORDER
+from .models import (
+    CARRIER_COLUMNS,
+    CHECKPOINT_COLUMNS,
+    JOURNEY_COLUMNS,
+    JOURNEY_EVENT_COLUMNS,
+    select_list
+)
+
+# Hot queries. Their text never changes, so asyncpg prepares each one once
+# per pooled connection and reuses the prepared statement afterwards.
+CARRIER_SELECT = select_list(CARRIER_COLUMNS)
+CHECKPOINT_SELECT = select_list(CHECKPOINT_COLUMNS)
+JOURNEY_SELECT = select_list(JOURNEY_COLUMNS)
+
+SELECT_JOURNEY_EVENTS = f"""
+    SELECT {select_list(JOURNEY_EVENT_COLUMNS, "e")},
+           jsonb_build_object({", ".join(f"'{column}', c.{column}" for column in CHECKPOINT_COLUMNS)}) AS checkpoints
+    FROM journey_events e
+    JOIN checkpoints c ON c.id = e.checkpoint_id
+    WHERE e.journey_id = $1
+    ORDER BY e.timestamp_utc
+"""
+
+SELECT_USER_ACTIVE_JOURNEY = f"""
+    SELECT {JOURNEY_SELECT} FROM journeys
+    WHERE user_id = $1 AND completed = false
+    ORDER BY created_at DESC
+    LIMIT 1
+"""
+
+INSERT_JOURNEY_EVENT = """
+    INSERT INTO journey_events
+        (journey_id, checkpoint_id, timestamp_utc, source, user_timezone, lat, lon)
+    VALUES ($1, $2, $3, $4, $5, $6, $7)
+    RETURNING *
+"""
+
+UPSERT_JOURNEY_EVENTS = """
+    INSERT INTO journey_events
+        (journey_id, checkpoint_id, timestamp_utc, source, user_timezone, lat, lon)
+    SELECT * FROM unnest(
+        $1::uuid[], $2::uuid[], $3::timestamp[], $4::text[], $5::text[],
+        $6::double precision[], $7::double precision[]
+    )
+    ON CONFLICT (journey_id, checkpoint_id) DO NOTHING
+    RETURNING *
+"""
+
+SELECT_LATEST_BORDER_STATS = """
+    SELECT journey_id, carrier, start_utc, end_utc, duration_seconds
+    FROM journey_stats
+    ORDER BY created_at DESC
+    LIMIT $1
+"""
+
+
+def _to_db_timestamp(dt: datetime) -> datetime:
+    """Columns are TIMESTAMP WITHOUT TIME ZONE holding UTC."""
+    return to_utc(dt).replace(tzinfo=None)
+
+
+def _row(record: Optional[asyncpg.Record]) -> Optional[Dict[str, Any]]:
+    """Convert a record to the same dict shape PostgREST returns."""
+    if record is None:
+        return None
+    row = {}
+    for key, value in record.items():
+        if isinstance(value, uuid.UUID):
+            value = str(value)
+        elif isinstance(value, datetime):
+            value = value.isoformat()
+        row[key] = value
+    return row
+
+
+def _rows(records: List[asyncpg.Record]) -> List[Dict[str, Any]]:
+    return [_row(record) for record in records]
+
+
+class PostgresDatabase(Database):
+    """
+    Postgres database interface talking to the database directly.
+
+    Skips the PostgREST HTTP/JSON hop. Returns rows in the same shape as the
+    Supabase interface (ids and timestamps as strings, embedded relations as
+    nested dicts), so handlers work unchanged.
+
+    Needs a direct (session mode) connection string: a transaction-mode
+    pooler does not keep prepared statements between queries.
+    """
+
+    # The server answered - retrying or tripping the breaker would not help
+    non_transient_errors = (
+        ValueError,  # malformed id from user input (uuid.UUID)
+        asyncpg.exceptions.IntegrityConstraintViolationError,
+        asyncpg.exceptions.DataError,
+        asyncpg.exceptions.SyntaxOrAccessError
+    )
+
+    def __init__(
+        self,
+        dsn: str,
+        min_size: int = 2,
+        max_size: int = 20,
+        statement_cache_size: int = 100,
+        command_timeout: Optional[float] = None
+    ):
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.statement_cache_size = statement_cache_size
+        # Enforced by asyncpg, which cancels the query on the server
+        self.command_timeout = command_timeout
+        self._pool: Optional[asyncpg.Pool] = None
+        self._pool_lock = asyncio.Lock()
+
+    async def pool(self) -> asyncpg.Pool:
+        """Connection pool, created on first use."""
+        async with self._pool_lock:
+            if self._pool is None:
+                self._pool = await asyncpg.create_pool(
+                    self.dsn,
+                    min_size=self.min_size,
+                    max_size=self.max_size,
+                    statement_cache_size=self.statement_cache_size,
+                    command_timeout=self.command_timeout,
+                    init=self._init_connection
+                )
+        return self._pool
+
+    @staticmethod
+    async def _init_connection(conn: asyncpg.Connection) -> None:
+        await conn.set_type_codec("jsonb", encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
+
+    async def close(self) -> None:
+        """Close the connection pool."""
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+    async def _fetch(self, query: str, *args) -> List[Dict[str, Any]]:
+        pool = await self.pool()
+        return _rows(await pool.fetch(query, *args))
+
+    async def _fetchrow(self, query: str, *args) -> Optional[Dict[str, Any]]:
+        pool = await self.pool()
+        return _row(await pool.fetchrow(query, *args))
+
+    # Carriers
+    async def get_carriers(self) -> List[Dict[str, Any]]:
+        """Get all carriers."""
+        return await self._fetch(f"SELECT {CARRIER_SELECT} FROM carriers")
+
+    async def get_carrier_by_id(self, carrier_id: str) -> Optional[Dict[str, Any]]:
+        """Get carrier by ID."""
+        return await self._fetchrow(f"SELECT {CARRIER_SELECT} FROM carriers WHERE id = $1", uuid.UUID(carrier_id))
+
+    # Checkpoints
+    async def get_mandatory_checkpoints(self) -> List[Dict[str, Any]]:
+        """Get mandatory checkpoints of all border crossings, ordered by crossing, then sequence."""
+        return await self._fetch(
+            f"SELECT {CHECKPOINT_SELECT} FROM checkpoints "
+            "WHERE type = 'mandatory' AND required = true ORDER BY border, order_index"
+        )
+
+    async def get_checkpoint_by_id(self, checkpoint_id: str) -> Optional[Dict[str, Any]]:
+        """Get checkpoint by ID."""
+        return await self._fetchrow(
+            f"SELECT {CHECKPOINT_SELECT} FROM checkpoints WHERE id = $1", uuid.UUID(checkpoint_id)
+        )
+
+    # Journeys
+    async def create_journey(
+        self,
+        user_id: int,
+        carrier_id: str,
+        departure_utc: datetime,
+        border: str = DEFAULT_BORDER,
+        journey_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Create a new journey; idempotent for a given `journey_id` (see Database)."""
+        journey_id = journey_id or str(uuid.uuid4())
+        row = await self._fetchrow(
+            """
+            INSERT INTO journeys (id, user_id, carrier_id, departure_utc, border, completed, anomalous)
+            VALUES ($1, $2, $3, $4, $5, false, false)
+            ON CONFLICT (id) DO NOTHING
+            RETURNING *
+            """,
+            uuid.UUID(journey_id), user_id, uuid.UUID(carrier_id), _to_db_timestamp(departure_utc), border
+        )
+        # None: already created by an earlier attempt
+        return row or await self._fetchrow("SELECT * FROM journeys WHERE id = $1", uuid.UUID(journey_id))
+
+    async def get_journey(self, journey_id: str) -> Optional[Dict[str, Any]]:
+        """Get journey by ID."""
+        return await self._fetchrow(f"SELECT {JOURNEY_SELECT} FROM journeys WHERE id = $1", uuid.UUID(journey_id))
+
+    async def get_journeys(self, journey_ids: List[str]) -> List[Dict[str, Any]]:
+        """Get journeys by IDs in one query (unknown IDs are skipped, order is arbitrary)."""
+        return await self._fetch(
+            f"SELECT {JOURNEY_SELECT} FROM journeys WHERE id = ANY($1::uuid[])",
+            [uuid.UUID(journey_id) for journey_id in journey_ids]
+        )
+
+    async def complete_journey(self, journey_id: str) -> Dict[str, Any]:
+        """Mark journey as completed and store its metrics (one transaction)."""
+        return await self._fetchrow("SELECT * FROM complete_journey_with_metrics($1)", uuid.UUID(journey_id))
+
+    async def backfill_journey_metrics(self, batch_size: int = 500) -> int:
+        """Compute metrics of up to `batch_size` completed journeys that have none."""
+        pool = await self.pool()
+        return await pool.fetchval("SELECT backfill_journey_metrics($1)", batch_size)
+
+    async def close_abandoned_journeys(self, before: datetime, batch_size: int = 500) -> List[str]:
+        """Close up to `batch_size` incomplete journeys abandoned before `before`."""
+        rows = await self._fetch(
+            "SELECT journey_id FROM close_abandoned_journeys($1, $2)",
+            _to_db_timestamp(before), batch_size
+        )
+        return [row["journey_id"] for row in rows]
+
+    async def cancel_journey(self, journey_id: str) -> Dict[str, Any]:
+        """Mark journey as cancelled."""
+        return await self._fetchrow(
+            """
+            UPDATE journeys SET completed = true, cancelled = true, notes = 'Cancelled by user'
+            WHERE id = $1 RETURNING *
+            """,
+            uuid.UUID(journey_id)
+        )
+
+    async def set_journeys_anomalous(self, journey_ids: List[str], anomalous: bool) -> None:
+        """Set the `anomalous` flag of the given journeys."""
+        pool = await self.pool()
+        await pool.execute(
+            "UPDATE journeys SET anomalous = $2 WHERE id = ANY($1::uuid[])",
+            [uuid.UUID(journey_id) for journey_id in journey_ids], anomalous
+        )
+
+    async def get_user_active_journey(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Get user's active (incomplete) journey."""
+        return await self._fetchrow(SELECT_USER_ACTIVE_JOURNEY, user_id)
+
+    # Journey Events
+    async def create_journey_event(
+        self,
+        journey_id: str,
+        checkpoint_id: str,
+        timestamp_utc: datetime,
+        source: str = "manual",
+        user_timezone: str = "Europe/Minsk",
+        lat: Optional[float] = None,
+        lon: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Create a journey event (checkpoint timestamp)."""
+        return await self._fetchrow(
+            INSERT_JOURNEY_EVENT,
+            uuid.UUID(journey_id), uuid.UUID(checkpoint_id), _to_db_timestamp(timestamp_utc),
+            source, user_timezone, lat, lon
+        )
+
+    async def upsert_journey_events(self, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Insert a batch of journey events, skipping ones already stored.
+
+        UNIQUE(journey_id, checkpoint_id) is used as the idempotency key, so
+        the same batch can be safely retried.
+        """
+        return await self._fetch(
+            UPSERT_JOURNEY_EVENTS,
+            [uuid.UUID(e["journey_id"]) for e in events],
+            [uuid.UUID(e["checkpoint_id"]) for e in events],
+            [_to_db_timestamp(datetime.fromisoformat(e["timestamp_utc"])) for e in events],
+            [e["source"] for e in events],
+            [e["user_timezone"] for e in events],
+            [e.get("lat") for e in events],
+            [e.get("lon") for e in events]
+        )
+
+    async def get_journey_events(self, journey_id: str) -> List[Dict[str, Any]]:
+        """Get all events for a journey, ordered by timestamp."""
+        return await self._fetch(SELECT_JOURNEY_EVENTS, uuid.UUID(journey_id))
+
+    async def load_analytics_events(self, since: datetime) -> List[Dict[str, Any]]:
+        """Load events of completed, not cancelled journeys that ended after `since`."""
+        return await self._fetch(
+            """
+            SELECT journey_id, carrier_id, checkpoint_id, ts, anomalous
+            FROM analytics_events
+            WHERE journey_end_utc >= $1
+            """,
+            _to_db_timestamp(since)
+        )
+
+    async def load_journey_stat_changes(self, since: datetime) -> List[Dict[str, Any]]:
+        """Load journeys whose statistics changed at or after `since`."""
+        return await self._fetch(
+            """
+            SELECT journey_id, carrier_id, departure_utc, end_utc, duration_seconds, direction, changed_at, counted
+            FROM journey_stat_changes
+            WHERE changed_at >= $1
+            """,
+            _to_db_timestamp(since)
+        )
+
+    async def get_live_border_events(self, since: datetime) -> List[Dict[str, Any]]:
+        """Get events recorded after `since` of journeys that are not cancelled."""
+        return await self._fetch(
+            """
+            SELECT e.journey_id, e.checkpoint_id, e.timestamp_utc, e.user_timezone, j.completed
+            FROM journey_events e
+            JOIN journeys j ON j.id = e.journey_id
+            WHERE e.timestamp_utc >= $1 AND j.cancelled = false
+            """,
+            _to_db_timestamp(since)
+        )
+
+    async def get_latest_border_stats(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Get latest completed journeys with their border crossing duration."""
+        return await self._fetch(SELECT_LATEST_BORDER_STATS, limit)
+
+    async def get_border_duration_summary(self, since: datetime) -> Dict[str, Any]:
+        """Get duration aggregates of completed journeys that ended after `since`."""
+        return await self._fetchrow("SELECT * FROM border_duration_summary($1)", _to_db_timestamp(since))
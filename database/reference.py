@@ -0,0 +1,154 @@
+"""Reference data (carriers, mandatory checkpoints) served from memory and a local snapshot."""
+import asyncio
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from config import settings
+from .base import Database
+from .db import db
+
+logger = logging.getLogger(__name__)
+
+
+class ReferenceData:
+    """
+    Carriers and mandatory checkpoints, kept in memory.
+
+    They change a few times a year but are read by almost every update.
+    start() loads the last snapshot saved to `path` (a small JSON file), so
+    the first users after a restart are answered without waiting for the
+    database, then refreshes from the database in the background every
+    `interval` seconds. A refresh that changes anything rewrites the
+    snapshot and notifies the listeners (e.g. CheckpointSequences.invalidate).
+    With no snapshot yet, the first read waits for the database.
+
+    get_carriers() and get_mandatory_checkpoints() mirror the Database
+    methods, so this stands in for the database wherever only they are read.
+    Returned rows are shared: do not modify them.
+    """
+
+    def __init__(self, database: Database, path: str, interval: float = 600.0):
+        self.database = database
+        self.path = Path(path)
+        self.interval = interval
+        self._data: Optional[Dict[str, List[Dict[str, Any]]]] = None
+        self._listeners: List[Callable[[], Any]] = []
+        self._lock = asyncio.Lock()
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def add_listener(self, listener: Callable[[], Any]) -> None:
+        """Call `listener()` whenever a refresh changes the data."""
+        self._listeners.append(listener)
+
+    async def get_carriers(self) -> List[Dict[str, Any]]:
+        """All carriers."""
+        return (await self._loaded())["carriers"]
+
+    async def get_mandatory_checkpoints(self) -> List[Dict[str, Any]]:
+        """Mandatory checkpoints of all border crossings."""
+        return (await self._loaded())["checkpoints"]
+
+    async def _loaded(self) -> Dict[str, List[Dict[str, Any]]]:
+        if self._data is None:
+            async with self._lock:
+                if self._data is None:
+                    await self.refresh()
+        return self._data
+
+    async def refresh(self) -> bool:
+        """Reload from the database; returns whether anything changed."""
+        carriers, checkpoints = await asyncio.gather(
+            self.database.get_carriers(),
+            self.database.get_mandatory_checkpoints()
+        )
+        data = {"carriers": carriers, "checkpoints": checkpoints}
+        if data == self._data:
+            return False
+
+        changed = self._data is not None
+        self._data = data
+        logger.info(f"Reference data: {len(carriers)} carriers, {len(checkpoints)} checkpoints")
+        try:
+            await asyncio.to_thread(self._save, data)
+        except OSError as e:
+            logger.warning(f"Reference snapshot not saved: {e}")
+        if changed:
+            for listener in self._listeners:
+                listener()
+        return True
+
+    def refresh_soon(self) -> None:
+        """Refresh in the background now instead of at the next interval."""
+        self._wake.set()
+
+    def _save(self, data: Dict[str, List[Dict[str, Any]]]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # A temporary file of its own: worker processes save the same snapshot concurrently
+        tmp = tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", dir=self.path.parent, prefix=f".{self.path.name}.", suffix=".tmp", delete=False
+        )
+        try:
+            with tmp:
+                json.dump(data, tmp, ensure_ascii=False)
+            os.replace(tmp.name, self.path)  # a reader never sees half a file
+        except BaseException:
+            os.unlink(tmp.name)
+            raise
+
+    def _read(self) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+        if not self.path.exists():
+            return None
+        data = json.loads(self.path.read_text(encoding="utf-8"))
+        if not isinstance(data, dict) or not all(
+            isinstance(data.get(key), list) for key in ("carriers", "checkpoints")
+        ):
+            raise ValueError("unexpected format")
+        return data
+
+    async def start(self) -> None:
+        """Serve the saved snapshot, if any, and keep it fresh in the background."""
+        if self._data is None:
+            try:
+                data = await asyncio.to_thread(self._read)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Reference snapshot {self.path} ignored: {e}")
+                data = None
+            if data is not None and self._data is None:
+                self._data = data
+                logger.info(
+                    f"Reference data from snapshot: {len(data['carriers'])} carriers, "
+                    f"{len(data['checkpoints'])} checkpoints"
+                )
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"Reference data refresh failed: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+
+# Global reference data, shared by handlers and checkpoint sequences
+reference = ReferenceData(db, settings.reference_snapshot_path, settings.reference_refresh_interval)
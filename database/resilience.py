@@ -0,0 +1,247 @@
+"""Resilience layer around the database: timeouts, retries and circuit breaker."""
+import asyncio
+import functools
+import logging
+import random
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseUnavailableError(Exception):
+    """Database call failed fast or timed out; safe to show a 'try later' message."""
+
+
+class CircuitOpenError(DatabaseUnavailableError):
+    """Circuit breaker is open, call was not attempted."""
+
+
+class DatabaseOverloadedError(DatabaseUnavailableError):
+    """Too many calls are already waiting, call was shed."""
+
+
+class CircuitBreaker:
+    """
+    Classic three-state circuit breaker.
+
+    closed -> open after `failure_threshold` consecutive failures;
+    open -> half_open after `reset_timeout` seconds, letting one trial call through;
+    half_open -> closed on success, back to open on failure.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._state = self.CLOSED
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        """Current state, moving from open to half_open once the timeout passes."""
+        if self._state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self._transition(self.HALF_OPEN)
+        return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may be attempted now."""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._trial_in_flight = False
+        if self._state != self.CLOSED:
+            self._transition(self.CLOSED)
+
+    def release_trial(self) -> None:
+        """The trial call ended without a verdict (e.g. cancelled): let another one through."""
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial_in_flight = False
+        if self._state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            if self._state != self.OPEN:
+                self._transition(self.OPEN)
+
+    def _transition(self, state: str) -> None:
+        logger.warning(f"Database circuit breaker: {self._state} -> {state}")
+        self._state = state
+
+
+class ResilientDatabase:
+    """
+    Wraps a database backend with per-call timeouts, jittered retries for
+    reads, a circuit breaker and load shedding.
+
+    Reads (`get_*` methods) are retried and their last good result is kept;
+    while the breaker is open or all retries fail, that cached result is
+    served instead (degraded mode). Writes get a single attempt, since
+    retrying a non-idempotent insert could duplicate rows, and no timeout
+    of their own: the backend's request timeout applies, so a write
+    reported as failed did not commit later.
+    """
+
+    def __init__(
+        self,
+        database: Any,
+        timeout: float = 5.0,
+        read_retries: int = 2,
+        retry_base_delay: float = 0.2,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        max_concurrency: int = 20,
+        max_pending: int = 100,
+        cache_size: int = 1024,
+        non_transient: Optional[tuple] = None
+    ):
+        self.database = database
+        self.timeout = timeout
+        self.read_retries = read_retries
+        self.retry_base_delay = retry_base_delay
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self.cache_size = cache_size
+        # Errors meaning the database answered (bad request, constraint, not
+        # found) - raised as is, never retried or counted against the breaker
+        self._non_transient = non_transient
+
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._in_flight = 0
+        self._shed = 0
+        self._served_stale = 0
+        self._cache: "OrderedDict[tuple, Any]" = OrderedDict()
+
+    @property
+    def non_transient(self) -> tuple:
+        # Asked of the backend on first use: it may not exist before (LazyDatabase)
+        if self._non_transient is None:
+            self._non_transient = getattr(self.database, "non_transient_errors", ())
+        return self._non_transient
+
+    def __getattr__(self, name: str):
+        attr = getattr(self.database, name)
+        if not asyncio.iscoroutinefunction(attr):
+            return attr
+
+        idempotent = name.startswith("get_")
+
+        @functools.wraps(attr)
+        async def call(*args, **kwargs):
+            return await self._call(name, attr, args, kwargs, idempotent)
+
+        return call
+
+    def stats(self) -> Dict[str, Any]:
+        """Breaker state and load counters, for logs and health checks."""
+        return {
+            "breaker": self.breaker.state,
+            "failures": self.breaker.failures,
+            "in_flight": self._in_flight,
+            "shed": self._shed,
+            "served_stale": self._served_stale,
+            "cached": len(self._cache)
+        }
+
+    def invalidate(self, name: Optional[str] = None, *args) -> None:
+        """Drop cached read results: all of them, of one method, or of one call with positional `args`."""
+        if name is None:
+            self._cache.clear()
+            return
+        if args:
+            self._cache.pop(self._cache_key(name, args, {}), None)
+            return
+        for key in [key for key in self._cache if key[0] == name]:
+            del self._cache[key]
+
+    async def _call(self, name: str, method, args: tuple, kwargs: dict, idempotent: bool):
+        key = self._cache_key(name, args, kwargs) if idempotent else None
+
+        trial = self.breaker.state == CircuitBreaker.HALF_OPEN
+        if not self.breaker.allow():
+            return self._fallback(key, CircuitOpenError(f"{name}: circuit open"))
+        try:
+            return await self._attempt(name, method, args, kwargs, idempotent, key)
+        finally:
+            # A cancelled trial records neither success nor failure; without
+            # this the breaker would stay half-open with no trial ever allowed
+            if trial:
+                self.breaker.release_trial()
+
+    async def _attempt(self, name: str, method, args: tuple, kwargs: dict, idempotent: bool, key: Optional[tuple]):
+        # Shed load instead of piling up coroutines behind a slow database
+        if self._in_flight >= self.max_concurrency + self.max_pending:
+            self._shed += 1
+            return self._fallback(key, DatabaseOverloadedError(f"{name}: too many pending calls"))
+
+        self._in_flight += 1
+        try:
+            async with self._semaphore:
+                attempts = 1 + (self.read_retries if idempotent else 0)
+                for attempt in range(attempts):
+                    try:
+                        if idempotent:
+                            result = await asyncio.wait_for(method(*args, **kwargs), timeout=self.timeout)
+                        else:
+                            # No wait_for: it would stop waiting, not the write (a
+                            # thread or a query keeps going and may still commit
+                            # after the caller was told it failed). Writes are
+                            # bounded by the backend's own request/command timeout.
+                            result = await method(*args, **kwargs)
+                    except self.non_transient:
+                        self.breaker.record_success()
+                        raise
+                    except Exception as e:
+                        if attempt + 1 < attempts:
+                            # Full jitter: avoid retry storms in lockstep
+                            await asyncio.sleep(random.uniform(0, self.retry_base_delay * 2 ** attempt))
+                            continue
+                        self.breaker.record_failure()
+                        logger.warning(f"Database call {name} failed after {attempts} attempt(s): {e!r}")
+                        error = DatabaseUnavailableError(f"{name}: {e!r}")
+                        error.__cause__ = e
+                        return self._fallback(key, error)
+
+                    self.breaker.record_success()
+                    if key is not None:
+                        self._remember(key, result)
+                    return result
+        finally:
+            self._in_flight -= 1
+
+    def _fallback(self, key: Optional[tuple], error: Exception):
+        """Serve the last good result for a read, or raise."""
+        if key is not None and key in self._cache:
+            self._served_stale += 1
+            return self._cache[key]
+        raise error
+
+    def _remember(self, key: tuple, result: Any) -> None:
+        self._cache[key] = result
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    @staticmethod
+    def _cache_key(name: str, args: tuple, kwargs: dict) -> Optional[tuple]:
+        key = (name, args, tuple(sorted(kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
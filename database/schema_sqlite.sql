@@ -0,0 +1,179 @@
+-- Granica Bot Database Schema for the embedded SQLite backend
+-- Mirrors schema.sql with all migrations applied.
+-- UUIDs are generated by the application; timestamps are UTC ISO-8601 text
+-- (YYYY-MM-DDTHH:MM:SS[.ffffff]), so text order is chronological order.
+-- Views are recreated on every start, so existing files pick up changes.
+
+-- Carriers (bus companies)
+CREATE TABLE IF NOT EXISTS carriers (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+);
+
+-- Routes
+CREATE TABLE IF NOT EXISTS routes (
+    id TEXT PRIMARY KEY,
+    carrier_id TEXT NOT NULL REFERENCES carriers(id),
+    origin TEXT NOT NULL,
+    destination TEXT NOT NULL,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+);
+
+-- Checkpoints (predefined border checkpoints)
+CREATE TABLE IF NOT EXISTS checkpoints (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    type TEXT NOT NULL CHECK (type IN ('mandatory', 'optional')),
+    order_index INTEGER NOT NULL,
+    required INTEGER DEFAULT 1,
+    border TEXT NOT NULL DEFAULT 'default', -- border crossing (see migration 010)
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now')),
+    UNIQUE(border, name, order_index)
+);
+
+-- Journeys (user trips)
+CREATE TABLE IF NOT EXISTS journeys (
+    id TEXT PRIMARY KEY,
+    user_id INTEGER NOT NULL, -- Telegram user ID
+    carrier_id TEXT NOT NULL REFERENCES carriers(id),
+    departure_utc TEXT NOT NULL,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now')),
+    completed INTEGER DEFAULT 0,
+    anomalous INTEGER DEFAULT 0,
+    cancelled INTEGER DEFAULT 0,
+    notes TEXT,
+    -- Metrics written at completion (see migration 006)
+    first_event_utc TEXT,
+    last_event_utc TEXT,
+    border_seconds INTEGER,
+    segment_seconds TEXT, -- JSON object
+    event_count INTEGER,
+    direction TEXT CHECK (direction IN ('outbound', 'inbound')), -- see migration 009
+    border TEXT NOT NULL DEFAULT 'default', -- see migration 010
+    stats_changed_at TEXT -- see migration 013
+);
+
+-- Journey Events (checkpoint timestamps)
+CREATE TABLE IF NOT EXISTS journey_events (
+    id TEXT PRIMARY KEY,
+    journey_id TEXT NOT NULL REFERENCES journeys(id) ON DELETE CASCADE,
+    checkpoint_id TEXT NOT NULL REFERENCES checkpoints(id),
+    timestamp_utc TEXT NOT NULL,
+    source TEXT NOT NULL CHECK (source IN ('manual', 'gps', 'system')),
+    lat REAL,
+    lon REAL,
+    user_timezone TEXT DEFAULT 'Europe/Minsk',
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now')),
+    UNIQUE(journey_id, checkpoint_id)
+);
+
+-- Indexes for performance
+CREATE INDEX IF NOT EXISTS idx_journeys_user_id ON journeys(user_id);
+CREATE INDEX IF NOT EXISTS idx_journeys_departure ON journeys(departure_utc);
+CREATE INDEX IF NOT EXISTS idx_journeys_user_active ON journeys(user_id, created_at) WHERE completed = 0;
+CREATE INDEX IF NOT EXISTS idx_journeys_completed_created ON journeys(created_at) WHERE completed = 1;
+CREATE INDEX IF NOT EXISTS idx_journeys_last_event ON journeys(last_event_utc) WHERE completed = 1 AND border_seconds IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_journeys_border_seconds ON journeys(border_seconds) WHERE completed = 1 AND border_seconds IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_journeys_stats_created ON journeys(created_at) WHERE completed = 1 AND anomalous = 0 AND border_seconds IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_journeys_stats_end ON journeys(last_event_utc) WHERE completed = 1 AND anomalous = 0 AND border_seconds IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_journeys_stats_changed ON journeys(stats_changed_at) WHERE stats_changed_at IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_journey_events_journey_ts ON journey_events(journey_id, timestamp_utc);
+CREATE INDEX IF NOT EXISTS idx_journey_events_timestamp ON journey_events(timestamp_utc);
+CREATE INDEX IF NOT EXISTS idx_checkpoints_mandatory ON checkpoints(order_index) WHERE type = 'mandatory' AND required = 1;
+CREATE INDEX IF NOT EXISTS idx_checkpoints_sequence ON checkpoints(border, order_index) WHERE type = 'mandatory' AND required = 1;
+CREATE INDEX IF NOT EXISTS idx_routes_carrier ON routes(carrier_id);
+
+-- One row per journey with its border crossing duration (see migration 005)
+DROP VIEW IF EXISTS journey_durations;
+CREATE VIEW journey_durations AS
+SELECT
+    j.id AS journey_id,
+    j.user_id,
+    j.carrier_id,
+    c.name AS carrier,
+    j.departure_utc,
+    j.created_at,
+    j.completed,
+    j.cancelled,
+    j.anomalous,
+    MIN(e.timestamp_utc) AS start_utc,
+    MAX(e.timestamp_utc) AS end_utc,
+    CAST(ROUND((julianday(MAX(e.timestamp_utc)) - julianday(MIN(e.timestamp_utc))) * 86400) AS INTEGER) AS duration_seconds,
+    COUNT(e.id) AS event_count
+FROM journeys j
+JOIN carriers c ON c.id = j.carrier_id
+LEFT JOIN journey_events e ON e.journey_id = j.id
+GROUP BY j.id;
+
+
+-- Completed, not cancelled, not anomalous journeys with a duration, read
+-- from the metric columns (see migrations 006, 008, 009 and 014)
+DROP VIEW IF EXISTS journey_stats;
+CREATE VIEW journey_stats AS
+SELECT
+    j.id AS journey_id,
+    j.user_id,
+    j.carrier_id,
+    c.name AS carrier,
+    j.departure_utc,
+    j.created_at,
+    j.cancelled,
+    j.anomalous,
+    j.first_event_utc AS start_utc,
+    j.last_event_utc AS end_utc,
+    j.border_seconds AS duration_seconds,
+    j.segment_seconds,
+    j.event_count,
+    j.direction
+FROM journeys j
+JOIN carriers c ON c.id = j.carrier_id
+WHERE j.completed = 1 AND j.cancelled = 0 AND j.anomalous = 0 AND j.border_seconds IS NOT NULL;
+
+-- Flat event rows for batch analytics (see migrations 007 and 008)
+DROP VIEW IF EXISTS analytics_events;
+CREATE VIEW analytics_events AS
+SELECT
+    e.journey_id,
+    j.carrier_id,
+    e.checkpoint_id,
+    ROUND((julianday(e.timestamp_utc) - 2440587.5) * 86400.0, 3) AS ts,
+    j.last_event_utc AS journey_end_utc,
+    j.anomalous
+FROM journey_events e
+JOIN journeys j ON j.id = e.journey_id
+WHERE j.completed = 1 AND j.cancelled = 0;
+
+-- When a journey entered, left or changed in the statistics (see migration 013)
+UPDATE journeys SET stats_changed_at = COALESCE(last_event_utc, created_at)
+WHERE completed = 1 AND stats_changed_at IS NULL;
+
+DROP TRIGGER IF EXISTS journeys_stats_changed;
+CREATE TRIGGER journeys_stats_changed
+AFTER UPDATE ON journeys
+FOR EACH ROW
+WHEN OLD.completed IS NOT NEW.completed
+    OR OLD.cancelled IS NOT NEW.cancelled
+    OR OLD.anomalous IS NOT NEW.anomalous
+    OR OLD.carrier_id IS NOT NEW.carrier_id
+    OR OLD.departure_utc IS NOT NEW.departure_utc
+    OR OLD.last_event_utc IS NOT NEW.last_event_utc
+    OR OLD.border_seconds IS NOT NEW.border_seconds
+    OR OLD.direction IS NOT NEW.direction
+BEGIN
+    UPDATE journeys SET stats_changed_at = strftime('%Y-%m-%dT%H:%M:%f', 'now') WHERE id = NEW.id;
+END;
+
+DROP VIEW IF EXISTS journey_stat_changes;
+CREATE VIEW journey_stat_changes AS
+SELECT
+    j.id AS journey_id,
+    j.carrier_id,
+    j.departure_utc,
+    j.last_event_utc AS end_utc,
+    j.border_seconds AS duration_seconds,
+    j.direction,
+    j.stats_changed_at AS changed_at,
+    (j.completed = 1 AND j.cancelled = 0 AND j.anomalous = 0 AND j.border_seconds IS NOT NULL) AS counted
+FROM journeys j
+WHERE j.stats_changed_at IS NOT NULL;
@@ -0,0 +1,502 @@
+"""Embedded SQLite database interface (aiosqlite)."""
+import asyncio
+import json
+import os
+import sqlite3
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, List, Dict, Any
+
+import aiosqlite
+
+from utils import to_utc
+from .base import Database, DEFAULT_BORDER
+from .models import (
+    CARRIER_COLUMNS,
+    CHECKPOINT_COLUMNS,
+    JOURNEY_COLUMNS,
+    JOURNEY_EVENT_COLUMNS,
+    select_list
+)
+
+SCHEMA_PATH = Path(__file__).parent / "schema_sqlite.sql"
+
+# Same defaults as schema.sql (after migrations)
+DEFAULT_CHECKPOINTS = [
+    ("approaching_border", "mandatory", 1, True),
+    ("entering_checkpoint_1", "mandatory", 2, True),
+    ("passed_passport_control_1", "mandatory", 3, True),
+    ("leaving_checkpoint_1", "optional", 4, False),
+    ("entering_checkpoint_2", "mandatory", 5, True),
+    ("passed_passport_control_2", "mandatory", 6, True),
+    ("leaving_checkpoint_2", "mandatory", 7, True),
+]
+DEFAULT_CARRIERS = ["FlixBus", "Ecolines", "Lux Express", "Simple Express", "Other"]
+
+# Explicit column lists instead of `*` (see database/models.py)
+CARRIER_SELECT = select_list(CARRIER_COLUMNS)
+CHECKPOINT_SELECT = select_list(CHECKPOINT_COLUMNS)
+JOURNEY_SELECT = select_list(JOURNEY_COLUMNS)
+JOURNEY_EVENT_SELECT = select_list(JOURNEY_EVENT_COLUMNS)
+
+# SQLite has no boolean type; convert these back so rows match PostgREST
+BOOLEAN_COLUMNS = {"completed", "anomalous", "cancelled", "required", "counted"}
+# Stored as JSON text where Postgres has JSONB
+JSON_COLUMNS = {"segment_seconds"}
+
+# Columns added after the first release of this schema; added in place to
+# existing database files before schema_sqlite.sql runs
+ADDED_COLUMNS = {
+    "journeys": [
+        ("first_event_utc", "TEXT"),
+        ("last_event_utc", "TEXT"),
+        ("border_seconds", "INTEGER"),
+        ("segment_seconds", "TEXT"),
+        ("event_count", "INTEGER"),
+        ("direction", "TEXT"),
+        ("border", "TEXT NOT NULL DEFAULT 'default'"),
+        ("stats_changed_at", "TEXT"),
+    ],
+    "checkpoints": [
+        ("border", "TEXT NOT NULL DEFAULT 'default'"),
+    ],
+}
+
+
+def _to_db_timestamp(dt: datetime) -> str:
+    """Timestamps are stored as naive UTC ISO-8601 text."""
+    return to_utc(dt).replace(tzinfo=None).isoformat()
+
+
+def _row(cursor: sqlite3.Cursor, values: tuple) -> Dict[str, Any]:
+    row = {}
+    for (name, *_), value in zip(cursor.description, values):
+        if name in BOOLEAN_COLUMNS and value is not None:
+            value = bool(value)
+        elif name in JSON_COLUMNS and value is not None:
+            value = json.loads(value)
+        row[name] = value
+    return row
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    """Linear interpolation between closest ranks, like Postgres percentile_cont."""
+    position = (len(sorted_values) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def _seconds_between(start: str, end: str) -> int:
+    return round((datetime.fromisoformat(end) - datetime.fromisoformat(start)).total_seconds())
+
+
+class SQLiteDatabase(Database):
+    """
+    Embedded SQLite database interface.
+
+    Implements the schema of `database/schema.sql` in a local file (WAL mode,
+    indexes for the hot lookups), so local runs, benchmarks and single-node
+    deployments need no Supabase project. Default checkpoints and carriers
+    are seeded on first use.
+    """
+
+    non_transient_errors = (sqlite3.IntegrityError,)
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self._conn: Optional[aiosqlite.Connection] = None
+        self._conn_lock = asyncio.Lock()
+
+    async def connection(self) -> aiosqlite.Connection:
+        """Open the database and apply the schema on first use."""
+        if self._conn is not None:
+            return self._conn
+        async with self._conn_lock:
+            if self._conn is None:
+                if self.path != ":memory:":
+                    directory = os.path.dirname(self.path)
+                    if directory:
+                        os.makedirs(directory, exist_ok=True)
+                conn = await aiosqlite.connect(self.path)
+                conn.row_factory = _row
+                await conn.execute("PRAGMA journal_mode=WAL")
+                await conn.execute("PRAGMA synchronous=NORMAL")
+                await conn.execute("PRAGMA foreign_keys=ON")
+                await self._add_columns(conn)
+                await conn.executescript(SCHEMA_PATH.read_text())
+                await self._seed(conn)
+                self._conn = conn
+        return self._conn
+
+    @staticmethod
+    async def _add_columns(conn: aiosqlite.Connection) -> None:
+        for table, columns in ADDED_COLUMNS.items():
+            async with conn.execute(f"PRAGMA table_info({table})") as cursor:
+                existing = {row["name"] for row in await cursor.fetchall()}
+            if not existing:
+                continue  # Fresh file, created by the schema script
+            for name, declaration in columns:
+                if name not in existing:
+                    await conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {declaration}")
+        await conn.commit()
+
+    @staticmethod
+    async def _seed(conn: aiosqlite.Connection) -> None:
+        await conn.executemany(
+            "INSERT OR IGNORE INTO checkpoints (id, name, type, order_index, required) VALUES (?, ?, ?, ?, ?)",
+            [(str(uuid.uuid4()), *checkpoint) for checkpoint in DEFAULT_CHECKPOINTS]
+        )
+        await conn.executemany(
+            "INSERT OR IGNORE INTO carriers (id, name) VALUES (?, ?)",
+            [(str(uuid.uuid4()), name) for name in DEFAULT_CARRIERS]
+        )
+        await conn.commit()
+
+    async def close(self) -> None:
+        """Close the database file."""
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
+
+    async def _fetch(self, query: str, *args) -> List[Dict[str, Any]]:
+        conn = await self.connection()
+        async with conn.execute(query, args) as cursor:
+            return await cursor.fetchall()
+
+    async def _fetchrow(self, query: str, *args) -> Optional[Dict[str, Any]]:
+        conn = await self.connection()
+        async with conn.execute(query, args) as cursor:
+            return await cursor.fetchone()
+
+    async def _write(self, query: str, *args) -> Optional[Dict[str, Any]]:
+        """Run a single-row write with RETURNING and commit it."""
+        conn = await self.connection()
+        async with conn.execute(query, args) as cursor:
+            row = await cursor.fetchone()
+        await conn.commit()
+        return row
+
+    @staticmethod
+    async def _refresh_metrics(conn: aiosqlite.Connection, journey_id: str) -> None:
+        """Recompute a journey's metric columns; the caller commits."""
+        async with conn.execute(
+            """
+            SELECT c.name, e.timestamp_utc, e.user_timezone, j.departure_utc
+            FROM journey_events e
+            JOIN checkpoints c ON c.id = e.checkpoint_id
+            JOIN journeys j ON j.id = e.journey_id
+            WHERE e.journey_id = ?
+            ORDER BY e.timestamp_utc
+            """,
+            (journey_id,)
+        ) as cursor:
+            events = await cursor.fetchall()
+
+        segments = {}
+        previous = events[0]["departure_utc"] if events else None
+        for event in events:
+            segments[event["name"]] = _seconds_between(previous, event["timestamp_utc"])
+            previous = event["timestamp_utc"]
+
+        first = events[0]["timestamp_utc"] if events else None
+        last = events[-1]["timestamp_utc"] if events else None
+        direction = None
+        if events:
+            direction = "outbound" if (events[0]["user_timezone"] or "Europe/Minsk") == "Europe/Minsk" else "inbound"
+        await conn.execute(
+            """
+            UPDATE journeys SET
+                first_event_utc = ?, last_event_utc = ?, border_seconds = ?,
+                segment_seconds = ?, event_count = ?, direction = ?
+            WHERE id = ?
+            """,
+            (
+                first, last, _seconds_between(first, last) if len(events) >= 2 else None,
+                json.dumps(segments), len(events), direction, journey_id
+            )
+        )
+
+    async def _attach_checkpoints(self, events: List[Dict[str, Any]], columns: str = "*") -> None:
+        """Embed each event's checkpoint row as `checkpoints`, like PostgREST does."""
+        ids = list({event["checkpoint_id"] for event in events})
+        if not ids:
+            return
+        placeholders = ", ".join("?" * len(ids))
+        rows = await self._fetch(
+            f"SELECT id AS _id, {columns} FROM checkpoints WHERE id IN ({placeholders})",
+            *ids
+        )
+        by_id = {row.pop("_id"): row for row in rows}
+        for event in events:
+            event["checkpoints"] = by_id.get(event["checkpoint_id"])
+
+    # Carriers
+    async def get_carriers(self) -> List[Dict[str, Any]]:
+        """Get all carriers."""
+        return await self._fetch(f"SELECT {CARRIER_SELECT} FROM carriers")
+
+    async def get_carrier_by_id(self, carrier_id: str) -> Optional[Dict[str, Any]]:
+        """Get carrier by ID."""
+        return await self._fetchrow(f"SELECT {CARRIER_SELECT} FROM carriers WHERE id = ?", carrier_id)
+
+    # Checkpoints
+    async def get_mandatory_checkpoints(self) -> List[Dict[str, Any]]:
+        """Get mandatory checkpoints of all border crossings, ordered by crossing, then sequence."""
+        return await self._fetch(
+            f"SELECT {CHECKPOINT_SELECT} FROM checkpoints "
+            "WHERE type = 'mandatory' AND required = 1 ORDER BY border, order_index"
+        )
+
+    async def get_checkpoint_by_id(self, checkpoint_id: str) -> Optional[Dict[str, Any]]:
+        """Get checkpoint by ID."""
+        return await self._fetchrow(f"SELECT {CHECKPOINT_SELECT} FROM checkpoints WHERE id = ?", checkpoint_id)
+
+    # Journeys
+    async def create_journey(
+        self,
+        user_id: int,
+        carrier_id: str,
+        departure_utc: datetime,
+        border: str = DEFAULT_BORDER,
+        journey_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Create a new journey; idempotent for a given `journey_id` (see Database)."""
+        journey_id = journey_id or str(uuid.uuid4())
+        row = await self._write(
+            """
+            INSERT INTO journeys (id, user_id, carrier_id, departure_utc, border, completed, anomalous)
+            VALUES (?, ?, ?, ?, ?, 0, 0)
+            ON CONFLICT (id) DO NOTHING
+            RETURNING *
+            """,
+            journey_id, user_id, carrier_id, _to_db_timestamp(departure_utc), border
+        )
+        # None: already created by an earlier attempt
+        return row or await self._fetchrow("SELECT * FROM journeys WHERE id = ?", journey_id)
+
+    async def get_journey(self, journey_id: str) -> Optional[Dict[str, Any]]:
+        """Get journey by ID."""
+        return await self._fetchrow(f"SELECT {JOURNEY_SELECT} FROM journeys WHERE id = ?", journey_id)
+
+    async def get_journeys(self, journey_ids: List[str]) -> List[Dict[str, Any]]:
+        """Get journeys by IDs in one query (unknown IDs are skipped, order is arbitrary)."""
+        if not journey_ids:
+            return []
+        placeholders = ", ".join("?" * len(journey_ids))
+        return await self._fetch(f"SELECT {JOURNEY_SELECT} FROM journeys WHERE id IN ({placeholders})", *journey_ids)
+
+    async def complete_journey(self, journey_id: str) -> Dict[str, Any]:
+        """Mark journey as completed and store its metrics (one transaction)."""
+        conn = await self.connection()
+        await self._refresh_metrics(conn, journey_id)
+        return await self._write("UPDATE journeys SET completed = 1 WHERE id = ? RETURNING *", journey_id)
+
+    async def backfill_journey_metrics(self, batch_size: int = 500) -> int:
+        """Compute metrics of up to `batch_size` completed journeys that have none."""
+        conn = await self.connection()
+        rows = await self._fetch(
+            "SELECT id FROM journeys WHERE completed = 1 AND event_count IS NULL LIMIT ?",
+            batch_size
+        )
+        for row in rows:
+            await self._refresh_metrics(conn, row["id"])
+        await conn.commit()
+        return len(rows)
+
+    async def close_abandoned_journeys(self, before: datetime, batch_size: int = 500) -> List[str]:
+        """Close up to `batch_size` incomplete journeys abandoned before `before`."""
+        cutoff = _to_db_timestamp(before)
+        rows = await self._fetch(
+            """
+            SELECT id FROM journeys j
+            WHERE completed = 0 AND created_at < ? AND departure_utc < ?
+              AND NOT EXISTS (
+                  SELECT 1 FROM journey_events e
+                  WHERE e.journey_id = j.id AND e.timestamp_utc >= ?
+              )
+            ORDER BY created_at
+            LIMIT ?
+            """,
+            cutoff, cutoff, cutoff, batch_size
+        )
+        journey_ids = [row["id"] for row in rows]
+        if journey_ids:
+            conn = await self.connection()
+            await conn.executemany(
+                "UPDATE journeys SET completed = 1, cancelled = 1, notes = 'Abandoned' WHERE id = ?",
+                [(journey_id,) for journey_id in journey_ids]
+            )
+            await conn.commit()
+        return journey_ids
+
+    async def cancel_journey(self, journey_id: str) -> Dict[str, Any]:
+        """Mark journey as cancelled."""
+        return await self._write(
+            """
+            UPDATE journeys SET completed = 1, cancelled = 1, notes = 'Cancelled by user'
+            WHERE id = ? RETURNING *
+            """,
+            journey_id
+        )
+
+    async def set_journeys_anomalous(self, journey_ids: List[str], anomalous: bool) -> None:
+        """Set the `anomalous` flag of the given journeys."""
+        conn = await self.connection()
+        await conn.executemany(
+            "UPDATE journeys SET anomalous = ? WHERE id = ?",
+            [(int(anomalous), journey_id) for journey_id in journey_ids]
+        )
+        await conn.commit()
+
+    async def get_user_active_journey(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Get user's active (incomplete) journey."""
+        return await self._fetchrow(
+            f"""
+            SELECT {JOURNEY_SELECT} FROM journeys
+            WHERE user_id = ? AND completed = 0
+            ORDER BY created_at DESC
+            LIMIT 1
+            """,
+            user_id
+        )
+
+    # Journey Events
+    async def create_journey_event(
+        self,
+        journey_id: str,
+        checkpoint_id: str,
+        timestamp_utc: datetime,
+        source: str = "manual",
+        user_timezone: str = "Europe/Minsk",
+        lat: Optional[float] = None,
+        lon: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Create a journey event (checkpoint timestamp)."""
+        return await self._write(
+            """
+            INSERT INTO journey_events
+                (id, journey_id, checkpoint_id, timestamp_utc, source, user_timezone, lat, lon)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            RETURNING *
+            """,
+            str(uuid.uuid4()), journey_id, checkpoint_id, _to_db_timestamp(timestamp_utc),
+            source, user_timezone, lat, lon
+        )
+
+    async def upsert_journey_events(self, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Insert a batch of journey events, skipping ones already stored.
+
+        UNIQUE(journey_id, checkpoint_id) is used as the idempotency key, so
+        the same batch can be safely retried.
+        """
+        conn = await self.connection()
+        inserted = []
+        for event in events:
+            async with conn.execute(
+                """
+                INSERT INTO journey_events
+                    (id, journey_id, checkpoint_id, timestamp_utc, source, user_timezone, lat, lon)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (journey_id, checkpoint_id) DO NOTHING
+                RETURNING *
+                """,
+                (
+                    str(uuid.uuid4()), event["journey_id"], event["checkpoint_id"],
+                    _to_db_timestamp(datetime.fromisoformat(event["timestamp_utc"])),
+                    event["source"], event["user_timezone"], event.get("lat"), event.get("lon")
+                )
+            ) as cursor:
+                row = await cursor.fetchone()
+            if row is not None:
+                inserted.append(row)
+
+        # Events delivered after completion keep metrics up to date
+        journey_ids = list({row["journey_id"] for row in inserted})
+        if journey_ids:
+            placeholders = ", ".join("?" * len(journey_ids))
+            async with conn.execute(
+                f"SELECT id FROM journeys WHERE completed = 1 AND id IN ({placeholders})",
+                journey_ids
+            ) as cursor:
+                completed = await cursor.fetchall()
+            for journey in completed:
+                await self._refresh_metrics(conn, journey["id"])
+        await conn.commit()
+        return inserted
+
+    async def get_journey_events(self, journey_id: str) -> List[Dict[str, Any]]:
+        """Get all events for a journey, ordered by timestamp."""
+        events = await self._fetch(
+            f"SELECT {JOURNEY_EVENT_SELECT} FROM journey_events WHERE journey_id = ? ORDER BY timestamp_utc",
+            journey_id
+        )
+        await self._attach_checkpoints(events, CHECKPOINT_SELECT)
+        return events
+
+    async def load_analytics_events(self, since: datetime) -> List[Dict[str, Any]]:
+        """Load events of completed, not cancelled journeys that ended after `since`."""
+        return await self._fetch(
+            """
+            SELECT journey_id, carrier_id, checkpoint_id, ts, anomalous
+            FROM analytics_events
+            WHERE journey_end_utc >= ?
+            """,
+            _to_db_timestamp(since)
+        )
+
+    async def load_journey_stat_changes(self, since: datetime) -> List[Dict[str, Any]]:
+        """Load journeys whose statistics changed at or after `since`."""
+        return await self._fetch(
+            """
+            SELECT journey_id, carrier_id, departure_utc, end_utc, duration_seconds, direction, changed_at, counted
+            FROM journey_stat_changes
+            WHERE changed_at >= ?
+            """,
+            _to_db_timestamp(since)
+        )
+
+    async def get_live_border_events(self, since: datetime) -> List[Dict[str, Any]]:
+        """Get events recorded after `since` of journeys that are not cancelled."""
+        return await self._fetch(
+            """
+            SELECT e.journey_id, e.checkpoint_id, e.timestamp_utc, e.user_timezone, j.completed
+            FROM journey_events e
+            JOIN journeys j ON j.id = e.journey_id
+            WHERE e.timestamp_utc >= ? AND j.cancelled = 0
+            """,
+            _to_db_timestamp(since)
+        )
+
+    async def get_latest_border_stats(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Get latest completed journeys with their border crossing duration."""
+        return await self._fetch(
+            """
+            SELECT journey_id, carrier, start_utc, end_utc, duration_seconds
+            FROM journey_stats
+            ORDER BY created_at DESC
+            LIMIT ?
+            """,
+            limit
+        )
+
+    async def get_border_duration_summary(self, since: datetime) -> Dict[str, Any]:
+        """Get duration aggregates of completed journeys that ended after `since`."""
+        rows = await self._fetch(
+            """
+            SELECT duration_seconds FROM journey_stats
+            WHERE cancelled = 0 AND end_utc >= ?
+            ORDER BY duration_seconds
+            """,
+            _to_db_timestamp(since)
+        )
+        durations = [row["duration_seconds"] for row in rows]
+        if not durations:
+            return {"journeys": 0, "avg_seconds": None, "median_seconds": None, "p90_seconds": None}
+        return {
+            "journeys": len(durations),
+            "avg_seconds": sum(durations) / len(durations),
+            "median_seconds": _percentile(durations, 0.5),
+            "p90_seconds": _percentile(durations, 0.9)
+        }
@@ -0,0 +1,110 @@
+"""Background closing of journeys their users abandoned."""
+import asyncio
+import logging
+from datetime import timedelta
+from typing import Optional, List, Callable, Sequence
+
+from config import settings
+from utils import now_utc
+from .base import Database
+from .db import db
+from .journal import EventJournal, journal
+
+logger = logging.getLogger(__name__)
+
+
+class AbandonedJourneySweeper:
+    """
+    Periodically close journeys with no events for `horizon_hours`.
+
+    Users often stop reporting mid-border; their journey would stay
+    incomplete forever and keep being found as the active one. Every
+    `interval` seconds the sweeper closes such journeys as cancelled, in
+    batches of `batch_size`, and tells listeners each closed id.
+
+    The journals are flushed first so events still waiting locally count as
+    activity; if the database cannot be reached the round is skipped
+    (events the database rejects do not hold it up). With several worker
+    processes each has a journal file of its own, and all of them must be
+    in `journals` (see supervisor.py).
+    """
+
+    def __init__(
+        self,
+        database: Database,
+        journals: Sequence[EventJournal] = (),
+        horizon_hours: float = 48.0,
+        interval: float = 3600.0,
+        batch_size: int = 500
+    ):
+        self.database = database
+        self.journals = list(journals)
+        self.horizon = timedelta(hours=horizon_hours)
+        self.interval = interval
+        self.batch_size = batch_size
+        self.closed = 0  # journeys closed since start
+
+        self._task: Optional[asyncio.Task] = None
+        self._listeners: List[Callable[[str], None]] = []
+
+    def add_listener(self, listener: Callable[[str], None]) -> None:
+        """Call `listener(journey_id)` for every journey closed from now on."""
+        self._listeners.append(listener)
+
+    async def sweep(self) -> int:
+        """Close all journeys abandoned by now; returns how many were closed."""
+        for worker_journal in self.journals:
+            await worker_journal.flush()
+
+        before = now_utc() - self.horizon
+        closed = 0
+        while True:
+            journey_ids = await self.database.close_abandoned_journeys(before, self.batch_size)
+            closed += len(journey_ids)
+            for journey_id in journey_ids:
+                for listener in self._listeners:
+                    try:
+                        listener(journey_id)
+                    except Exception:
+                        logger.exception("Abandoned journey listener failed")
+            if len(journey_ids) < self.batch_size:
+                break
+
+        self.closed += closed
+        if closed:
+            logger.info(f"Closed {closed} abandoned journey(s)")
+        return closed
+
+    async def start(self) -> None:
+        """Start the background sweeper."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background sweeper."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.warning(f"Abandoned journeys not swept, retrying next round: {e}")
+            await asyncio.sleep(self.interval)
+
+
+# Global sweeper instance
+sweeper = AbandonedJourneySweeper(
+    db,
+    [journal],
+    horizon_hours=settings.abandoned_journey_hours,
+    interval=settings.abandoned_sweep_interval,
+    batch_size=settings.abandoned_sweep_batch_size
+)
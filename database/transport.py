@@ -0,0 +1,139 @@
+"""Pooled HTTP transport for PostgREST calls."""
+import threading
+import time
+from typing import Any, Dict, Iterator
+
+import httpx
+
+
+class _TrackedStream(httpx.SyncByteStream):
+    """Response stream that reports back when the response is closed."""
+
+    def __init__(self, stream: httpx.SyncByteStream, on_close):
+        self._stream = stream
+        self._on_close = on_close
+        self._closed = False
+
+    def __iter__(self) -> Iterator[bytes]:
+        yield from self._stream
+
+    def close(self) -> None:
+        try:
+            self._stream.close()
+        finally:
+            if not self._closed:
+                self._closed = True
+                self._on_close()
+
+
+class PooledTransport(httpx.HTTPTransport):
+    """
+    HTTP transport with an explicit connection pool and pool metrics.
+
+    Pool wait is measured with httpcore trace events: the time from handing
+    a request to the pool until its headers start going out, minus any time
+    spent opening a new connection (TCP connect and TLS handshake).
+    """
+
+    def __init__(
+        self,
+        pool_size: int = 20,
+        keepalive_connections: int = 10,
+        keepalive_expiry: float = 30.0,
+        http2: bool = True
+    ):
+        super().__init__(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=pool_size,
+                max_keepalive_connections=keepalive_connections,
+                keepalive_expiry=keepalive_expiry
+            )
+        )
+        self.pool_size = pool_size
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._requests = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.perf_counter()
+        timings = {"connect": 0.0, "sent": None}
+
+        def trace(event_name: str, info: Dict[str, Any]) -> None:
+            now = time.perf_counter()
+            if event_name.endswith((".connect_tcp.started", ".start_tls.started")):
+                timings["connect_started"] = now
+            elif event_name.endswith((".connect_tcp.complete", ".start_tls.complete")):
+                timings["connect"] += now - timings.pop("connect_started", now)
+            elif event_name.endswith(".send_request_headers.started") and timings["sent"] is None:
+                timings["sent"] = now
+
+        request.extensions = {**request.extensions, "trace": trace}
+
+        with self._lock:
+            self._in_flight += 1
+        try:
+            response = super().handle_request(request)
+        except BaseException:
+            self._release()
+            raise
+
+        if timings["sent"] is not None:
+            wait = max(0.0, timings["sent"] - started - timings["connect"])
+            with self._lock:
+                self._requests += 1
+                self._wait_total += wait
+                self._wait_max = max(self._wait_max, wait)
+
+        response.stream = _TrackedStream(response.stream, self._release)
+        return response
+
+    def _release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    def metrics(self) -> Dict[str, Any]:
+        """Connection pool usage: connections, in-flight requests and pool wait time."""
+        connections = self._pool.connections
+        idle = sum(1 for connection in connections if connection.is_idle())
+        with self._lock:
+            return {
+                "pool_size": self.pool_size,
+                "active_connections": len(connections) - idle,
+                "idle_connections": idle,
+                "in_flight_requests": self._in_flight,
+                "requests": self._requests,
+                "wait_avg_ms": (self._wait_total / self._requests * 1000) if self._requests else 0.0,
+                "wait_max_ms": self._wait_max * 1000
+            }
+
+
+def create_pooled_session(
+    base_url: str,
+    headers: Dict[str, str],
+    transport: PooledTransport,
+    connect_timeout: float = 5.0,
+    timeout: float = 10.0
+) -> httpx.Client:
+    """
+    Create an httpx session for PostgREST on top of a pooled transport.
+
+    Args:
+        base_url: PostgREST base URL (.../rest/v1)
+        headers: Default headers (apikey, Authorization, ...)
+        transport: Pooled transport owning the connections
+        connect_timeout: Seconds to open a connection
+        timeout: Seconds for read, write and waiting for a pooled connection
+
+    Returns:
+        httpx.Client ready to be used as a PostgREST session
+    """
+    return httpx.Client(
+        base_url=base_url,
+        headers=headers,
+        transport=transport,
+        timeout=httpx.Timeout(timeout, connect=connect_timeout),
+        follow_redirects=True
+    )
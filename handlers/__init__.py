@@ -1,5 +1,25 @@
 """Handlers package."""
 from .journey import router as journey_router
+from .analytics import router as analytics_router, inline_results
+from .board import BoardPublisher, parse_chat_ids
+from .errors import router as errors_router
+from .middlewares import UserSequencingMiddleware, DataLoaderMiddleware
+from .storage import CompactMemoryStorage, create_storage
+from .dispatch import dispatch
 
-__all__ = ["journey_router"]
+# Built after the handler modules above have registered their buttons
+dispatch_router = dispatch.router()
 
+__all__ = [
+    "dispatch_router",
+    "journey_router",
+    "analytics_router",
+    "inline_results",
+    "errors_router",
+    "BoardPublisher",
+    "parse_chat_ids",
+    "UserSequencingMiddleware",
+    "DataLoaderMiddleware",
+    "CompactMemoryStorage",
+    "create_storage"
+]
@@ -0,0 +1,204 @@
+"""Analytics handlers."""
+from typing import Optional, List
+
+from aiogram import Router
+from aiogram.filters import Command, CommandObject
+from aiogram.types import Message, InlineQuery, InlineQueryResultArticle, InputTextMessageContent
+
+from analytics import analytics_cache, live_border
+from analytics.live import OUTBOUND, INBOUND
+from analytics.segments import hour_of_week, LOCAL_TIMEZONE
+from analytics.status import BorderStatus
+from config import settings
+from database import reference
+from utils import now_utc, from_utc_to_timezone
+from .journey import CHECKPOINT_NAMES, format_duration
+
+router = Router()
+
+# Fewer samples than this are not shown as "now" estimates
+MIN_SAMPLES = 3
+
+# Telegram accepts at most 50 inline results per answer
+MAX_INLINE_RESULTS = 50
+
+DIRECTION_NAMES = {
+    OUTBOUND: "🇧🇾 → 🇵🇱🇱🇹 Выезд из Беларуси",
+    INBOUND: "🇵🇱🇱🇹 → 🇧🇾 Въезд в Беларусь"
+}
+
+
+def format_segment(segment: dict) -> str:
+    """One line per segment: median and 90th percentile."""
+    median = format_duration(int(segment["median_seconds"]) // 60)
+    p90 = format_duration(int(segment["p90_seconds"]) // 60)
+    return f"⌛ {median} (90%: до {p90}), поездок: {segment['count']}"
+
+
+@router.message(Command("segments"))
+async def cmd_segments(message: Message, command: CommandObject):
+    """Show where the time goes: duration of each border segment."""
+    carrier = None
+    if command.args:
+        carriers = await reference.get_carriers()
+        carrier = next((c for c in carriers if c["name"].lower() == command.args.strip().lower()), None)
+        if carrier is None:
+            names = ", ".join(c["name"] for c in carriers)
+            await message.answer(f"❌ Перевозчик не найден. Доступные: {names}")
+            return
+
+    matrix = (await analytics_cache.snapshot()).segments
+    carrier_id = carrier["id"] if carrier else None
+    overall = matrix.lookup(carrier_id)
+    if not any(segment["count"] for segment in overall):
+        await message.answer("📊 Данных пока нет. Будьте первым, кто внесёт свой вклад!")
+        return
+
+    local_now = from_utc_to_timezone(now_utc(), LOCAL_TIMEZONE)
+    current_hour = int(hour_of_week(local_now.timestamp(), local_now.utcoffset().total_seconds()))
+    now_rows = matrix.lookup(carrier_id, current_hour)
+
+    title = carrier["name"] if carrier else "все перевозчики"
+    text = f"⏱ Где уходит время на границе ({title}):\n\n"
+    for segment, now in zip(overall, now_rows):
+        start = CHECKPOINT_NAMES.get(segment["from"], segment["from"])
+        end = CHECKPOINT_NAMES.get(segment["to"], segment["to"])
+        text += f"{start}\n→ {end}\n"
+        if segment["count"]:
+            text += f"{format_segment(segment)}\n"
+            if now["count"] >= MIN_SAMPLES:
+                text += f"🕐 В это время недели: {format_duration(int(now['median_seconds']) // 60)}\n"
+        else:
+            text += "Нет данных\n"
+        text += "\n"
+
+    text += f"Данные за {analytics_cache.window_days} дней, медиана и 90-й процентиль."
+    await message.answer(text)
+
+
+@router.message(Command("now"))
+async def cmd_border_now(message: Message):
+    """Show the live border estimate (in-memory, no database queries)."""
+    text = "🚦 Граница сейчас:\n\n"
+    for direction, estimate in live_border.snapshot().items():
+        text += f"{DIRECTION_NAMES[direction]}\n"
+        if estimate["estimate_seconds"] is None:
+            text += "Нет данных за последние часы\n\n"
+            continue
+        text += f"⏳ Ожидание: ~{format_duration(int(estimate['estimate_seconds']) // 60)}\n"
+        if estimate["active"]:
+            text += (
+                f"🚌 На границе сейчас: {estimate['active']} "
+                f"(в среднем уже {format_duration(int(estimate['active_median_seconds']) // 60)})\n"
+            )
+        if estimate["recent"]:
+            text += (
+                f"🏁 Пересекли за {int(live_border.recent_seconds // 3600)} ч: {estimate['recent']} "
+                f"(медиана {format_duration(int(estimate['recent_median_seconds']) // 60)})\n"
+            )
+        text += "\n"
+
+    text += "Оценка по поездкам пользователей, которые сейчас в пути."
+    await message.answer(text)
+
+
+def render_border_status(status: BorderStatus, carrier_id: Optional[str] = None) -> str:
+    """Border status as a message: live waits, weekly summary and carriers."""
+    text = "🚦 Граница сейчас:\n"
+    for direction, estimate in status.live.items():
+        if estimate["estimate_seconds"] is None:
+            wait = "нет данных"
+        else:
+            wait = f"~{format_duration(int(estimate['estimate_seconds']) // 60)}"
+        text += f"{DIRECTION_NAMES[direction]}: {wait}\n"
+
+    if status.summary:
+        text += (
+            f"\n📈 За {status.summary_days} дней ({status.summary['journeys']} поездок):\n"
+            f"⌛ Медиана: {format_duration(int(status.summary['median_seconds']) // 60)}\n"
+            f"⏳ 90% быстрее чем за {format_duration(int(status.summary['p90_seconds']) // 60)}\n"
+        )
+
+    carriers = [row for row in status.carriers if carrier_id is None or row["carrier_id"] == carrier_id]
+    if carriers:
+        text += "\n🚌 По перевозчикам (медиана / 90%):\n"
+        for row in carriers:
+            text += (
+                f"{row['name']}: {format_duration(int(row['median_seconds']) // 60)} / "
+                f"{format_duration(int(row['p90_seconds']) // 60)}\n"
+            )
+
+    updated = from_utc_to_timezone(status.computed_at, LOCAL_TIMEZONE).strftime("%H:%M")
+    text += f"\n🕐 Обновлено в {updated} (Минск)"
+    return text
+
+
+class InlineStatusResults:
+    """
+    Inline query results, pre-rendered for every new border status.
+
+    Answering an inline query only filters this list: no database queries
+    and no rendering on the request path.
+    """
+
+    def __init__(self):
+        self._overall: List[InlineQueryResultArticle] = []
+        self._carriers: List[InlineQueryResultArticle] = []
+        self._carrier_keys: List[str] = []  # lowercase carrier names
+
+    def rebuild(self, status: BorderStatus) -> None:
+        """BorderStatusCache listener: render results for a new status."""
+        waits = []
+        for direction, estimate in status.live.items():
+            if estimate["estimate_seconds"] is not None:
+                flags = DIRECTION_NAMES[direction].split()[0]
+                waits.append(f"{flags} ~{format_duration(int(estimate['estimate_seconds']) // 60)}")
+
+        version = int(status.computed_at.timestamp())
+        overall = InlineQueryResultArticle(
+            id=f"status-{version}",
+            title="🚦 Граница сейчас",
+            description=", ".join(waits) or "Поделиться текущей ситуацией на границе",
+            input_message_content=InputTextMessageContent(message_text=render_border_status(status))
+        )
+        carriers = [
+            InlineQueryResultArticle(
+                id=f"carrier-{i}-{version}",
+                title=f"🚌 {row['name']}",
+                description=(
+                    f"Медиана {format_duration(int(row['median_seconds']) // 60)}, "
+                    f"90% до {format_duration(int(row['p90_seconds']) // 60)}"
+                ),
+                input_message_content=InputTextMessageContent(
+                    message_text=render_border_status(status, row["carrier_id"])
+                )
+            )
+            for i, row in enumerate(status.carriers)
+        ]
+
+        # Swapped in one go: a query never sees a half-built list
+        self._overall, self._carriers, self._carrier_keys = (
+            [overall], carriers, [row["name"].lower() for row in status.carriers]
+        )
+
+    def match(self, query: str) -> List[InlineQueryResultArticle]:
+        """Results for a query: carriers whose name contains it, else the overall status."""
+        query = query.strip().lower()
+        if not query:
+            return (self._overall + self._carriers)[:MAX_INLINE_RESULTS]
+        carriers = [result for result, key in zip(self._carriers, self._carrier_keys) if query in key]
+        return (carriers or self._overall)[:MAX_INLINE_RESULTS]
+
+
+inline_results = InlineStatusResults()
+
+
+@router.inline_query()
+async def inline_border_status(inline_query: InlineQuery):
+    """Share the border status in any chat (@bot in the message field)."""
+    results = inline_results.match(inline_query.query)
+    await inline_query.answer(
+        results,
+        cache_time=settings.inline_cache_time if results else 5,
+        is_personal=False
+    )
@@ -0,0 +1,196 @@
+"""Public border board: one channel message kept up to date by the bot."""
+import asyncio
+import hashlib
+import logging
+import time
+from dataclasses import dataclass
+from typing import Optional, List, Dict, Union
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+
+from analytics.segments import LOCAL_TIMEZONE
+from analytics.status import BorderStatus
+from utils import now_utc, from_utc_to_timezone, parse_db_timestamp
+from .analytics import DIRECTION_NAMES
+from .journey import format_duration
+
+logger = logging.getLogger(__name__)
+
+# First line of every board; a pinned message starting with it is reused
+BOARD_TITLE = "🚦 Граница онлайн"
+# Trend changes smaller than this are shown as stable, seconds
+TREND_THRESHOLD = 10 * 60
+
+ChatId = Union[int, str]
+
+
+def parse_chat_ids(value: str) -> List[ChatId]:
+    """Channel ids (-100...) or @usernames from a comma-separated setting."""
+    chat_ids = []
+    for item in value.split(","):
+        item = item.strip()
+        if item:
+            chat_ids.append(int(item) if item.lstrip("-").isdigit() else item)
+    return chat_ids
+
+
+def format_trend(seconds: Optional[float]) -> str:
+    """Arrow and change of the wait over the trend window."""
+    if seconds is None:
+        return ""
+    minutes = int(abs(seconds)) // 60
+    if abs(seconds) < TREND_THRESHOLD:
+        return " ➡️"
+    return f" ↗️ +{format_duration(minutes)}" if seconds > 0 else f" ↘️ −{format_duration(minutes)}"
+
+
+def render_board(status: BorderStatus) -> str:
+    """
+    Board text without the update time.
+
+    Kept free of anything that changes on every refresh, so an unchanged
+    situation renders to the same text (and is not edited).
+    """
+    text = f"{BOARD_TITLE}\n\n"
+    for direction, estimate in status.live.items():
+        text += f"{DIRECTION_NAMES[direction]}\n"
+        if estimate["estimate_seconds"] is None:
+            text += "Нет данных за последние часы\n\n"
+            continue
+        wait = format_duration(int(estimate["estimate_seconds"]) // 60)
+        text += f"⏳ Ожидание: ~{wait}{format_trend(status.trend.get(direction))}\n"
+        if estimate["active"]:
+            text += f"🚌 На границе сейчас: {estimate['active']}\n"
+        text += "\n"
+
+    if status.latest:
+        text += "🏁 Последние пересечения:\n"
+        for journey in status.latest:
+            end_time = from_utc_to_timezone(
+                parse_db_timestamp(journey["end_utc"]), LOCAL_TIMEZONE
+            ).strftime("%d.%m %H:%M")
+            text += (
+                f"{journey.get('carrier') or 'Неизвестно'}: "
+                f"{format_duration(int(journey['duration_seconds']) // 60)} ({end_time})\n"
+            )
+        text += "\n"
+
+    if status.summary:
+        text += (
+            f"📈 За {status.summary_days} дней ({status.summary['journeys']} поездок): "
+            f"медиана {format_duration(int(status.summary['median_seconds']) // 60)}, "
+            f"90% быстрее чем за {format_duration(int(status.summary['p90_seconds']) // 60)}\n"
+        )
+    return text.rstrip()
+
+
+@dataclass
+class _Board:
+    message_id: int
+    digest: Optional[str] = None  # hash of the last published text
+
+
+class BoardPublisher:
+    """
+    Keep one board message per channel edited with the current border status.
+
+    Fed by BorderStatusCache (listener); a background task publishes the
+    latest status at most once per `min_interval` seconds and only edits a
+    board whose rendered text changed. On start the board pinned in the
+    channel is reused; otherwise a new one is posted and pinned.
+    """
+
+    def __init__(self, bot: Bot, chat_ids: List[ChatId], min_interval: float = 60.0):
+        self.bot = bot
+        self.chat_ids = chat_ids
+        self.min_interval = min_interval
+        self.published = 0  # edits and new boards
+        self.skipped = 0  # unchanged text, not edited
+
+        self._boards: Dict[ChatId, _Board] = {}
+        self._status: Optional[BorderStatus] = None
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def update(self, status: BorderStatus) -> None:
+        """BorderStatusCache listener: publish this status on the next round."""
+        self._status = status
+        self._wakeup.set()
+
+    async def start(self) -> None:
+        """Start the background publisher."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background publisher."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            started = time.monotonic()
+            for chat_id in self.chat_ids:
+                try:
+                    await self._publish(chat_id, self._status)
+                except TelegramRetryAfter as e:
+                    logger.warning(f"Board {chat_id}: flood control, retrying in {e.retry_after} s")
+                    await asyncio.sleep(e.retry_after)
+                    self._wakeup.set()
+                except Exception as e:
+                    logger.warning(f"Board {chat_id} not updated: {e}")
+            # Throttle: statuses arriving meanwhile collapse into the latest one
+            await asyncio.sleep(max(self.min_interval - (time.monotonic() - started), 0))
+
+    async def _publish(self, chat_id: ChatId, status: BorderStatus) -> None:
+        body = render_board(status)
+        digest = hashlib.sha256(body.encode()).hexdigest()
+        board = self._boards.get(chat_id)
+        if board is not None and board.digest == digest:
+            self.skipped += 1
+            return
+
+        changed = from_utc_to_timezone(now_utc(), LOCAL_TIMEZONE).strftime("%d.%m %H:%M")
+        text = f"{body}\n\n🕐 Изменено {changed} (Минск), обновляется автоматически"
+
+        if board is None:
+            board = await self._find_board(chat_id)
+        if board is None:
+            board = await self._post_board(chat_id, text)
+        else:
+            try:
+                await self.bot.edit_message_text(text, chat_id=chat_id, message_id=board.message_id)
+            except TelegramBadRequest as e:
+                if "not modified" not in str(e):
+                    # Deleted or not editable: start a new board
+                    logger.warning(f"Board {chat_id}: {e}, posting a new one")
+                    board = await self._post_board(chat_id, text)
+        board.digest = digest
+        self._boards[chat_id] = board
+        self.published += 1
+
+    async def _find_board(self, chat_id: ChatId) -> Optional[_Board]:
+        """The board pinned in the channel by a previous run, if any."""
+        chat = await self.bot.get_chat(chat_id)
+        pinned = chat.pinned_message
+        if pinned and pinned.text and pinned.text.startswith(BOARD_TITLE):
+            return _Board(message_id=pinned.message_id)
+        return None
+
+    async def _post_board(self, chat_id: ChatId, text: str) -> _Board:
+        message = await self.bot.send_message(chat_id, text, disable_notification=True)
+        try:
+            await self.bot.pin_chat_message(chat_id, message.message_id, disable_notification=True)
+        except TelegramBadRequest as e:
+            logger.warning(f"Board {chat_id} not pinned (a restart will post a new one): {e}")
+        logger.info(f"Board posted to {chat_id}")
+        return _Board(message_id=message.message_id)
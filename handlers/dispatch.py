@@ -0,0 +1,100 @@
+"""Hash-table routing of reply-keyboard buttons and callback data."""
+from typing import Any, Awaitable, Callable, Dict, Optional, Union
+
+from aiogram import Router
+from aiogram.dispatcher.event.handler import CallableObject
+from aiogram.types import Message, CallbackQuery
+
+Handler = Callable[..., Awaitable[Any]]
+
+
+class DispatchTable:
+    """
+    Handlers looked up by exact button text or callback data.
+
+    aiogram checks the filters of a router's handlers one by one, so a
+    button pressed in a late-registered handler pays for every filter in
+    front of it, state filters included. Buttons and callbacks registered
+    here are resolved with one dict lookup instead, by a router that goes
+    in front of all others; anything not in the table falls through to
+    the regular filter chain.
+
+    Buttons work in any state (cancel, timezone change and the menu behave
+    the same everywhere), so state handlers don't re-check button text.
+    Handlers get the same keyword arguments (state, middleware data) as
+    regular aiogram handlers.
+    Callback prefixes are matched up to their first "_" ("cal_", "time_"),
+    so resolving them is a lookup too.
+    """
+
+    def __init__(self):
+        self.buttons: Dict[str, CallableObject] = {}
+        self.callbacks: Dict[str, CallableObject] = {}  # exact callback data
+        self.prefixes: Dict[str, CallableObject] = {}  # "word_" prefix of callback data
+
+    def button(self, *labels: str) -> Callable[[Handler], Handler]:
+        """Register a handler for reply-keyboard buttons with these labels."""
+        def register(handler: Handler) -> Handler:
+            for label in labels:
+                self._add(self.buttons, label, handler)
+            return handler
+        return register
+
+    def callback(self, *data: str, prefix: Optional[str] = None) -> Callable[[Handler], Handler]:
+        """Register a handler for exact callback data and/or a "word_" prefix."""
+        if prefix is not None and prefix.find("_") != len(prefix) - 1:
+            raise ValueError(f"Callback prefix must be a single word ending with '_': {prefix!r}")
+
+        def register(handler: Handler) -> Handler:
+            for value in data:
+                self._add(self.callbacks, value, handler)
+            if prefix is not None:
+                self._add(self.prefixes, prefix, handler)
+            return handler
+        return register
+
+    @staticmethod
+    def _add(table: Dict[str, CallableObject], key: str, handler: Handler) -> None:
+        if key in table and table[key].callback is not handler:
+            raise ValueError(f"{key!r} is already routed to {table[key].callback.__name__}")
+        table[key] = CallableObject(callback=handler)
+
+    def resolve_message(self, text: Optional[str]) -> Optional[CallableObject]:
+        return self.buttons.get(text) if text else None
+
+    def resolve_callback(self, data: Optional[str]) -> Optional[CallableObject]:
+        if not data:
+            return None
+        handler = self.callbacks.get(data)
+        if handler is None:
+            head, separator, _ = data.partition("_")
+            if separator:
+                handler = self.prefixes.get(head + separator)
+        return handler
+
+    def router(self) -> Router:
+        """Router resolving registered buttons and callbacks; include it first."""
+        router = Router(name="dispatch")
+
+        # Coroutines: aiogram runs plain-function filters in a thread pool
+        async def message_route(message: Message) -> Union[Dict[str, CallableObject], bool]:
+            handler = self.resolve_message(message.text)
+            return {"routed": handler} if handler else False
+
+        async def callback_route(callback: CallbackQuery) -> Union[Dict[str, CallableObject], bool]:
+            handler = self.resolve_callback(callback.data)
+            return {"routed": handler} if handler else False
+
+        @router.message(message_route)
+        async def dispatch_message(message: Message, routed: CallableObject, **data: Any):
+            return await routed.call(message, **data)
+
+        @router.callback_query(callback_route)
+        async def dispatch_callback(callback: CallbackQuery, routed: CallableObject, **data: Any):
+            return await routed.call(callback, **data)
+
+        return router
+
+
+# Global table; journey handlers register their buttons and callbacks here
+dispatch = DispatchTable()
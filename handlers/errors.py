@@ -0,0 +1,28 @@
+"""Error handlers."""
+import logging
+from aiogram import Router
+from aiogram.filters import ExceptionTypeFilter
+from aiogram.types import ErrorEvent
+
+from database import DatabaseUnavailableError, db
+
+router = Router()
+logger = logging.getLogger(__name__)
+
+UNAVAILABLE_TEXT = (
+    "⚠️ Сервис временно недоступен.\n\n"
+    "Пожалуйста, попробуйте ещё раз через минуту."
+)
+
+
+@router.errors(ExceptionTypeFilter(DatabaseUnavailableError))
+async def handle_database_unavailable(event: ErrorEvent):
+    """Tell the user to retry later instead of failing silently."""
+    logger.warning(f"Database unavailable: {event.exception} ({db.stats()})")
+
+    update = event.update
+    if update.callback_query:
+        await update.callback_query.answer(UNAVAILABLE_TEXT, show_alert=True)
+    elif update.message:
+        await update.message.answer(UNAVAILABLE_TEXT)
+    return True
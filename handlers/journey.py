@@ -1,13 +1,19 @@
 """Journey tracking handlers."""
-from aiogram import Router, F
-from aiogram.filters import Command, StateFilter
+import asyncio
+import uuid
+from aiogram import Router
+from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.types import Message, CallbackQuery, ReplyKeyboardMarkup, KeyboardButton, ReplyKeyboardRemove
-from datetime import datetime
-from typing import List, Dict, Any
+from datetime import datetime, timedelta
+from typing import List, Dict
 
+from .dispatch import dispatch
 from .states import JourneyStates
-from database import db
+from config import settings
+from analytics import analytics_cache, live_border, forecast
+from analytics.live import direction_of
+from database import db, journal, checkpoint_sequences, DataLoader, Carrier, DEFAULT_BORDER
 from utils import (
     now_utc,
     parse_user_datetime,
@@ -19,6 +25,7 @@ from utils import (
     get_next_month,
     get_prev_month,
     create_time_keyboard,
+    DEPARTURE_TIMES,
     create_main_menu_keyboard,
     create_cancel_confirmation_keyboard,
     create_timezone_keyboard,
@@ -39,6 +46,14 @@ CHECKPOINT_NAMES = {
     "leaving_checkpoint_2": "🏁 Покидаем границу"
 }
 
+# Border crossing display names; crossings not listed are shown by their code
+BORDER_NAMES = {
+    DEFAULT_BORDER: "🚧 Основной переход"
+}
+
+# Fewer journeys than this are not used for comparisons
+MIN_COMPARISON_JOURNEYS = 10
+
 # Timezone mapping
 TIMEZONE_MAP = {
     "🇧🇾 Минск (UTC+3)": "Europe/Minsk",
@@ -59,17 +74,61 @@ def get_timezone_display(timezone: str) -> str:
     return TIMEZONE_DISPLAY.get(timezone, timezone)
 
 
-def create_carrier_keyboard(carriers: List[Dict[str, Any]]) -> ReplyKeyboardMarkup:
+def format_duration(minutes: int) -> str:
+    """Format duration nicely with hours and minutes."""
+    hours = minutes // 60
+    mins = minutes % 60
+    if hours > 0:
+        return f"{hours} ч {mins} мин"
+    return f"{minutes} мин"
+
+
+def format_wait(seconds: float) -> str:
+    """Compact duration for keyboard buttons: ~45м, ~2ч10."""
+    minutes = int(seconds) // 60
+    if minutes >= 60:
+        return f"~{minutes // 60}ч{minutes % 60:02d}"
+    return f"~{minutes}м"
+
+
+# FSM data kept while checkpoints are recorded; the rest is only needed
+# while the journey is being created
+CHECKPOINT_STATE_KEYS = ("journey_id", "border", "current_checkpoint_index", "user_timezone", "checkpoint_message_id")
+
+
+async def get_carrier_name(loader: DataLoader, carrier_id: str) -> str:
+    """Carrier name by ID (FSM data keeps only the ID)."""
+    carriers = await loader.carriers()
+    return next((c.name for c in carriers if c.id == carrier_id), "")
+
+
+def forecast_labels(carrier_id: str, departure_date: str) -> Dict[str, str]:
+    """Expected border wait (median) for each departure time on the time keyboard."""
+    labels = {}
+    for time_str in DEPARTURE_TIMES:
+        departure_utc = parse_user_datetime(departure_date, time_str, "Europe/Minsk")
+        prediction = forecast.predict(carrier_id, None, departure_utc)
+        if prediction:
+            labels[time_str] = format_wait(prediction["p50_seconds"])
+    return labels
+
+
+def border_name(border: str) -> str:
+    """Display name of a border crossing."""
+    return BORDER_NAMES.get(border, border)
+
+
+def create_carrier_keyboard(carriers: List[Carrier]) -> ReplyKeyboardMarkup:
     """Create keyboard with carrier options."""
-    buttons = [[KeyboardButton(text=carrier["name"])] for carrier in carriers]
+    buttons = [[KeyboardButton(text=carrier.name)] for carrier in carriers]
     return ReplyKeyboardMarkup(keyboard=buttons, resize_keyboard=True)
 
 
 @router.message(Command("start"))
-async def cmd_start(message: Message, state: FSMContext):
+async def cmd_start(message: Message, state: FSMContext, loader: DataLoader):
     """Start command - show welcome and instructions."""
     # Check if user has active journey
-    active_journey = await db.get_user_active_journey(message.from_user.id)
+    active_journey = await loader.user_active_journey(message.from_user.id)
 
     welcome_text = (
         "👋 Добро пожаловать в Granica Bot!\n\n"
@@ -81,7 +140,9 @@ async def cmd_start(message: Message, state: FSMContext):
         "4. Просматривайте статистику и помогайте другим планировать поездки\n\n"
         "⚡️ Быстрые команды:\n"
         "/new — начать новую поездку\n"
-        "/statistics — посмотреть статистику\n\n"
+        "/statistics — посмотреть статистику\n"
+        "/segments — где уходит время на границе\n"
+        "/now — граница сейчас\n\n"
         "Используйте меню внизу для навигации"
     )
 
@@ -90,11 +151,11 @@ async def cmd_start(message: Message, state: FSMContext):
 
 
 @router.message(Command("new"))
-@router.message(F.text == "🆕 Новая поездка")
-async def cmd_new_journey(message: Message, state: FSMContext):
+@dispatch.button("🆕 Новая поездка")
+async def cmd_new_journey(message: Message, state: FSMContext, loader: DataLoader):
     """Start a new journey."""
     # Check if user has an active journey
-    active_journey = await db.get_user_active_journey(message.from_user.id)
+    active_journey = await loader.user_active_journey(message.from_user.id)
     if active_journey:
         keyboard = create_main_menu_keyboard(has_active_journey=True)
         await message.answer(
@@ -106,7 +167,7 @@ async def cmd_new_journey(message: Message, state: FSMContext):
         return
 
     # Get carriers from database
-    carriers = await db.get_carriers()
+    carriers = await loader.carriers()
     keyboard = create_carrier_keyboard(carriers)
 
     await state.set_state(JourneyStates.choosing_carrier)
@@ -118,29 +179,58 @@ async def cmd_new_journey(message: Message, state: FSMContext):
         reply_markup=keyboard
     )
 
-    # Save main message ID for future edits
-    await state.update_data(main_message_id=main_msg.message_id)
+    # Save main message ID for future edits; the journey id is chosen now, so
+    # a retried creation (after a timeout) cannot create a second journey
+    await state.update_data(main_message_id=main_msg.message_id, new_journey_id=str(uuid.uuid4()))
 
 
 @router.message(JourneyStates.choosing_carrier)
-async def process_carrier_choice(message: Message, state: FSMContext):
+async def process_carrier_choice(message: Message, state: FSMContext, loader: DataLoader):
     """Process carrier selection."""
-    # Check if user wants to cancel
-    if message.text == "❌ Отменить поездку":
-        await cmd_cancel(message, state)
-        return
-
-    carriers = await db.get_carriers()
-    carrier = next((c for c in carriers if c["name"] == message.text), None)
+    carriers = await loader.carriers()
+    carrier = next((c for c in carriers if c.name == message.text), None)
 
     if not carrier:
         await message.answer("❌ Неверный перевозчик. Пожалуйста, выберите из списка.")
         return
 
-    await state.update_data(carrier_id=carrier["id"], carrier_name=carrier["name"])
-    await state.set_state(JourneyStates.entering_departure_date)
+    # The crossing decides the checkpoint sequence: asked only if there is a choice
+    borders = await checkpoint_sequences.borders()
+    if len(borders) > 1:
+        await state.update_data(carrier_id=carrier.id)
+        await state.set_state(JourneyStates.choosing_border)
+        buttons = [[KeyboardButton(text=border_name(border))] for border in borders]
+        await replace_main_message(
+            message,
+            state,
+            "🆕 Новая поездка\n\n"
+            f"✅ Перевозчик: {carrier.name}\n\n"
+            "🚧 Выберите пограничный переход:",
+            ReplyKeyboardMarkup(keyboard=buttons, resize_keyboard=True)
+        )
+        return
+
+    await state.update_data(carrier_id=carrier.id, border=borders[0] if borders else DEFAULT_BORDER)
+    await ask_departure_date(message, state, f"✅ Перевозчик: {carrier.name}\n")
+
+
+@router.message(JourneyStates.choosing_border)
+async def process_border_choice(message: Message, state: FSMContext, loader: DataLoader):
+    """Process border crossing selection."""
+    borders = await checkpoint_sequences.borders()
+    border = next((b for b in borders if border_name(b) == message.text), None)
+
+    if not border:
+        await message.answer("❌ Неверный переход. Пожалуйста, выберите из списка.")
+        return
+
+    await state.update_data(border=border)
+    name = await get_carrier_name(loader, (await state.get_data()).get("carrier_id"))
+    await ask_departure_date(message, state, f"✅ Перевозчик: {name}\n✅ Переход: {border_name(border)}\n")
 
-    # Get main message ID
+
+async def replace_main_message(message: Message, state: FSMContext, text: str, reply_markup) -> None:
+    """Delete the user's choice and the previous question, ask the next one."""
     data = await state.get_data()
     main_message_id = data.get("main_message_id")
 
@@ -150,7 +240,7 @@ async def process_carrier_choice(message: Message, state: FSMContext):
     except Exception:
         pass
 
-    # Delete the initial question message
+    # Delete the previous question message
     try:
         await message.bot.delete_message(
             chat_id=message.chat.id,
@@ -159,16 +249,25 @@ async def process_carrier_choice(message: Message, state: FSMContext):
     except Exception as e:
         print(f"Error deleting message: {e}")
 
+    msg = await message.answer(text, reply_markup=reply_markup)
+    # Update main message ID
+    await state.update_data(main_message_id=msg.message_id)
+
+
+async def ask_departure_date(message: Message, state: FSMContext, chosen: str) -> None:
+    """Show the calendar under what was chosen so far."""
+    await state.set_state(JourneyStates.entering_departure_date)
+
     # Create new message with accumulated data
     calendar = create_calendar()
-    msg = await message.answer(
+    await replace_main_message(
+        message,
+        state,
         "🆕 Новая поездка\n\n"
-        f"✅ Перевозчик: {carrier['name']}\n\n"
+        f"{chosen}\n"
         "📅 Выберите дату отправления:",
-        reply_markup=calendar
+        calendar
     )
-    # Update main message ID
-    await state.update_data(main_message_id=msg.message_id)
 
     # Send temporary message to remove keyboard, then delete it
     try:
@@ -179,8 +278,8 @@ async def process_carrier_choice(message: Message, state: FSMContext):
 
 
 # Calendar callback handlers
-@router.callback_query(F.data.startswith("cal_"))
-async def process_calendar_callback(callback: CallbackQuery, state: FSMContext):
+@dispatch.callback(prefix="cal_")
+async def process_calendar_callback(callback: CallbackQuery, state: FSMContext, loader: DataLoader):
     """Process calendar button callbacks."""
     print(f"📅 Calendar callback: {callback.data}")
 
@@ -244,25 +343,30 @@ async def process_calendar_callback(callback: CallbackQuery, state: FSMContext):
         await state.set_state(JourneyStates.entering_departure_time)
         print(f"✅ State changed to entering_departure_time")
 
-        time_keyboard = create_time_keyboard()
+        # Get accumulated data
+        state_data = await state.get_data()
+        name = await get_carrier_name(loader, state_data.get("carrier_id"))
+
+        # Annotate times with the expected wait (in-memory forecast)
+        labels = forecast_labels(state_data.get("carrier_id"), selected_date)
+        time_keyboard = create_time_keyboard(labels)
+        time_prompt = "🕐 Выберите время отправления:"
+        if labels:
+            time_prompt += "\n⏳ Рядом со временем — ожидаемое время на границе (медиана)"
         print(f"✅ Time keyboard created")
 
         # Answer callback first to remove loading state
         await callback.answer()
         print(f"✅ Callback answered")
 
-        # Get accumulated data
-        state_data = await state.get_data()
-        carrier_name = state_data.get("carrier_name", "")
-
         try:
             # Edit the main message with accumulated info
             print(f"📝 Trying to edit message...")
             await callback.message.edit_text(
                 "🆕 Новая поездка\n\n"
-                f"✅ Перевозчик: {carrier_name}\n"
+                f"✅ Перевозчик: {name}\n"
                 f"✅ Дата выбрана: {day:02d}.{month:02d}.{year}\n\n"
-                "🕐 Выберите время отправления:",
+                f"{time_prompt}",
                 reply_markup=time_keyboard
             )
             print(f"✅ Message edited successfully!")
@@ -274,9 +378,9 @@ async def process_calendar_callback(callback: CallbackQuery, state: FSMContext):
             msg = await callback.bot.send_message(
                 callback.message.chat.id,
                 "🆕 Новая поездка\n\n"
-                f"✅ Перевозчик: {carrier_name}\n"
+                f"✅ Перевозчик: {name}\n"
                 f"✅ Дата выбрана: {day:02d}.{month:02d}.{year}\n\n"
-                "🕐 Выберите время отправления:",
+                f"{time_prompt}",
                 reply_markup=time_keyboard
             )
             # Update main message ID
@@ -293,8 +397,8 @@ async def process_departure_date_text(message: Message, state: FSMContext):
 
 
 # Time selection callback handlers
-@router.callback_query(F.data.startswith("time_"))
-async def process_time_callback(callback: CallbackQuery, state: FSMContext):
+@dispatch.callback(prefix="time_")
+async def process_time_callback(callback: CallbackQuery, state: FSMContext, loader: DataLoader):
     """Process time selection button callbacks."""
     print(f"🕐 Time callback: {callback.data}")
 
@@ -315,7 +419,7 @@ async def process_time_callback(callback: CallbackQuery, state: FSMContext):
     if time_str == "custom":
         # Get accumulated data
         state_data = await state.get_data()
-        carrier_name = state_data.get("carrier_name", "")
+        name = await get_carrier_name(loader, state_data.get("carrier_id"))
         dep_date = state_data.get("departure_date", "")
         year, month, day = dep_date.split("-")
         date_formatted = f"{day}.{month}.{year}"
@@ -324,7 +428,7 @@ async def process_time_callback(callback: CallbackQuery, state: FSMContext):
         try:
             await callback.message.edit_text(
                 "🆕 Новая поездка\n\n"
-                f"✅ Перевозчик: {carrier_name}\n"
+                f"✅ Перевозчик: {name}\n"
                 f"✅ Дата выбрана: {date_formatted}\n\n"
                 "✏️ Введите время отправления вручную (ЧЧ:ММ):\n"
                 "Пример: 14:30"
@@ -334,7 +438,7 @@ async def process_time_callback(callback: CallbackQuery, state: FSMContext):
             msg = await callback.bot.send_message(
                 callback.message.chat.id,
                 "🆕 Новая поездка\n\n"
-                f"✅ Перевозчик: {carrier_name}\n"
+                f"✅ Перевозчик: {name}\n"
                 f"✅ Дата выбрана: {date_formatted}\n\n"
                 "✏️ Введите время отправления вручную (ЧЧ:ММ):\n"
                 "Пример: 14:30"
@@ -354,22 +458,23 @@ async def process_time_callback(callback: CallbackQuery, state: FSMContext):
     )
 
     # Create journey in database
+    # Chosen with the carrier; dialogs started before crossings were asked have none
+    border = data.get("border", DEFAULT_BORDER)
     journey = await db.create_journey(
         user_id=callback.from_user.id,
         carrier_id=data["carrier_id"],
-        departure_utc=departure_utc
+        departure_utc=departure_utc,
+        border=border,
+        journey_id=data.get("new_journey_id") or str(uuid.uuid4())
     )
 
     await state.update_data(
         journey_id=journey["id"],
         departure_time=time_str,
+        border=border,
         current_checkpoint_index=0
     )
 
-    # Get mandatory checkpoints
-    checkpoints = await db.get_mandatory_checkpoints()
-    await state.update_data(checkpoints=[cp["id"] for cp in checkpoints])
-
     # Ask for timezone
     await state.set_state(JourneyStates.choosing_initial_timezone)
     keyboard = create_timezone_keyboard(include_cancel=True)
@@ -378,6 +483,7 @@ async def process_time_callback(callback: CallbackQuery, state: FSMContext):
     dep_date = data["departure_date"]
     year, month, day = dep_date.split("-")
     date_formatted = f"{day}.{month}.{year}"
+    name = await get_carrier_name(loader, data["carrier_id"])
 
     # Delete previous message (can't edit with ReplyKeyboardMarkup)
     try:
@@ -389,7 +495,7 @@ async def process_time_callback(callback: CallbackQuery, state: FSMContext):
     msg = await callback.bot.send_message(
         callback.message.chat.id,
         "🆕 Новая поездка\n\n"
-        f"✅ Перевозчик: {data['carrier_name']}\n"
+        f"✅ Перевозчик: {name}\n"
         f"✅ Дата: {date_formatted}\n"
         f"✅ Время: {time_str}\n\n"
         f"🌍 Выберите вашу текущую таймзону:\n"
@@ -401,13 +507,8 @@ async def process_time_callback(callback: CallbackQuery, state: FSMContext):
 
 
 @router.message(JourneyStates.entering_departure_time)
-async def process_departure_time(message: Message, state: FSMContext):
+async def process_departure_time(message: Message, state: FSMContext, loader: DataLoader):
     """Process departure time (manual text input)."""
-    # Check if user wants to cancel
-    if message.text == "❌ Отменить поездку":
-        await cmd_cancel(message, state)
-        return
-
     try:
         datetime.strptime(message.text, "%H:%M")
         data = await state.get_data()
@@ -420,22 +521,23 @@ async def process_departure_time(message: Message, state: FSMContext):
         )
 
         # Create journey in database
+        # Chosen with the carrier; dialogs started before crossings were asked have none
+        border = data.get("border", DEFAULT_BORDER)
         journey = await db.create_journey(
             user_id=message.from_user.id,
             carrier_id=data["carrier_id"],
-            departure_utc=departure_utc
+            departure_utc=departure_utc,
+            border=border,
+            journey_id=data.get("new_journey_id") or str(uuid.uuid4())
         )
 
         await state.update_data(
             journey_id=journey["id"],
             departure_time=message.text,
+            border=border,
             current_checkpoint_index=0
         )
 
-        # Get mandatory checkpoints
-        checkpoints = await db.get_mandatory_checkpoints()
-        await state.update_data(checkpoints=[cp["id"] for cp in checkpoints])
-
         # Ask for timezone
         await state.set_state(JourneyStates.choosing_initial_timezone)
         keyboard = create_timezone_keyboard(include_cancel=True)
@@ -462,9 +564,10 @@ async def process_departure_time(message: Message, state: FSMContext):
             print(f"Error deleting message: {e}")
 
         # Send new message (can't edit with ReplyKeyboardMarkup)
+        name = await get_carrier_name(loader, data["carrier_id"])
         msg = await message.answer(
             "🆕 Новая поездка\n\n"
-            f"✅ Перевозчик: {data['carrier_name']}\n"
+            f"✅ Перевозчик: {name}\n"
             f"✅ Дата: {date_formatted}\n"
             f"✅ Время: {message.text}\n\n"
             f"🌍 Выберите вашу текущую таймзону:\n"
@@ -478,32 +581,21 @@ async def process_departure_time(message: Message, state: FSMContext):
         await message.answer("❌ Неверный формат времени. Используйте ЧЧ:ММ (например, 14:30)")
 
 
-async def start_next_checkpoint(message_or_callback, state: FSMContext):
+async def start_next_checkpoint(message_or_callback, state: FSMContext, loader: DataLoader):
     """Start recording next checkpoint."""
     data = await state.get_data()
     checkpoint_index = data["current_checkpoint_index"]
-    checkpoints = await db.get_mandatory_checkpoints()
+    sequence = await checkpoint_sequences.get(data.get("border", DEFAULT_BORDER))
 
-    if checkpoint_index >= len(checkpoints):
+    if checkpoint_index >= len(sequence):
         # All mandatory checkpoints done
-        await show_journey_summary(message_or_callback, state)
+        await show_journey_summary(message_or_callback, state, loader)
         return
 
-    checkpoint = checkpoints[checkpoint_index]
-    checkpoint_name = CHECKPOINT_NAMES.get(checkpoint["name"], checkpoint["name"])
+    checkpoint = sequence[checkpoint_index]
+    checkpoint_name = CHECKPOINT_NAMES.get(checkpoint.name, checkpoint.name)
 
-    # Map checkpoint to state
-    state_mapping = {
-        0: JourneyStates.checkpoint_approaching_border,
-        1: JourneyStates.checkpoint_entering_1,
-        2: JourneyStates.checkpoint_passport_1,
-        3: JourneyStates.checkpoint_entering_2,
-        4: JourneyStates.checkpoint_passport_2,
-        5: JourneyStates.checkpoint_leaving_2,
-    }
-
-    await state.set_state(state_mapping[checkpoint_index])
-    await state.update_data(current_checkpoint_id=checkpoint["id"])
+    await state.set_state(JourneyStates.checkpoint)
 
     keyboard = create_checkpoint_keyboard()
 
@@ -511,38 +603,37 @@ async def start_next_checkpoint(message_or_callback, state: FSMContext):
     current_tz = data.get("user_timezone", "Europe/Minsk")
     tz_display = get_timezone_display(current_tz)
 
-    # Get journey events for history
+    # Get journey events for history (and the journey for departure time)
     journey_id = data.get("journey_id")
-    events = await db.get_journey_events(journey_id)
+    events, journey = await asyncio.gather(loader.journey_events(journey_id), loader.journey(journey_id))
 
     # Build message with history
-    message_text = f"📍 Контрольная точка {checkpoint_index + 1}/6\n{checkpoint_name}\n"
+    message_text = f"📍 Контрольная точка {checkpoint_index + 1}/{len(sequence)}\n{checkpoint_name}\n"
     message_text += f"⏰ Введите время (ЧЧ:ММ) или нажмите '⏰ Сейчас'.\n\n"
 
     # Add history if there are previous checkpoints
     if events:
         message_text += "📝 История:\n\n"
 
-        # Get journey departure time for first checkpoint duration
-        journey = await db.get_journey(journey_id)
-        departure_time = parse_db_timestamp(journey["departure_utc"])
+        # Journey departure time for first checkpoint duration
+        departure_time = journey.departure_utc
 
         for i, event in enumerate(events):
             cp_name = CHECKPOINT_NAMES.get(
-                event["checkpoints"]["name"],
-                event["checkpoints"]["name"]
+                event.checkpoint_name,
+                event.checkpoint_name
             )
             # Use timezone saved with the event
-            event_tz = event.get("user_timezone", "Europe/Minsk")
+            event_tz = event.user_timezone or "Europe/Minsk"
             time_str = format_datetime_for_user(
-                parse_db_timestamp(event["timestamp_utc"]),
+                event.timestamp_utc,
                 event_tz
             )
             message_text += f"{i+1}. {cp_name}\n"
             message_text += f"   ⏰ {time_str}\n"
 
             # Calculate duration from previous or from departure
-            curr_time = parse_db_timestamp(event["timestamp_utc"])
+            curr_time = event.timestamp_utc
             if i == 0:
                 # First checkpoint - calculate from departure
                 duration = curr_time - departure_time
@@ -550,7 +641,7 @@ async def start_next_checkpoint(message_or_callback, state: FSMContext):
                 message_text += f"   ⌛ +{minutes} мин от отправления\n"
             else:
                 # Calculate from previous checkpoint
-                prev_time = parse_db_timestamp(events[i-1]["timestamp_utc"])
+                prev_time = events[i-1].timestamp_utc
                 duration = curr_time - prev_time
                 minutes = int(duration.total_seconds() / 60)
                 message_text += f"   ⌛ +{minutes} мин от предыдущей\n"
@@ -577,13 +668,8 @@ async def start_next_checkpoint(message_or_callback, state: FSMContext):
 
 
 @router.message(JourneyStates.choosing_initial_timezone)
-async def process_initial_timezone_selection(message: Message, state: FSMContext):
+async def process_initial_timezone_selection(message: Message, state: FSMContext, loader: DataLoader):
     """Process initial timezone selection after journey creation."""
-    # Check if user wants to cancel
-    if message.text == "❌ Отменить поездку":
-        await cmd_cancel(message, state)
-        return
-
     # Check if valid timezone selected
     if message.text in TIMEZONE_MAP:
         selected_tz = TIMEZONE_MAP[message.text]
@@ -605,6 +691,7 @@ async def process_initial_timezone_selection(message: Message, state: FSMContext
         dep_date = data["departure_date"]
         year, month, day = dep_date.split("-")
         date_formatted = f"{day}.{month}.{year}"
+        name = await get_carrier_name(loader, data["carrier_id"])
 
         # Delete old message (can't edit ReplyKeyboardMarkup messages)
         try:
@@ -616,19 +703,20 @@ async def process_initial_timezone_selection(message: Message, state: FSMContext
             print(f"Error deleting message: {e}")
 
         # Send new message with summary
-        msg = await message.answer(
+        await message.answer(
             "🆕 Новая поездка\n\n"
-            f"✅ Перевозчик: {data['carrier_name']}\n"
+            f"✅ Перевозчик: {name}\n"
             f"✅ Дата: {date_formatted}\n"
             f"✅ Время: {data['departure_time']}\n"
             f"✅ Таймзона: {message.text}\n\n"
             f"Теперь отмечайте контрольные точки по мере прохождения."
         )
-        # Update main message ID
-        await state.update_data(main_message_id=msg.message_id)
+
+        # Journey created: keep only what checkpoints need for the hours to come
+        await state.set_data({key: data[key] for key in CHECKPOINT_STATE_KEYS if key in data})
 
         # Move to first checkpoint
-        await start_next_checkpoint(message, state)
+        await start_next_checkpoint(message, state, loader)
     else:
         await message.answer(
             "❌ Пожалуйста, выберите таймзону из предложенных вариантов."
@@ -636,7 +724,7 @@ async def process_initial_timezone_selection(message: Message, state: FSMContext
 
 
 @router.message(JourneyStates.changing_timezone)
-async def process_timezone_change(message: Message, state: FSMContext):
+async def process_timezone_change(message: Message, state: FSMContext, loader: DataLoader):
     """Process timezone change during active journey."""
     data = await state.get_data()
 
@@ -649,9 +737,9 @@ async def process_timezone_change(message: Message, state: FSMContext):
 
         # Return to previous checkpoint state
         checkpoint_index = data.get("current_checkpoint_index", 0)
-        checkpoints = await db.get_mandatory_checkpoints()
+        sequence = await checkpoint_sequences.get(data.get("border", DEFAULT_BORDER))
 
-        if checkpoint_index >= len(checkpoints):
+        if checkpoint_index >= len(sequence):
             # Journey already completed
             keyboard = create_main_menu_keyboard(has_active_journey=False)
             await message.answer(
@@ -664,20 +752,20 @@ async def process_timezone_change(message: Message, state: FSMContext):
         await message.answer(f"✅ Таймзона изменена: {message.text}")
 
         # Show checkpoint with full history using the same logic
-        await start_next_checkpoint(message, state)
+        await start_next_checkpoint(message, state, loader)
     else:
         await message.answer(
             "❌ Пожалуйста, выберите таймзону из предложенных вариантов."
         )
 
 
-@router.message(F.text == "🌍 Сменить таймзону")
-async def cmd_change_timezone(message: Message, state: FSMContext):
+@dispatch.button("🌍 Сменить таймзону")
+async def cmd_change_timezone(message: Message, state: FSMContext, loader: DataLoader):
     """Handle timezone change request."""
     current_state = await state.get_state()
 
     # Check if user has active journey
-    active_journey = await db.get_user_active_journey(message.from_user.id)
+    active_journey = await loader.user_active_journey(message.from_user.id)
 
     if current_state is None or active_journey is None:
         keyboard = create_main_menu_keyboard(has_active_journey=False)
@@ -703,26 +791,16 @@ async def cmd_change_timezone(message: Message, state: FSMContext):
     )
 
 
-@router.message(StateFilter(
-    JourneyStates.checkpoint_approaching_border,
-    JourneyStates.checkpoint_entering_1,
-    JourneyStates.checkpoint_passport_1,
-    JourneyStates.checkpoint_entering_2,
-    JourneyStates.checkpoint_passport_2,
-    JourneyStates.checkpoint_leaving_2
-))
-async def process_checkpoint_time(message: Message, state: FSMContext):
+@router.message(JourneyStates.checkpoint)
+async def process_checkpoint_time(message: Message, state: FSMContext, loader: DataLoader):
     """Process checkpoint timestamp."""
     data = await state.get_data()
-
-    # Check for timezone change request
-    if message.text == "🌍 Сменить таймзону":
-        await cmd_change_timezone(message, state)
-        return
-
-    # Check if user wants to cancel
-    if message.text == "❌ Отменить поездку":
-        await cmd_cancel(message, state)
+    checkpoint_index = data["current_checkpoint_index"]
+    sequence = await checkpoint_sequences.get(data.get("border", DEFAULT_BORDER))
+    if checkpoint_index >= len(sequence):
+        # The sequence got shorter (checkpoints changed) while the dialog was open:
+        # nothing left to record, finish the journey
+        await start_next_checkpoint(message, state, loader)
         return
 
     # Get timezone selected by user
@@ -735,14 +813,16 @@ async def process_checkpoint_time(message: Message, state: FSMContext):
             timestamp_utc = now_utc()
         else:
             # Get journey to determine reference time
-            journey = await db.get_journey(data["journey_id"])
-            journey_events = await db.get_journey_events(data["journey_id"])
+            journey, journey_events = await asyncio.gather(
+                loader.journey(data["journey_id"]),
+                loader.journey_events(data["journey_id"])
+            )
 
             # Reference time is last checkpoint or departure
             if journey_events:
-                reference_time = parse_db_timestamp(journey_events[-1]["timestamp_utc"])
+                reference_time = journey_events[-1].timestamp_utc
             else:
-                reference_time = parse_db_timestamp(journey["departure_utc"])
+                reference_time = journey.departure_utc
 
             # Parse checkpoint time intelligently (auto-detects next day)
             timestamp_utc = parse_checkpoint_time(
@@ -755,9 +835,9 @@ async def process_checkpoint_time(message: Message, state: FSMContext):
         return
 
     # Validate timestamp order and max duration
-    journey_events = await db.get_journey_events(data["journey_id"])
+    journey_events = await loader.journey_events(data["journey_id"])
     if journey_events:
-        last_event_time = parse_db_timestamp(journey_events[-1]["timestamp_utc"])
+        last_event_time = journey_events[-1].timestamp_utc
 
         if not validate_checkpoint_order(timestamp_utc, last_event_time, max_hours=24):
             # Check what went wrong
@@ -774,8 +854,8 @@ async def process_checkpoint_time(message: Message, state: FSMContext):
             return
     else:
         # First checkpoint - validate against departure
-        journey = await db.get_journey(data["journey_id"])
-        departure_time = parse_db_timestamp(journey["departure_utc"])
+        journey = await loader.journey(data["journey_id"])
+        departure_time = journey.departure_utc
 
         if not validate_checkpoint_order(timestamp_utc, departure_time, max_hours=24):
             if timestamp_utc < departure_time:
@@ -791,13 +871,15 @@ async def process_checkpoint_time(message: Message, state: FSMContext):
             return
 
     # Save checkpoint event with current user timezone
-    await db.create_journey_event(
+    # (journaled locally first, delivered to the database in background)
+    await journal.record_event(
         journey_id=data["journey_id"],
-        checkpoint_id=data["current_checkpoint_id"],
+        checkpoint_id=sequence[checkpoint_index].id,
         timestamp_utc=timestamp_utc,
         source="manual",
         user_timezone=user_timezone
     )
+    loader.forget_journey(data["journey_id"])
 
     # Delete user's input message
     try:
@@ -817,40 +899,37 @@ async def process_checkpoint_time(message: Message, state: FSMContext):
             pass
 
     # Move to next checkpoint
-    await state.update_data(current_checkpoint_index=data["current_checkpoint_index"] + 1)
-    await start_next_checkpoint(message, state)
+    await state.update_data(current_checkpoint_index=checkpoint_index + 1)
+    await start_next_checkpoint(message, state, loader)
 
 
-async def show_journey_summary(message_or_callback, state: FSMContext):
+async def show_journey_summary(message_or_callback, state: FSMContext, loader: DataLoader):
     """Show journey summary and complete it."""
     data = await state.get_data()
     journey_id = data["journey_id"]
 
-    # Get all events
-    events = await db.get_journey_events(journey_id)
-
-    # Get journey for departure time
-    journey = await db.get_journey(journey_id)
-    departure_time = parse_db_timestamp(journey["departure_utc"])
+    # Get all events and the journey for departure time
+    events, journey = await asyncio.gather(loader.journey_events(journey_id), loader.journey(journey_id))
+    departure_time = journey.departure_utc
 
     # Calculate durations
     summary_text = "✅ Поездка завершена!\n\n📊 Итоги:\n\n"
 
     for i, event in enumerate(events):
         checkpoint_name = CHECKPOINT_NAMES.get(
-            event["checkpoints"]["name"],
-            event["checkpoints"]["name"]
+            event.checkpoint_name,
+            event.checkpoint_name
         )
         # Use timezone saved with the event
-        event_tz = event.get("user_timezone", "Europe/Minsk")
+        event_tz = event.user_timezone or "Europe/Minsk"
         time_str = format_datetime_for_user(
-            parse_db_timestamp(event["timestamp_utc"]),
+            event.timestamp_utc,
             event_tz
         )
         summary_text += f"{i+1}. {checkpoint_name}\n   ⏰ {time_str}\n"
 
         # Calculate duration from previous or from departure
-        curr_time = parse_db_timestamp(event["timestamp_utc"])
+        curr_time = event.timestamp_utc
         if i == 0:
             # First checkpoint - calculate from departure
             duration = curr_time - departure_time
@@ -858,16 +937,17 @@ async def show_journey_summary(message_or_callback, state: FSMContext):
             summary_text += f"   ⌛ +{minutes} мин от отправления\n"
         else:
             # Calculate from previous checkpoint
-            prev_time = parse_db_timestamp(events[i-1]["timestamp_utc"])
+            prev_time = events[i-1].timestamp_utc
             duration = curr_time - prev_time
             minutes = int(duration.total_seconds() / 60)
             summary_text += f"   ⌛ +{minutes} мин от предыдущей\n"
         summary_text += "\n"
 
     # Calculate total duration
+    anomalous = False
     if len(events) >= 2:
-        start_time = parse_db_timestamp(events[0]["timestamp_utc"])
-        end_time = parse_db_timestamp(events[-1]["timestamp_utc"])
+        start_time = events[0].timestamp_utc
+        end_time = events[-1].timestamp_utc
         total_duration = end_time - start_time
         total_minutes = int(total_duration.total_seconds() / 60)
 
@@ -882,8 +962,40 @@ async def show_journey_summary(message_or_callback, state: FSMContext):
 
         summary_text += f"🏁 Общее время прохождения границы: {time_str}\n"
 
+        # Score against segment baselines and compare with other journeys of
+        # the same carrier (cached snapshot only)
+        snapshot = await analytics_cache.snapshot(wait=False)
+        if snapshot:
+            score = snapshot.baselines.score_events(events, settings.anomaly_min_samples)
+            anomalous = score > settings.anomaly_threshold
+            # A carrier without journeys in the snapshot is compared with all of them
+            compared_with = journey.carrier_id if journey.carrier_id in snapshot.carriers.carriers[:-1] else None
+        if anomalous:
+            print(f"⚠️ Journey {journey_id} looks anomalous (score {score:.1f}), excluded from statistics")
+        elif snapshot and snapshot.carriers.row(compared_with)["count"] >= MIN_COMPARISON_JOURNEYS:
+            share = snapshot.carriers.share_faster(compared_with, total_duration.total_seconds())
+            others = "поездок с этим перевозчиком" if compared_with else "всех поездок"
+            summary_text += f"📊 Быстрее, чем {share:.0%} {others}\n"
+
+    # Deliver journaled events first so the stored metrics see all of them;
+    # events that arrive later still update the metrics in the database
+    try:
+        await journal.flush()
+    except Exception as e:
+        print(f"⚠️ Journal flush before completion failed: {e}")
+
     # Complete journey
     await db.complete_journey(journey_id)
+    if anomalous:
+        await db.set_journeys_anomalous([journey_id], True)
+    elif len(events) >= 2:
+        forecast.record_journey(
+            journey_id,
+            journey.carrier_id,
+            direction_of(events[0].user_timezone),
+            departure_time,
+            total_duration.total_seconds()
+        )
 
     thank_you_text = (
         "Спасибо за вклад! 🙏\n\n"
@@ -912,13 +1024,13 @@ async def show_journey_summary(message_or_callback, state: FSMContext):
 
 
 @router.message(Command("cancel"))
-@router.message(F.text == "❌ Отменить поездку")
-async def cmd_cancel(message: Message, state: FSMContext):
+@dispatch.button("❌ Отменить поездку")
+async def cmd_cancel(message: Message, state: FSMContext, loader: DataLoader):
     """Cancel current journey - ask for confirmation."""
     current_state = await state.get_state()
 
     # Check if there's an active journey in database
-    active_journey = await db.get_user_active_journey(message.from_user.id)
+    active_journey = await loader.user_active_journey(message.from_user.id)
 
     if current_state is None and active_journey is None:
         keyboard = create_main_menu_keyboard(has_active_journey=False)
@@ -938,23 +1050,24 @@ async def cmd_cancel(message: Message, state: FSMContext):
 
 
 # Confirmation handlers for cancel
-@router.callback_query(F.data == "confirm_cancel_yes")
-async def confirm_cancel_yes(callback: CallbackQuery, state: FSMContext):
+@dispatch.callback("confirm_cancel_yes")
+async def confirm_cancel_yes(callback: CallbackQuery, state: FSMContext, loader: DataLoader):
     """User confirmed cancellation."""
     await callback.answer()
 
     # Mark journey as cancelled in database
-    active_journey = await db.get_user_active_journey(callback.from_user.id)
+    active_journey = await loader.user_active_journey(callback.from_user.id)
     if active_journey:
         try:
             # Try to use cancel_journey if cancelled field exists
-            await db.cancel_journey(active_journey["id"])
-            print(f"✅ Journey {active_journey['id']} marked as cancelled")
+            await db.cancel_journey(active_journey.id)
+            print(f"✅ Journey {active_journey.id} marked as cancelled")
         except Exception as e:
             # Fallback to complete_journey if cancelled field doesn't exist yet
             print(f"⚠️ cancel_journey failed, using complete_journey: {e}")
-            await db.complete_journey(active_journey["id"])
-            print(f"✅ Journey {active_journey['id']} marked as completed")
+            await db.complete_journey(active_journey.id)
+            print(f"✅ Journey {active_journey.id} marked as completed")
+        live_border.discard(active_journey.id)
 
     # Clear FSM state
     await state.clear()
@@ -976,7 +1089,7 @@ async def confirm_cancel_yes(callback: CallbackQuery, state: FSMContext):
     )
 
 
-@router.callback_query(F.data == "confirm_cancel_no")
+@dispatch.callback("confirm_cancel_no")
 async def confirm_cancel_no(callback: CallbackQuery, state: FSMContext):
     """User declined cancellation."""
     await callback.answer("Продолжаем поездку")
@@ -993,13 +1106,15 @@ async def confirm_cancel_no(callback: CallbackQuery, state: FSMContext):
 
 
 @router.message(Command("stats"))
-@router.message(F.text == "📊 Статистика")
-async def cmd_stats(message: Message, state: FSMContext):
+@dispatch.button("📊 Статистика")
+async def cmd_stats(message: Message, state: FSMContext, loader: DataLoader):
     """Show latest border crossing statistics."""
-    journeys = await db.get_latest_border_stats(limit=5)
-
-    # Check if user has active journey for menu
-    active_journey = await db.get_user_active_journey(message.from_user.id)
+    # Independent reads: latest crossings, active journey (for the menu), 7-day summary
+    journeys, active_journey, summary = await asyncio.gather(
+        db.get_latest_border_stats(limit=5),
+        loader.user_active_journey(message.from_user.id),
+        db.get_border_duration_summary(since=now_utc() - timedelta(days=7))
+    )
     keyboard = create_main_menu_keyboard(has_active_journey=active_journey is not None)
 
     if not journeys:
@@ -1009,44 +1124,59 @@ async def cmd_stats(message: Message, state: FSMContext):
         )
         return
 
-    stats_text = "📊 Последние пересечения границы:\n\n"
+    stats_text = ""
 
-    for journey in journeys:
-        carrier_name = journey.get("carriers", {}).get("name", "Неизвестно")
-        events = journey.get("journey_events", [])
+    # Aggregates are computed in the database
+    if summary and summary["journeys"]:
+        stats_text += (
+            f"📈 За 7 дней ({summary['journeys']} поездок):\n"
+            f"⌛ Медиана: {format_duration(int(summary['median_seconds']) // 60)}\n"
+            f"⏳ 90% пересекли быстрее чем за {format_duration(int(summary['p90_seconds']) // 60)}\n\n"
+        )
 
-        if len(events) >= 2:
-            start_time = parse_db_timestamp(events[0]["timestamp_utc"])
-            end_time = parse_db_timestamp(events[-1]["timestamp_utc"])
-            duration = end_time - start_time
-            minutes = int(duration.total_seconds() / 60)
+    # Per-carrier breakdown from the cached analytics snapshot
+    snapshot = await analytics_cache.snapshot(wait=False)
+    if snapshot:
+        names = {carrier.id: carrier.name for carrier in await loader.carriers()}
+        rows = [snapshot.carriers.row(carrier_id) for carrier_id in snapshot.carriers.carriers[:-1]]
+        rows = sorted(
+            (row for row in rows if row["count"] >= MIN_COMPARISON_JOURNEYS),
+            key=lambda row: row["median_seconds"]
+        )
+        if rows:
+            stats_text += f"🚌 По перевозчикам за {analytics_cache.window_days} дней (медиана / 90%):\n"
+            for row in rows:
+                stats_text += (
+                    f"{names.get(row['carrier_id'], 'Неизвестно')}: "
+                    f"{format_duration(int(row['median_seconds']) // 60)} / "
+                    f"{format_duration(int(row['p90_seconds']) // 60)}\n"
+                )
+            stats_text += "\n"
 
-            # Format time nicely with hours and minutes
-            hours = minutes // 60
-            mins = minutes % 60
+    stats_text += "📊 Последние пересечения границы:\n\n"
 
-            if hours > 0:
-                time_str = f"{hours} ч {mins} мин"
-            else:
-                time_str = f"{minutes} мин"
+    for journey in journeys:
+        carrier_name = journey.get("carrier") or "Неизвестно"
+        end_time = parse_db_timestamp(journey["end_utc"])
+        time_str = format_duration(journey["duration_seconds"] // 60)
 
-            # Convert to Minsk timezone for display
-            date_str = format_datetime_for_user(end_time, "Europe/Minsk")
-            stats_text += f"🚌 {carrier_name}\n"
-            stats_text += f"📅 {date_str}\n"
-            stats_text += f"⌛ {time_str}\n\n"
+        # Convert to Minsk timezone for display
+        date_str = format_datetime_for_user(end_time, "Europe/Minsk")
+        stats_text += f"🚌 {carrier_name}\n"
+        stats_text += f"📅 {date_str}\n"
+        stats_text += f"⌛ {time_str}\n\n"
 
     await message.answer(stats_text, reply_markup=keyboard)
 
 
 # Handler for "Ввести время" button
-@router.message(F.text == "⏰ Ввести время")
-async def cmd_enter_time(message: Message, state: FSMContext):
+@dispatch.button("⏰ Ввести время")
+async def cmd_enter_time(message: Message, state: FSMContext, loader: DataLoader):
     """Handle 'Enter time' button press."""
     current_state = await state.get_state()
 
     # Get active journey
-    active_journey = await db.get_user_active_journey(message.from_user.id)
+    active_journey = await loader.user_active_journey(message.from_user.id)
 
     if current_state is None or active_journey is None:
         keyboard = create_main_menu_keyboard(has_active_journey=False)
@@ -1060,17 +1190,17 @@ async def cmd_enter_time(message: Message, state: FSMContext):
     # Get current checkpoint info
     data = await state.get_data()
     checkpoint_index = data.get("current_checkpoint_index", 0)
-    checkpoints = await db.get_mandatory_checkpoints()
+    sequence = await checkpoint_sequences.get(data.get("border", DEFAULT_BORDER))
 
-    if checkpoint_index >= len(checkpoints):
+    if checkpoint_index >= len(sequence):
         await message.answer(
             "Все контрольные точки уже пройдены!",
             reply_markup=create_main_menu_keyboard(has_active_journey=False)
         )
         return
 
-    checkpoint = checkpoints[checkpoint_index]
-    checkpoint_name = CHECKPOINT_NAMES.get(checkpoint["name"], checkpoint["name"])
+    checkpoint = sequence[checkpoint_index]
+    checkpoint_name = CHECKPOINT_NAMES.get(checkpoint.name, checkpoint.name)
 
     # Get current timezone
     current_tz = data.get("user_timezone", "Europe/Minsk")
@@ -1078,7 +1208,7 @@ async def cmd_enter_time(message: Message, state: FSMContext):
 
     keyboard = create_checkpoint_keyboard()
     await message.answer(
-        f"📍 Контрольная точка {checkpoint_index + 1}/6\n"
+        f"📍 Контрольная точка {checkpoint_index + 1}/{len(sequence)}\n"
         f"{checkpoint_name}\n\n"
         f"🌍 Таймзона: {tz_display}\n"
         f"⏰ Введите время (ЧЧ:ММ) или нажмите '⏰ Сейчас':",
@@ -0,0 +1,85 @@
+"""Dispatcher middlewares."""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from database import DataLoader
+
+
+class UserSequencingMiddleware(BaseMiddleware):
+    """
+    Process updates of one user in a chat strictly one at a time.
+
+    Different users still run fully in parallel. A lock exists only while
+    its user has updates in flight, so idle users cost no memory.
+
+    Must be registered as an outer `update` middleware after the
+    dispatcher's own ones, which put `event_chat`/`event_from_user` in data.
+    """
+
+    def __init__(self):
+        self._locks: Dict[Tuple[int, int], asyncio.Lock] = {}
+        self._pending: Dict[Tuple[int, int], int] = {}
+
+    @property
+    def active_users(self) -> int:
+        """Number of users with updates queued or running."""
+        return len(self._locks)
+
+    @staticmethod
+    def _key(data: Dict[str, Any]) -> Optional[Tuple[int, int]]:
+        chat = data.get("event_chat")
+        user = data.get("event_from_user")
+        if chat is None and user is None:
+            return None
+        return (chat.id if chat else user.id, user.id if user else chat.id)
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        key = self._key(data)
+        if key is None:
+            return await handler(event, data)
+
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        self._pending[key] = self._pending.get(key, 0) + 1
+
+        try:
+            async with lock:
+                return await handler(event, data)
+        finally:
+            self._pending[key] -= 1
+            if not self._pending[key]:
+                del self._pending[key]
+                del self._locks[key]
+
+
+class DataLoaderMiddleware(BaseMiddleware):
+    """
+    Give every update its own DataLoader as the `loader` handler argument.
+
+    Reads repeated while the update is handled (the active journey, the
+    journey and its events) then hit the database once; carriers come
+    from `reference` (ReferenceData) when given.
+    """
+
+    def __init__(self, database, journal, reference=None):
+        self.database = database
+        self.journal = journal
+        self.reference = reference
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        data["loader"] = DataLoader(self.database, self.journal, self.reference)
+        return await handler(event, data)
@@ -7,6 +7,7 @@ class JourneyStates(StatesGroup):
 
     # Initial setup
     choosing_carrier = State()
+    choosing_border = State()  # only when more than one crossing has checkpoints
     entering_departure_date = State()
     entering_departure_time = State()
     choosing_initial_timezone = State()
@@ -14,14 +15,9 @@ class JourneyStates(StatesGroup):
     # Timezone management
     changing_timezone = State()
 
-    # Mandatory checkpoints (in order)
-    checkpoint_approaching_border = State()
-    checkpoint_entering_1 = State()
-    checkpoint_passport_1 = State()
-    checkpoint_leaving_1 = State()
-    checkpoint_entering_2 = State()
-    checkpoint_passport_2 = State()
-    checkpoint_leaving_2 = State()
+    # Mandatory checkpoints: one state for the whole sequence of the journey's
+    # border crossing, position in `current_checkpoint_index`
+    checkpoint = State()
 
     # Optional checkpoints
     add_optional_checkpoint = State()
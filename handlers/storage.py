@@ -0,0 +1,174 @@
+"""FSM storage with idle expiry and compact records."""
+import sys
+import time
+from collections import Counter, OrderedDict
+from datetime import timedelta
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+from config import settings
+
+_Key = Tuple[Any, ...]
+
+
+class _Record:
+    __slots__ = ("state", "keys", "values", "touched")
+
+    def __init__(self, touched: float):
+        self.state: Optional[str] = None
+        self.keys: Tuple[str, ...] = ()
+        self.values: Tuple[Any, ...] = ()
+        self.touched = touched
+
+
+class CompactMemoryStorage(BaseStorage):
+    """
+    In-memory FSM storage whose footprint follows active users, not all users.
+
+    MemoryStorage keeps a record for every chat that ever wrote to the bot
+    (even a read creates one) and never drops data of abandoned flows.
+    Here:
+
+    - chats without state and data have no record; reads create nothing
+    - records untouched for `ttl` seconds expire, and above `max_records`
+      the least recently used ones are evicted
+    - a record is a key tuple and a slotted object: state names are
+      interned, data is a tuple of values against a tuple of keys shared
+      by every record with the same keys
+
+    Data is copied shallowly in and out, as MemoryStorage does.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 72 * 3600,
+        max_records: int = 100_000,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.ttl = ttl
+        self.max_records = max_records
+        self.clock = clock
+        self.expired = 0  # records dropped after `ttl` idle
+        self.evicted = 0  # records dropped over `max_records`
+
+        # Least recently used first, so expiry and eviction pop from the front
+        self._records: "OrderedDict[_Key, _Record]" = OrderedDict()
+        self._key_sets: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
+    @staticmethod
+    def _key(key: StorageKey) -> _Key:
+        return (key.bot_id, key.chat_id, key.user_id, key.thread_id, key.business_connection_id, key.destiny)
+
+    def _get(self, key: _Key) -> Optional[_Record]:
+        record = self._records.get(key)
+        if record is None:
+            return None
+        now = self.clock()
+        if now - record.touched > self.ttl:
+            del self._records[key]
+            self.expired += 1
+            return None
+        record.touched = now
+        self._records.move_to_end(key)
+        return record
+
+    def _create(self, key: _Key) -> _Record:
+        now = self.clock()
+        # Records are ordered by last access: the expired ones are at the front
+        while self._records:
+            oldest_key, oldest = next(iter(self._records.items()))
+            if now - oldest.touched <= self.ttl:
+                break
+            del self._records[oldest_key]
+            self.expired += 1
+        while len(self._records) >= self.max_records:
+            self._records.popitem(last=False)
+            self.evicted += 1
+
+        record = self._records[key] = _Record(now)
+        return record
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        storage_key = self._key(key)
+        record = self._get(storage_key)
+        if isinstance(state, State):
+            state = state.state
+        if state is None:
+            if record is not None:
+                if record.values:
+                    record.state = None
+                else:
+                    del self._records[storage_key]
+            return
+
+        if record is None:
+            record = self._create(storage_key)
+        record.state = sys.intern(state)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        record = self._get(self._key(key))
+        return record.state if record else None
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        if not isinstance(data, dict):
+            raise ValueError(f"Data must be a dict, got {type(data).__name__}")
+        storage_key = self._key(key)
+        record = self._get(storage_key)
+        if not data:
+            if record is not None:
+                if record.state is not None:
+                    record.keys = record.values = ()
+                else:
+                    del self._records[storage_key]
+            return
+
+        if record is None:
+            record = self._create(storage_key)
+        keys = tuple(data)
+        record.keys = self._key_sets.setdefault(keys, keys)
+        record.values = tuple(data.values())
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        record = self._get(self._key(key))
+        return dict(zip(record.keys, record.values)) if record else {}
+
+    async def get_value(self, storage_key: StorageKey, dict_key: str, default: Optional[Any] = None) -> Optional[Any]:
+        record = self._get(self._key(storage_key))
+        if record is None or dict_key not in record.keys:
+            return default
+        return record.values[record.keys.index(dict_key)]
+
+    async def close(self) -> None:
+        # Nothing to release; records stay readable for the shutdown report
+        pass
+
+    def report(self) -> Dict[str, Any]:
+        """Records, their states and approximate memory, for logs and diagnostics."""
+        size = sys.getsizeof(self._records)
+        for key, record in self._records.items():
+            size += sys.getsizeof(key) + sum(sys.getsizeof(part) for part in key)
+            size += sys.getsizeof(record) + sys.getsizeof(record.values)
+            size += sum(sys.getsizeof(value) for value in record.values)
+        # Shared by many records: counted once
+        size += sum(sys.getsizeof(keys) for keys in self._key_sets.values())
+
+        return {
+            "records": len(self._records),
+            "states": dict(Counter(record.state for record in self._records.values())),
+            "key_sets": len(self._key_sets),
+            "bytes": size,
+            "expired": self.expired,
+            "evicted": self.evicted
+        }
+
+
+def create_storage() -> BaseStorage:
+    """Create the FSM storage selected by settings.fsm_storage_url."""
+    ttl = timedelta(hours=settings.fsm_state_ttl_hours)
+    if settings.fsm_storage_url:
+        # Shared by all worker processes; keys expire `ttl` after the last write
+        from aiogram.fsm.storage.redis import RedisStorage
+        return RedisStorage.from_url(settings.fsm_storage_url, state_ttl=ttl, data_ttl=ttl)
+    return CompactMemoryStorage(ttl=ttl.total_seconds(), max_records=settings.fsm_max_records)
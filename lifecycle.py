@@ -0,0 +1,220 @@
+"""Process lifecycle: startup profile, polling with a graceful stop (stop fetching, drain, acknowledge, shut down)."""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Dict, List, Optional, Tuple
+
+from aiogram import Bot, Dispatcher
+from aiogram.methods import GetUpdates
+
+logger = logging.getLogger(__name__)
+
+MAX_POLL_BACKOFF = 30.0
+
+
+class StartupProfile:
+    """
+    Wall time of startup phases, from `started` (perf_counter) to ready.
+
+    mark(phase) ends the phase running since the previous mark; report()
+    is the total followed by each phase, e.g. for one "Startup: ..." line.
+    """
+
+    def __init__(self, started: Optional[float] = None):
+        self.started = time.perf_counter() if started is None else started
+        self.phases: List[Tuple[str, float]] = []
+        self._last = self.started
+
+    def mark(self, phase: str) -> None:
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    def report(self) -> str:
+        phases = ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in self.phases)
+        return f"{self._last - self.started:.2f}s ({phases})"
+
+
+class InFlightUpdates:
+    """
+    Updates being handled, each in its own task, by update id.
+
+    drain() waits for them with a deadline and cancels the rest; their ids
+    are kept in `cut_off` so they can be left unacknowledged.
+    """
+
+    def __init__(self):
+        self.handled = 0  # finished, successfully or not
+        self.cut_off: List[int] = []
+        self._tasks: Dict[asyncio.Task, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def start(self, update_id: int, handling: Awaitable[Any]) -> asyncio.Task:
+        task = asyncio.ensure_future(handling)
+        self._tasks[task] = update_id
+        task.add_done_callback(self._done)
+        return task
+
+    def _done(self, task: asyncio.Task) -> None:
+        if self._tasks.pop(task, None) is None or task.cancelled():
+            return
+        self.handled += 1
+        if task.exception() is not None:
+            logger.error("Update failed", exc_info=task.exception())
+
+    async def drain(self, timeout: float) -> int:
+        """Wait up to `timeout` seconds for running updates, cancel the rest; returns how many were cut off."""
+        if not self._tasks:
+            return 0
+        logger.info(f"Waiting for {len(self._tasks)} update(s) in flight")
+        await asyncio.wait(list(self._tasks), timeout=timeout)
+
+        remaining = dict(self._tasks)
+        self._tasks.clear()
+        for task in remaining:
+            task.cancel()
+        if remaining:
+            await asyncio.gather(*remaining, return_exceptions=True)
+            self.cut_off.extend(sorted(remaining.values()))
+            logger.warning(
+                f"{len(remaining)} update(s) still running after {timeout:g}s were cut off: "
+                f"{sorted(remaining.values())}"
+            )
+        return len(remaining)
+
+
+class UpdatePoller:
+    """
+    Long-poll getUpdates and handle every update as a task.
+
+    Dispatcher.start_polling closes the session and FSM storage while
+    handlers may still be running. Here stopping is done in steps:
+
+    - stop(): no more updates are fetched (a request in flight is dropped,
+      Telegram sends its updates again)
+    - drain(): handlers get up to a deadline to finish
+    - confirm(): the last fetched batch is acknowledged, so it is not
+      delivered again after the restart
+
+    Telegram forgets a batch as soon as the next one is requested, and an
+    acknowledgement covers every update below an offset. So updates cut off
+    by the deadline are delivered again only when they end the last batch;
+    a cut-off update followed by a handled one is lost rather than
+    redelivered together with it. Handling an update twice is worse than
+    losing a tap: a repeated "now" would record the next checkpoint, since
+    the dialog has already moved on. Lost updates are logged.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        dp: Dispatcher,
+        polling_timeout: int = 10,
+        allowed_updates: Optional[List[str]] = None
+    ):
+        self.bot = bot
+        self.dp = dp
+        self.polling_timeout = polling_timeout
+        self.allowed_updates = allowed_updates
+        self.in_flight = InFlightUpdates()
+        self.received = 0
+
+        self._last_update_id: Optional[int] = None
+        self._batch: List[int] = []  # update ids of the last fetched batch
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Start fetching updates in the background."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop fetching updates; those already received keep running."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def drain(self, timeout: float) -> int:
+        """Let running handlers finish for up to `timeout` seconds; returns how many were cut off."""
+        return await self.in_flight.drain(timeout)
+
+    async def confirm(self) -> None:
+        """Acknowledge every handled update; only cut-off updates ending the last batch stay unacknowledged."""
+        if self._last_update_id is None:
+            return
+        cut_off = set(self.in_flight.cut_off)
+        offset = self._last_update_id + 1
+        for update_id in reversed(self._batch):
+            if update_id not in cut_off:
+                break
+            offset = update_id
+        lost = sorted(update_id for update_id in cut_off if update_id < offset)
+        if lost:
+            logger.warning(f"{len(lost)} update(s) cut off and not delivered again: {lost}")
+        try:
+            # Acknowledges everything below `offset`; what this returns is not
+            await self.bot(GetUpdates(offset=offset, limit=1, timeout=0))
+        except Exception as e:
+            logger.warning(f"Handled updates not acknowledged, some will be delivered again: {e}")
+
+    async def _run(self) -> None:
+        offset = None
+        delay = 1.0
+        request_timeout = int(self.bot.session.timeout + self.polling_timeout)
+        while True:
+            request = GetUpdates(offset=offset, timeout=self.polling_timeout, allowed_updates=self.allowed_updates)
+            try:
+                updates = await self.bot(request, request_timeout=request_timeout)
+            except Exception as e:
+                logger.warning(f"Polling failed, retrying in {delay:.0f}s: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, MAX_POLL_BACKOFF)
+                continue
+            delay = 1.0
+
+            if updates:
+                self._batch = [update.update_id for update in updates]
+            for update in updates:
+                self.received += 1
+                self._last_update_id = update.update_id
+                offset = update.update_id + 1
+                self.in_flight.start(update.update_id, self.dp.feed_update(self.bot, update))
+
+
+async def serve(bot: Bot, dp: Dispatcher, stop: asyncio.Event, drain_timeout: float) -> Dict[str, Any]:
+    """
+    Poll and handle updates until `stop` is set, then shut down gracefully.
+
+    Returns shutdown figures: updates received, handled and cut off, and
+    how long the shutdown took.
+    """
+    poller = UpdatePoller(bot, dp, allowed_updates=dp.resolve_used_update_types())
+    await dp.emit_startup(bot=bot, dispatcher=dp)
+    await poller.start()
+    logger.info("Polling started")
+    try:
+        await stop.wait()
+    finally:
+        started = time.monotonic()
+        logger.info("Stopping: no new updates, waiting for running ones")
+        await poller.stop()
+        await poller.drain(drain_timeout)
+        await poller.confirm()
+        # Closes the FSM storage: only after the handlers using it are done
+        await dp.emit_shutdown(bot=bot, dispatcher=dp)
+
+    report = {
+        "received": poller.received,
+        "handled": poller.in_flight.handled,
+        "cut_off": len(poller.in_flight.cut_off),
+        "shutdown_seconds": round(time.monotonic() - started, 2)
+    }
+    logger.info(f"Polling stopped: {report}")
+    return report
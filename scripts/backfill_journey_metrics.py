@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""Compute stored metrics for completed journeys that have none (see migration 006)."""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from database.db import create_database  # noqa: E402
+
+
+async def main(batch_size: int) -> int:
+    database = create_database()
+    total = 0
+    try:
+        while True:
+            processed = await database.backfill_journey_metrics(batch_size)
+            if not processed:
+                break
+            total += processed
+            print(f"   {total} journey(s) processed")
+    finally:
+        await database.close()
+    print(f"✅ Backfill complete: {total} journey(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.batch_size)))
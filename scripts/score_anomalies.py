@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Score completed journeys against per-segment median/MAD baselines and update `journeys.anomalous`."""
+import argparse
+import asyncio
+import sys
+from datetime import timedelta
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config import settings  # noqa: E402
+from analytics.anomaly import compute_baselines, score_journeys  # noqa: E402
+from analytics.events import EventArrays  # noqa: E402
+from analytics.segments import segment_pairs  # noqa: E402
+from database.db import create_database  # noqa: E402
+from utils import now_utc  # noqa: E402
+
+
+async def main(days: int, threshold: float, min_samples: int, dry_run: bool) -> int:
+    database = create_database()
+    try:
+        rows = await database.load_analytics_events(now_utc() - timedelta(days=days))
+        checkpoints = await database.get_mandatory_checkpoints()
+        events = EventArrays.from_rows(rows)
+        print(f"📥 {len(events)} events of {len(events.journey_ids)} journeys")
+
+        pairs = segment_pairs(events, checkpoints)
+        baselines = compute_baselines(pairs)
+        for (start, end), median, spread, count in zip(
+            baselines.segments, baselines.median, baselines.spread, baselines.count
+        ):
+            print(f"   {start} → {end}: median {median / 60:.0f} min, spread {spread / 60:.0f} min, n={count}")
+
+        scores = score_journeys(pairs, baselines, len(events.journey_ids), min_samples)
+        flagged = scores > threshold
+        current = np.zeros(len(events.journey_ids), dtype=bool)
+        current[events.journey] = events.anomalous
+
+        to_flag = [events.journey_ids[i] for i in np.flatnonzero(flagged & ~current)]
+        to_clear = [events.journey_ids[i] for i in np.flatnonzero(~flagged & current)]
+        print(f"🚩 {int(flagged.sum())} anomalous: {len(to_flag)} newly flagged, {len(to_clear)} cleared")
+
+        if not dry_run:
+            if to_flag:
+                await database.set_journeys_anomalous(to_flag, True)
+            if to_clear:
+                await database.set_journeys_anomalous(to_clear, False)
+            print("✅ Flags updated")
+    finally:
+        await database.close()
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--days", type=int, default=365, help="Score journeys that ended in the last N days")
+    parser.add_argument("--threshold", type=float, default=settings.anomaly_threshold)
+    parser.add_argument("--min-samples", type=int, default=settings.anomaly_min_samples)
+    parser.add_argument("--dry-run", action="store_true", help="Only report, do not update flags")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.days, args.threshold, args.min_samples, args.dry_run)))
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Profile where the bot's cold start goes: imports, per top-level package.
+
+Imports a module (the bot by default) in a fresh interpreter with
+`python -X importtime`, `--runs` times, and reports the fastest run: the
+wall time of the interpreter, the time spent importing and the packages
+costing the most (self time of all their modules summed).
+
+Runtime phases (database, reference data, forecast, journal) are logged
+by the bot itself as "Startup: ..." once it is ready to poll.
+
+Usage:
+    python3 scripts/startup_profile.py [--module bot] [--runs 3] [--top 15]
+"""
+import argparse
+import subprocess
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def profile_import(module: str) -> Tuple[float, Dict[str, int]]:
+    """Wall seconds of `python -c "import <module>"` and import self time (us) per top-level package."""
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    wall = time.perf_counter() - started
+    if result.returncode != 0:
+        sys.exit(f"❌ import {module} failed:\n{result.stderr[-2000:]}")
+
+    packages: Counter = Counter()
+    for line in result.stderr.splitlines():
+        # import time: <self us> | <cumulative us> | <indented module name>
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line.split(":", 1)[1].split("|", 2)
+        packages[name.strip().split(".")[0]] += int(self_us)
+    return wall, packages
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="bot")
+    parser.add_argument("--runs", type=int, default=3, help="fresh interpreters; the fastest is reported")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    wall, packages = min((profile_import(args.module) for _ in range(args.runs)), key=lambda run: run[0])
+    total = sum(packages.values())
+    print(f"⏱ import {args.module}: {wall:.2f}s wall, {total / 1e6:.2f}s importing {len(packages)} packages")
+    for name, self_us in packages.most_common(args.top):
+        print(f"   {name:<28} {self_us / 1e3:>8.1f} ms  {self_us / total:>6.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+"""
+Multi-process mode: one supervisor polls Telegram, workers handle updates.
+
+The supervisor only decodes getUpdates responses and routes every update
+to a worker by a hash of its chat id, so one chat is always handled by the
+same worker, in order, while rendering, timezone math and model parsing
+run on all cores. Workers report heartbeats; a worker that exits or stops
+reporting for `worker_timeout` is restarted.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import aiohttp
+
+from config import settings
+from lifecycle import InFlightUpdates, StartupProfile
+
+logger = logging.getLogger(__name__)
+
+API_URL = "https://api.telegram.org/bot{token}/{method}"
+POLL_TIMEOUT = 30  # Seconds Telegram holds a getUpdates request open
+MAX_POLL_BACKOFF = 30.0
+REPORT_INTERVAL = 300.0  # Seconds between worker health log lines
+
+# Multiprocessing start method: workers import the bot from scratch
+_context = multiprocessing.get_context("spawn")
+
+
+def chat_id_of(update: Dict[str, Any]) -> int:
+    """Chat the update belongs to (user for inline queries and the like, 0 if none)."""
+    for key, payload in update.items():
+        if key == "update_id" or not isinstance(payload, dict):
+            continue
+        if "chat" in payload:
+            return payload["chat"]["id"]
+        message = payload.get("message")
+        if isinstance(message, dict) and "chat" in message:
+            return message["chat"]["id"]
+        user = payload.get("from") or payload.get("user")
+        if user:
+            return user["id"]
+    return 0
+
+
+def shard_of(update: Dict[str, Any], workers: int) -> int:
+    """Worker index for an update: stable for a chat across runs."""
+    chat_id = chat_id_of(update)
+    return zlib.crc32(chat_id.to_bytes(8, "little", signed=True)) % workers
+
+
+def worker_path(path: str, index: int) -> str:
+    """Per-worker file next to `path` (worker 0 keeps `path` itself)."""
+    if index == 0:
+        return path
+    p = Path(path)
+    return str(p.with_name(f"{p.stem}-{index}{p.suffix}"))
+
+
+# Worker process
+async def _worker_main(index: int, updates, status) -> None:
+    profile = StartupProfile()
+    from aiogram import Bot
+    from analytics import forecast
+    from bot import create_dispatcher, start_services, stop_services
+    from database import EventJournal, journal, sweeper
+    from handlers import create_storage
+    profile.mark("imports")
+
+    # Local files are not shared between processes
+    path = journal.path
+    journal.path = worker_path(path, index)
+    forecast.path = Path(worker_path(str(forecast.path), index))
+    if index == 0:
+        # The sweeper runs here only; events still in other workers' journals
+        # must count as activity too, so it flushes their files as well
+        # (SQLite allows it; delivery is idempotent)
+        sweeper.journals += [
+            EventJournal(
+                journal.database,
+                worker_path(path, other),
+                batch_size=journal.batch_size,
+                max_attempts=journal.max_attempts,
+                sequences=journal.sequences
+            )
+            for other in range(1, settings.bot_workers)
+        ]
+
+    loop = asyncio.get_running_loop()
+    in_flight = InFlightUpdates()
+
+    async def heartbeat() -> None:
+        while True:
+            status.put((index, os.getpid(), in_flight.handled, len(in_flight)))
+            await asyncio.sleep(settings.worker_heartbeat_interval)
+
+    # Beating while services load (a forecast rebuild can take a while)
+    heartbeats = asyncio.create_task(heartbeat())
+    bot = Bot(token=settings.telegram_bot_token)
+    dp = create_dispatcher(create_storage())
+    board = await start_services(bot, primary=index == 0, profile=profile)
+    logger.info(f"Worker {index} started (pid {os.getpid()})")
+    try:
+        while True:
+            update = await loop.run_in_executor(None, updates.get)
+            if update is None:
+                break
+            # Same as polling: updates run as tasks, UserSequencingMiddleware keeps per-user order
+            in_flight.start(update["update_id"], dp.feed_raw_update(bot, update))
+        # Everything routed here before the stop was taken; let it finish
+        await in_flight.drain(settings.shutdown_drain_timeout)
+    finally:
+        heartbeats.cancel()
+        await dp.emit_shutdown(bot=bot)
+        await stop_services(board)
+        await bot.session.close()
+        logger.info(
+            f"Worker {index} stopped after {in_flight.handled} update(s), {len(in_flight.cut_off)} cut off"
+        )
+
+
+def run_worker(index: int, updates, status) -> None:
+    """Worker process entry point."""
+    # The supervisor decides when workers stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logging.basicConfig(
+        level=logging.INFO,
+        format=f'%(asctime)s - worker {index} - %(name)s - %(levelname)s - %(message)s',
+        force=True
+    )
+    asyncio.run(_worker_main(index, updates, status))
+
+
+# Supervisor process
+@dataclass
+class WorkerHandle:
+    index: int
+    process: Optional[multiprocessing.Process] = None
+    updates: Any = None  # queue of raw updates, None to stop
+    started: float = 0.0  # monotonic
+    heartbeat: float = 0.0  # monotonic time of the last heartbeat
+    handled: int = 0
+    in_flight: int = 0
+    routed: int = 0
+    restarts: int = 0
+
+
+class Supervisor:
+    """
+    Poll Telegram and route updates to `workers` processes by chat id.
+
+    FSM state lives in each worker's memory unless FSM_STORAGE_URL points
+    to Redis; a restarted worker then starts its chats' dialogs over.
+    Updates queued for a worker that dies are lost with it, as they would
+    be with a crashed single process.
+
+    Known limitation: in-memory estimates are per worker too. The live
+    "border now" estimate sees the events recorded by its own worker plus
+    what it loaded from the database at start; forecast histograms count
+    journeys completed by other workers only at the next start (catch-up
+    from the database); analytics snapshots are refreshed from the
+    database by each worker on its own schedule. `/now` and the forecasts
+    may therefore differ slightly between chats served by different
+    workers. The abandoned-journey sweeper runs in worker 0 only and
+    flushes every worker's journal before each round.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        heartbeat_interval: float = settings.worker_heartbeat_interval,
+        timeout: float = settings.worker_timeout
+    ):
+        self.workers = [WorkerHandle(index) for index in range(workers)]
+        self.heartbeat_interval = heartbeat_interval
+        self.timeout = timeout
+        self.status = _context.Queue()
+        self._stopping = asyncio.Event()
+        self._offset: Optional[int] = None  # next update id to fetch
+
+    # Workers
+    def _start(self, worker: WorkerHandle) -> None:
+        # A fresh queue: one read by a killed process may be left locked
+        worker.updates = _context.Queue()
+        worker.process = _context.Process(
+            target=run_worker,
+            args=(worker.index, worker.updates, self.status),
+            name=f"granica-worker-{worker.index}",
+            daemon=True
+        )
+        worker.process.start()
+        worker.started = worker.heartbeat = time.monotonic()
+
+    def _restart(self, worker: WorkerHandle, reason: str) -> None:
+        lost = _qsize(worker.updates)
+        logger.error(f"Worker {worker.index} {reason}, restarting ({lost} queued update(s) lost)")
+        if worker.process.is_alive():
+            worker.process.kill()
+        worker.process.join(timeout=5)
+        worker.restarts += 1
+        self._start(worker)
+
+    async def _monitor(self) -> None:
+        loop = asyncio.get_running_loop()
+        reported = time.monotonic()
+        while not self._stopping.is_set():
+            # Drain heartbeats without blocking the event loop
+            try:
+                beat = await loop.run_in_executor(None, self.status.get, True, self.heartbeat_interval)
+            except queue.Empty:
+                beat = None
+            now = time.monotonic()
+            if beat is not None:
+                index, pid, handled, in_flight = beat
+                worker = self.workers[index]
+                if worker.process is not None and worker.process.pid == pid:
+                    worker.heartbeat = now
+                    worker.handled, worker.in_flight = handled, in_flight
+
+            if self._stopping.is_set():
+                break
+            for worker in self.workers:
+                if not worker.process.is_alive():
+                    self._restart(worker, f"exited with code {worker.process.exitcode}")
+                elif now - worker.heartbeat > self.timeout:
+                    self._restart(worker, f"sent no heartbeat for {now - worker.heartbeat:.0f}s")
+            if now - reported >= REPORT_INTERVAL:
+                logger.info(f"Workers: {self.report()}")
+                reported = now
+
+    def report(self) -> Dict[int, Dict[str, Any]]:
+        """Per-worker health: pid, uptime, heartbeat age, updates routed/handled/in flight/queued."""
+        now = time.monotonic()
+        return {
+            worker.index: {
+                "pid": worker.process.pid if worker.process else None,
+                "alive": bool(worker.process and worker.process.is_alive()),
+                "uptime": round(now - worker.started),
+                "heartbeat_age": round(now - worker.heartbeat, 1),
+                "routed": worker.routed,
+                "handled": worker.handled,
+                "in_flight": worker.in_flight,
+                "queued": _qsize(worker.updates),
+                "restarts": worker.restarts
+            }
+            for worker in self.workers
+        }
+
+    # Polling
+    async def _poll(self, allowed_updates) -> None:
+        url = API_URL.format(token=settings.telegram_bot_token, method="getUpdates")
+        backoff = 1.0
+        timeout = aiohttp.ClientTimeout(total=POLL_TIMEOUT + 10)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            while not self._stopping.is_set():
+                params = {"timeout": POLL_TIMEOUT, "allowed_updates": allowed_updates}
+                if self._offset is not None:
+                    params["offset"] = self._offset
+                try:
+                    async with session.post(url, json=params) as response:
+                        body = await response.json()
+                    if not body.get("ok"):
+                        raise RuntimeError(f"getUpdates failed: {body.get('description')}")
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning(f"Polling failed, retrying in {backoff:.0f}s: {e}")
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, MAX_POLL_BACKOFF)
+                    continue
+                backoff = 1.0
+
+                for update in body["result"]:
+                    worker = self.workers[shard_of(update, len(self.workers))]
+                    worker.updates.put(update)
+                    worker.routed += 1
+                    self._offset = update["update_id"] + 1
+
+    async def _confirm(self) -> None:
+        """Acknowledge routed updates (the workers have handled them), so they are not delivered again."""
+        if self._offset is None:
+            return
+        url = API_URL.format(token=settings.telegram_bot_token, method="getUpdates")
+        try:
+            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10)) as session:
+                async with session.post(url, json={"offset": self._offset, "limit": 1, "timeout": 0}) as response:
+                    await response.read()
+        except Exception as e:
+            logger.warning(f"Routed updates not acknowledged, some will be delivered again: {e}")
+
+    async def run(self) -> None:
+        """Start the workers, route updates until SIGINT/SIGTERM, then stop the workers."""
+        from aiogram.fsm.storage.memory import MemoryStorage
+        from bot import create_dispatcher
+
+        # Same update types as polling in a single process would ask for
+        allowed_updates = create_dispatcher(MemoryStorage()).resolve_used_update_types()
+        if not settings.fsm_storage_url:
+            logger.warning("FSM state is kept per worker: a restarted worker loses its users' dialogs")
+
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self._stopping.set)
+
+        for worker in self.workers:
+            self._start(worker)
+        logger.info(f"Supervisor started {len(self.workers)} worker(s)")
+
+        poller = asyncio.create_task(self._poll(allowed_updates))
+        monitor = asyncio.create_task(self._monitor())
+        try:
+            await self._stopping.wait()
+        finally:
+            self._stopping.set()
+            poller.cancel()
+            await asyncio.gather(poller, monitor, return_exceptions=True)
+            await self._stop_workers()
+            await self._confirm()
+            logger.info(f"Workers: {self.report()}")
+
+    async def _stop_workers(self) -> None:
+        # Workers drain their queue, then their handlers, then flush
+        timeout = settings.shutdown_drain_timeout + settings.shutdown_flush_timeout + 10
+        for worker in self.workers:
+            worker.updates.put(None)
+        deadline = time.monotonic() + timeout
+        for worker in self.workers:
+            await asyncio.to_thread(worker.process.join, max(0.0, deadline - time.monotonic()))
+            if worker.process.is_alive():
+                logger.warning(f"Worker {worker.index} did not stop in {timeout:.0f}s, killing it")
+                worker.process.kill()
+                worker.process.join()
+
+
+def _qsize(updates) -> int:
+    try:
+        return updates.qsize() if updates is not None else 0
+    except NotImplementedError:  # macOS
+        return 0
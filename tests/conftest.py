@@ -0,0 +1,14 @@
+"""Shared test setup: the project root on sys.path, settings that import without a .env."""
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# Required settings for offline tests; a .env (read by config.py) or the
+# environment takes precedence
+if not (ROOT / ".env").exists():
+    os.environ.setdefault("TELEGRAM_BOT_TOKEN", "42:TEST")
+    os.environ.setdefault("SUPABASE_URL", "http://localhost")
+    os.environ.setdefault("SUPABASE_KEY", "test")
@@ -0,0 +1,168 @@
+"""
+Parity of the Supabase (PostgREST) and direct Postgres (asyncpg) backends.
+
+Runs against the database in SUPABASE_URL / SUPABASE_DIRECT_URL and is
+skipped when SUPABASE_DIRECT_URL is not set. Reads are compared on
+existing data. Writes go through both backends with the same scenario and
+only touch journeys of TEST_USER_ID (no Telegram user has a negative id),
+deleted afterwards; abandoned journeys are dated in 2000 so closing them
+cannot reach real ones.
+"""
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from config import settings
+
+pytestmark = pytest.mark.skipif(not settings.supabase_direct_url, reason="SUPABASE_DIRECT_URL not set")
+
+TEST_USER_ID = -20250601
+# Differ between two otherwise identical writes
+VOLATILE_KEYS = {"id", "journey_id", "created_at", "updated_at"}
+LONG_AGO = datetime(2000, 1, 1)
+
+
+def normalize(value, drop=frozenset()):
+    """Make results comparable: drop key order, `drop` keys and sub-second timestamp formatting noise."""
+    if isinstance(value, dict):
+        return {key: normalize(item, drop) for key, item in sorted(value.items()) if key not in drop}
+    if isinstance(value, list):
+        return [normalize(item, drop) for item in value]
+    if isinstance(value, str) and len(value) >= 19 and value[10:11] == "T":
+        return value.rstrip("0").rstrip(".")
+    return value
+
+
+def by_journey(row):
+    return row["journey_id"]
+
+
+@pytest.fixture
+async def rest():
+    from database.db import SupabaseDatabase
+    database = SupabaseDatabase()
+    yield database
+    await database.close()
+
+
+@pytest.fixture
+async def pg():
+    from database.postgres import PostgresDatabase
+    database = PostgresDatabase(settings.supabase_direct_url)
+    yield database
+    await database.close()
+
+
+@pytest.fixture
+async def test_journeys(pg):
+    """Delete the test user's journeys (and their events) after the test."""
+    yield
+    pool = await pg.pool()
+    await pool.execute("DELETE FROM journeys WHERE user_id = $1", TEST_USER_ID)
+
+
+@pytest.fixture
+async def reference(pg):
+    carriers = await pg.get_carriers()
+    checkpoints = await pg.get_mandatory_checkpoints()
+    if not carriers or len(checkpoints) < 2:
+        pytest.skip("needs carriers and at least two mandatory checkpoints")
+    return carriers[0]["id"], [c for c in checkpoints if c.get("border", "default") == "default"]
+
+
+# Reads
+async def assert_same_read(rest, pg, method, *args, **kwargs):
+    """Both backends return the same for `method`."""
+    rest_result = await getattr(rest, method)(*args, **kwargs)
+    pg_result = await getattr(pg, method)(*args, **kwargs)
+    assert normalize(rest_result) == normalize(pg_result)
+
+
+@pytest.mark.parametrize("method", ["get_carriers", "get_mandatory_checkpoints"])
+async def test_reference_reads(rest, pg, method):
+    await assert_same_read(rest, pg, method)
+
+
+async def test_reads_by_id(rest, pg, reference):
+    carrier_id, checkpoints = reference
+    await assert_same_read(rest, pg, "get_carrier_by_id", carrier_id)
+    await assert_same_read(rest, pg, "get_checkpoint_by_id", checkpoints[0]["id"])
+
+
+async def test_stats_reads(rest, pg):
+    await assert_same_read(rest, pg, "get_latest_border_stats", limit=5)
+    since = datetime.now(timezone.utc) - timedelta(days=30)
+    await assert_same_read(rest, pg, "get_border_duration_summary", since)
+    rest_changes, pg_changes = await rest.load_journey_stat_changes(since), await pg.load_journey_stat_changes(since)
+    assert sorted(normalize(rest_changes), key=by_journey) == sorted(normalize(pg_changes), key=by_journey)
+
+
+async def test_journey_reads(rest, pg):
+    for row in await rest.get_latest_border_stats(limit=3):
+        journey_id = row["journey_id"]
+        await assert_same_read(rest, pg, "get_journey", journey_id)
+        await assert_same_read(rest, pg, "get_journey_events", journey_id)
+
+
+# Writes
+async def journey_scenario(database, carrier_id, checkpoints, departure):
+    """Create (twice, same id), record events (twice), complete; returns what each step gave back."""
+    journey_id = str(uuid.uuid4())
+    results = {}
+
+    created = await database.create_journey(TEST_USER_ID, carrier_id, departure, journey_id=journey_id)
+    again = await database.create_journey(TEST_USER_ID, carrier_id, departure, journey_id=journey_id)
+    assert created["id"] == again["id"] == journey_id
+    results["active"] = await database.get_user_active_journey(TEST_USER_ID)
+    assert results["active"]["id"] == journey_id
+
+    events = [
+        {
+            "journey_id": journey_id,
+            "checkpoint_id": checkpoint["id"],
+            "timestamp_utc": (departure + timedelta(minutes=30 * (i + 1))).replace(tzinfo=None).isoformat(),
+            "source": "manual",
+            "user_timezone": "Europe/Minsk"
+        }
+        for i, checkpoint in enumerate(checkpoints[:2])
+    ]
+    results["inserted"] = await database.upsert_journey_events(events[:1])
+    # Retried batch: the stored event is skipped, not duplicated
+    results["retried"] = await database.upsert_journey_events(events)
+    results["events"] = await database.get_journey_events(journey_id)
+    assert len(results["events"]) == 2
+
+    results["completed"] = await database.complete_journey(journey_id)
+    results["journey"] = await database.get_journey(journey_id)
+    assert results["journey"]["completed"]
+    await database.cancel_journey(journey_id)  # keeps test journeys out of statistics
+    return results
+
+
+async def test_journey_writes(rest, pg, reference, test_journeys):
+    carrier_id, checkpoints = reference
+    departure = datetime.now(timezone.utc).replace(microsecond=0) - timedelta(hours=3)
+    rest_results = await journey_scenario(rest, carrier_id, checkpoints, departure)
+    pg_results = await journey_scenario(pg, carrier_id, checkpoints, departure)
+    for step in rest_results:
+        assert normalize(rest_results[step], VOLATILE_KEYS) == normalize(pg_results[step], VOLATILE_KEYS), step
+
+
+async def test_close_abandoned_journeys(rest, pg, reference, test_journeys):
+    carrier_id, _ = reference
+    pool = await pg.pool()
+    for database in (rest, pg):
+        journey_id = await pool.fetchval(
+            """
+            INSERT INTO journeys (user_id, carrier_id, departure_utc, created_at, completed)
+            VALUES ($1, $2, $3, $3, false)
+            RETURNING id::text
+            """,
+            TEST_USER_ID, uuid.UUID(carrier_id), LONG_AGO
+        )
+        assert await database.close_abandoned_journeys(LONG_AGO + timedelta(days=1)) == [journey_id]
+        # Nothing left to close: a second sweep is a no-op
+        assert await database.close_abandoned_journeys(LONG_AGO + timedelta(days=1)) == []
+        journey = await database.get_journey(journey_id)
+        assert journey["completed"] and journey["cancelled"]
@@ -0,0 +1,39 @@
+"""CheckpointSequences: sequences per border crossing and the crossings a journey can take."""
+import pytest
+
+from database.base import DEFAULT_BORDER
+from database.checkpoints import CheckpointSequences
+
+
+def checkpoint(name, order_index, border=DEFAULT_BORDER):
+    return {"id": f"{border}-{name}", "name": name, "order_index": order_index, "border": border}
+
+
+class FakeReference:
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def get_mandatory_checkpoints(self):
+        return self.rows
+
+
+async def test_single_crossing():
+    sequences = CheckpointSequences(FakeReference([checkpoint("b", 2), checkpoint("a", 1)]))
+
+    assert await sequences.borders() == [DEFAULT_BORDER]
+    assert [c.name for c in (await sequences.get()).checkpoints] == ["a", "b"]
+
+
+async def test_crossings_default_first():
+    rows = [checkpoint("x", 1, "lt-kamenny-log"), checkpoint("a", 1), checkpoint("y", 1, "brest")]
+    sequences = CheckpointSequences(FakeReference(rows))
+
+    assert await sequences.borders() == [DEFAULT_BORDER, "brest", "lt-kamenny-log"]
+    assert [c.id for c in (await sequences.get("brest")).checkpoints] == ["brest-y"]
+
+
+@pytest.mark.parametrize("rows", [[], [checkpoint("x", 1, "brest")]])
+async def test_no_default_crossing(rows):
+    sequences = CheckpointSequences(FakeReference(rows))
+
+    assert await sequences.borders() == [row["border"] for row in rows]
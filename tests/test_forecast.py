@@ -0,0 +1,154 @@
+"""BorderForecast: catch-up keyed on when journeys changed in the database, the window and the saved file."""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from analytics.forecast import BorderForecast
+
+NOW = datetime.now(timezone.utc).replace(microsecond=0)
+CARRIER = "carrier-1"
+
+
+def stat_row(journey_id, changed_at, end_utc=None, counted=True, duration_hours=2.0, direction="outbound"):
+    end_utc = end_utc or changed_at
+    return {
+        "journey_id": journey_id,
+        "carrier_id": CARRIER,
+        "departure_utc": (end_utc - timedelta(hours=duration_hours + 1)).replace(tzinfo=None).isoformat(),
+        "end_utc": end_utc.replace(tzinfo=None).isoformat(),
+        "duration_seconds": int(duration_hours * 3600),
+        "direction": direction,
+        "changed_at": changed_at.replace(tzinfo=None).isoformat(),
+        "counted": counted
+    }
+
+
+class FakeDatabase:
+    """journey_stat_changes: the latest row of every journey."""
+
+    def __init__(self):
+        self.rows = {}
+
+    def change(self, row):
+        self.rows[row["journey_id"]] = row
+
+    async def load_journey_stat_changes(self, since):
+        since = since.replace(tzinfo=None).isoformat()
+        return [row for row in self.rows.values() if row["changed_at"] >= since]
+
+
+@pytest.fixture
+def database():
+    return FakeDatabase()
+
+
+@pytest.fixture
+def path(tmp_path):
+    return tmp_path / "forecast.npz"
+
+
+async def restarted(database, path) -> BorderForecast:
+    forecast = BorderForecast(database, str(path), min_samples=1)
+    await forecast.start()
+    return forecast
+
+
+async def rebuilt(database, tmp_path) -> BorderForecast:
+    return await restarted(database, tmp_path / "rebuild.npz")
+
+
+async def test_catch_up_counts_journey_that_ended_before_the_watermark(database, path, tmp_path):
+    database.change(stat_row("a", NOW - timedelta(hours=5)))
+    forecast = await restarted(database, path)
+    assert forecast.journeys == 1
+
+    # Completed after the save, but the user reported an earlier crossing end
+    database.change(stat_row("b", NOW, end_utc=NOW - timedelta(hours=10)))
+    forecast = await restarted(database, path)
+
+    assert forecast.journeys == 2
+    np.testing.assert_array_equal(forecast._counts, (await rebuilt(database, tmp_path))._counts)
+
+
+async def test_catch_up_removes_journey_flagged_later(database, path, tmp_path):
+    for journey_id in "abc":
+        database.change(stat_row(journey_id, NOW - timedelta(hours=5)))
+    forecast = await restarted(database, path)
+    assert forecast.journeys == 3
+
+    database.change(stat_row("b", NOW, end_utc=NOW - timedelta(hours=5), counted=False))
+    forecast = await restarted(database, path)
+
+    assert forecast.journeys == 2
+    np.testing.assert_array_equal(forecast._counts, (await rebuilt(database, tmp_path))._counts)
+
+
+async def test_catch_up_replaces_changed_duration(database, path, tmp_path):
+    database.change(stat_row("a", NOW - timedelta(hours=5), duration_hours=2))
+    forecast = await restarted(database, path)
+
+    # A late event extended the crossing
+    database.change(stat_row("a", NOW, end_utc=NOW - timedelta(hours=4), duration_hours=3))
+    forecast = await restarted(database, path)
+
+    assert forecast.journeys == 1
+    np.testing.assert_array_equal(forecast._counts, (await rebuilt(database, tmp_path))._counts)
+
+
+async def test_recorded_journey_is_not_counted_twice(database, path):
+    forecast = await restarted(database, path)
+    row = stat_row("a", NOW)
+    forecast.record_journey("a", CARRIER, "outbound", datetime.fromisoformat(row["departure_utc"]), 2 * 3600)
+    await forecast.save()
+
+    database.change(row)
+    forecast = await restarted(database, path)
+
+    assert forecast.journeys == 1
+
+
+async def test_discard(database, path):
+    database.change(stat_row("a", NOW - timedelta(hours=5)))
+    database.change(stat_row("b", NOW - timedelta(hours=5), duration_hours=4))
+    forecast = await restarted(database, path)
+
+    forecast.discard("b")
+    forecast.discard("unknown")
+
+    assert forecast.journeys == 1
+    prediction = forecast.predict(CARRIER, "outbound", datetime.fromisoformat(database.rows["a"]["departure_utc"]))
+    assert prediction["samples"] == 1
+    assert prediction["p90_seconds"] <= 2.25 * 3600
+
+
+async def test_journeys_that_left_the_window_are_dropped(database, path, tmp_path):
+    database.change(stat_row("old", NOW - timedelta(days=20)))
+    database.change(stat_row("new", NOW - timedelta(hours=5)))
+    forecast = BorderForecast(database, str(path), window_days=30, min_samples=1)
+    await forecast.start()
+    assert forecast.journeys == 2
+
+    # Restarted with a shorter window: the catch-up reads nothing, the old journey ages out
+    forecast = BorderForecast(database, str(path), window_days=7, min_samples=1)
+    await forecast.start()
+
+    assert set(forecast._counted) == {"new"}
+    rebuilt_forecast = BorderForecast(database, str(tmp_path / "rebuild.npz"), window_days=7, min_samples=1)
+    await rebuilt_forecast.start()
+    np.testing.assert_array_equal(forecast._counts, rebuilt_forecast._counts)
+
+
+async def test_concurrent_saves_leave_one_file(database, path):
+    database.change(stat_row("a", NOW - timedelta(hours=5)))
+    forecast = await restarted(database, path)
+
+    for journey_id in "bcd":
+        forecast.record_journey(journey_id, CARRIER, "outbound", NOW - timedelta(hours=3), 2 * 3600)
+    snapshot = (forecast._counts.copy(), list(forecast._carrier_ids), dict(forecast._counted), forecast._watermark)
+    # As a scheduled save and the one on shutdown would
+    await asyncio.gather(*(asyncio.to_thread(forecast._write, *snapshot) for _ in range(5)))
+
+    assert [p.name for p in path.parent.iterdir()] == [path.name]
+    assert (await restarted(database, path)).journeys == 4
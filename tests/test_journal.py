@@ -0,0 +1,89 @@
+"""EventJournal delivery: rejected events do not block the others, an outage keeps everything pending."""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from database.journal import EventJournal
+from database.resilience import DatabaseUnavailableError
+
+BAD_CHECKPOINT = "deleted-checkpoint"
+DEPARTURE = datetime(2025, 6, 1, 8, 0, tzinfo=timezone.utc)
+
+
+class FakeDatabase:
+    """Stores events like the backends do; rejects BAD_CHECKPOINT like a foreign key would."""
+
+    def __init__(self):
+        self.events = {}
+        self.down = False
+
+    async def upsert_journey_events(self, events):
+        if self.down:
+            raise DatabaseUnavailableError("upsert_journey_events: connection refused")
+        if any(event["checkpoint_id"] == BAD_CHECKPOINT for event in events):
+            raise ValueError("violates foreign key constraint")
+        for event in events:
+            self.events.setdefault((event["journey_id"], event["checkpoint_id"]), event)
+        return events
+
+
+@pytest.fixture
+def database():
+    return FakeDatabase()
+
+
+@pytest.fixture
+def journal(database, tmp_path):
+    return EventJournal(database, str(tmp_path / "journal.sqlite3"), batch_size=3, max_attempts=3)
+
+
+async def record(journal, *checkpoint_ids, journey_id="journey-1"):
+    for i, checkpoint_id in enumerate(checkpoint_ids):
+        await journal.record_event(journey_id, checkpoint_id, DEPARTURE + timedelta(minutes=30 * i))
+
+
+async def test_flush_delivers_in_batches(journal, database):
+    await record(journal, "a", "b", "c", "d", "e")
+
+    assert await journal.flush() == 5
+    assert len(database.events) == 5
+    assert journal.pending_count() == 0
+
+
+async def test_rejected_event_does_not_block_later_ones(journal, database):
+    await record(journal, BAD_CHECKPOINT)
+    await record(journal, "a", "b", "c", "d", journey_id="journey-2")
+
+    assert await journal.flush() == 4
+    assert set(database.events) == {("journey-2", checkpoint_id) for checkpoint_id in "abcd"}
+    assert journal.pending_count() == 1
+    assert journal.dead_letter_count() == 0
+
+
+async def test_rejected_event_moves_to_dead_letter(journal, database):
+    await record(journal, BAD_CHECKPOINT, "a")
+
+    for _ in range(journal.max_attempts):
+        await journal.flush()
+
+    assert journal.pending_count() == 0
+    assert journal.dead_letter_count() == 1
+    assert list(database.events) == [("journey-1", "a")]
+    # Given up on: no longer shown as a pending event of the journey
+    assert journal._read_journey("journey-1") == []
+
+
+async def test_outage_keeps_events_pending_without_counting_attempts(journal, database):
+    await record(journal, BAD_CHECKPOINT, "a", "b")
+    database.down = True
+
+    for _ in range(journal.max_attempts + 1):
+        with pytest.raises(DatabaseUnavailableError):
+            await journal.flush()
+
+    assert journal.pending_count() == 3
+    assert journal.dead_letter_count() == 0
+
+    database.down = False
+    assert await journal.flush() == 2
+    assert journal.pending_count() == 1
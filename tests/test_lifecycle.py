@@ -0,0 +1,66 @@
+"""UpdatePoller.confirm: handled updates are never left to be delivered again."""
+import asyncio
+
+import pytest
+
+from lifecycle import UpdatePoller
+
+
+class FakeBot:
+    """Records the getUpdates calls confirm() makes."""
+
+    def __init__(self):
+        self.offsets = []
+
+    async def __call__(self, method, **kwargs):
+        self.offsets.append(method.offset)
+        return []
+
+
+async def handle(poller: UpdatePoller, batch, cut_off) -> None:
+    """Handle `batch` as the last fetched one; updates in `cut_off` outlive the drain deadline."""
+    poller._batch = list(batch)
+    poller._last_update_id = batch[-1]
+    for update_id in batch:
+        poller.in_flight.start(update_id, asyncio.sleep(60 if update_id in cut_off else 0))
+    await asyncio.sleep(0.01)
+    await poller.drain(0.01)
+
+
+@pytest.fixture
+def bot():
+    return FakeBot()
+
+
+@pytest.fixture
+def poller(bot):
+    return UpdatePoller(bot, dp=None)
+
+
+@pytest.mark.parametrize(
+    "batch, cut_off, offset",
+    [
+        ([10, 11, 12, 13], [], 14),
+        # Cut-off tail: delivered again
+        ([10, 11, 12, 13], [12, 13], 12),
+        # Cut off in the middle: 12 and 13 were handled, so 11 is lost rather than all three redelivered
+        ([10, 11, 12, 13], [11], 14),
+        ([10, 11, 12, 13], [11, 13], 13),
+    ]
+)
+async def test_confirm_offset(poller, bot, batch, cut_off, offset):
+    await handle(poller, batch, cut_off)
+
+    await poller.confirm()
+
+    assert bot.offsets == [offset]
+
+
+async def test_cut_off_from_an_earlier_batch_is_ignored(poller, bot):
+    # Fetched (and so acknowledged) before the last batch
+    poller.in_flight.cut_off.append(5)
+    await handle(poller, [10, 11], [])
+
+    await poller.confirm()
+
+    assert bot.offsets == [12]
@@ -0,0 +1,68 @@
+"""DataLoader journey batching: ids requested while a batch is in flight still resolve."""
+import asyncio
+
+import pytest
+
+from database.loader import DataLoader
+
+
+def journey_row(journey_id):
+    return {
+        "id": journey_id,
+        "user_id": 1,
+        "carrier_id": "carrier-1",
+        "departure_utc": "2025-06-01T08:00:00",
+        "created_at": "2025-06-01T08:00:00",
+        "completed": False,
+        "cancelled": False
+    }
+
+
+class SlowDatabase:
+    """Journey reads wait until `release` is set."""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.reads = []
+
+    async def get_journey(self, journey_id):
+        self.reads.append([journey_id])
+        await self.release.wait()
+        return journey_row(journey_id)
+
+    async def get_journeys(self, journey_ids):
+        self.reads.append(sorted(journey_ids))
+        await self.release.wait()
+        return [journey_row(journey_id) for journey_id in journey_ids]
+
+
+@pytest.fixture
+def database():
+    return SlowDatabase()
+
+
+@pytest.fixture
+def loader(database):
+    return DataLoader(database, journal=None)
+
+
+async def test_concurrent_requests_share_one_batch(loader, database):
+    database.release.set()
+
+    a, b, again = await asyncio.gather(loader.journey("a"), loader.journey("b"), loader.journey("a"))
+
+    assert (a.id, b.id, again.id) == ("a", "b", "a")
+    assert database.reads == [["a", "b"]]
+
+
+async def test_request_during_batch_in_flight_resolves(loader, database):
+    first = asyncio.create_task(loader.journey("a"))
+    await asyncio.sleep(0.01)  # the batch for "a" is waiting on the database
+    second = asyncio.create_task(loader.journey("b"))
+    await asyncio.sleep(0.01)
+    database.release.set()
+
+    a, b = await asyncio.wait_for(asyncio.gather(first, second), timeout=5)
+
+    assert (a.id, b.id) == ("a", "b")
+    assert database.reads == [["a"], ["b"]]
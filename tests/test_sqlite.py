@@ -0,0 +1,40 @@
+"""SQLiteDatabase statistics: journey_stats holds what every reader counts."""
+from datetime import datetime, timedelta
+
+import pytest
+
+from database.sqlite import SQLiteDatabase
+
+DEPARTURE = datetime(2025, 6, 1, 8, 0)
+
+
+@pytest.fixture
+async def database():
+    database = SQLiteDatabase()
+    yield database
+    await database.close()
+
+
+async def crossed(database, user_id) -> str:
+    """A journey with its first two checkpoints reported, not yet completed."""
+    carrier = (await database.get_carriers())[0]
+    checkpoints = await database.get_mandatory_checkpoints()
+    journey = await database.create_journey(user_id, carrier["id"], DEPARTURE)
+    for hours, checkpoint in enumerate(checkpoints[:2], start=1):
+        await database.create_journey_event(journey["id"], checkpoint["id"], DEPARTURE + timedelta(hours=hours))
+    return journey["id"]
+
+
+async def test_cancelled_journey_with_metrics_is_not_in_stats(database):
+    completed = await crossed(database, 1)
+    await database.complete_journey(completed)
+    cancelled = await crossed(database, 2)
+    await database.cancel_journey(cancelled)
+    # Cancelled journeys are completed, so the backfill computes their metrics too
+    assert await database.backfill_journey_metrics() == 1
+
+    latest = await database.get_latest_border_stats()
+    summary = await database.get_border_duration_summary(DEPARTURE - timedelta(days=1))
+
+    assert [row["journey_id"] for row in latest] == [completed]
+    assert summary["journeys"] == 1
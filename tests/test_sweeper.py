@@ -0,0 +1,61 @@
+"""AbandonedJourneySweeper: every worker's journal is delivered before journeys are closed."""
+from datetime import datetime, timezone
+
+import pytest
+
+from database.journal import EventJournal
+from database.resilience import DatabaseUnavailableError
+from database.sweeper import AbandonedJourneySweeper
+
+DEPARTURE = datetime(2025, 6, 1, 8, 0, tzinfo=timezone.utc)
+
+
+class FakeDatabase:
+    """Closes every journey without a delivered event."""
+
+    def __init__(self, journey_ids):
+        self.open = set(journey_ids)
+        self.active = set()
+        self.down = False
+
+    async def upsert_journey_events(self, events):
+        if self.down:
+            raise DatabaseUnavailableError("upsert_journey_events: connection refused")
+        self.active.update(event["journey_id"] for event in events)
+        return events
+
+    async def close_abandoned_journeys(self, before, batch_size=500):
+        closed = sorted(self.open - self.active)[:batch_size]
+        self.open.difference_update(closed)
+        return closed
+
+
+@pytest.fixture
+def database():
+    return FakeDatabase(["journey-0", "journey-1", "abandoned"])
+
+
+@pytest.fixture
+def journals(database, tmp_path):
+    """Journals of two workers: each recorded an event of its own journey."""
+    return [EventJournal(database, str(tmp_path / f"journal-{i}.sqlite3")) for i in range(2)]
+
+
+async def test_sweep_flushes_all_journals_first(database, journals):
+    for i, journal in enumerate(journals):
+        await journal.record_event(f"journey-{i}", "checkpoint", DEPARTURE)
+    sweeper = AbandonedJourneySweeper(database, journals)
+
+    assert await sweeper.sweep() == 1
+    assert database.open == {"journey-0", "journey-1"}
+    assert all(journal.pending_count() == 0 for journal in journals)
+
+
+async def test_sweep_skipped_while_journals_cannot_be_delivered(database, journals):
+    await journals[1].record_event("journey-1", "checkpoint", DEPARTURE)
+    database.down = True
+    sweeper = AbandonedJourneySweeper(database, journals)
+
+    with pytest.raises(DatabaseUnavailableError):
+        await sweeper.sweep()
+    assert len(database.open) == 3
@@ -0,0 +1,123 @@
+"""
+UserSequencingMiddleware: double taps of one user cannot race, different users do not wait for each other.
+
+Updates go through a real Dispatcher (which puts event_chat/event_from_user
+in the data the middleware keys on) to a handler that does what
+process_checkpoint_time does: read the checkpoint index from the FSM state,
+record an event after a database round trip, advance the index.
+"""
+import asyncio
+from datetime import datetime
+
+import pytest
+from aiogram import Bot, Dispatcher, Router
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import Chat, Message, Update, User
+
+from handlers.middlewares import UserSequencingMiddleware
+
+CHECKPOINTS = 3
+ROUND_TRIP = 0.01  # Seconds a database call takes in the handler
+
+
+@pytest.fixture
+async def bot():
+    bot = Bot("42:TEST")  # never calls the API: the handlers do not answer
+    yield bot
+    await bot.session.close()
+
+
+def create_dispatcher(handler, sequencing: bool = True) -> Dispatcher:
+    dp = Dispatcher(storage=MemoryStorage())
+    if sequencing:
+        dp.update.outer_middleware(UserSequencingMiddleware())
+    router = Router()
+    router.message.register(handler)
+    dp.include_router(router)
+    return dp
+
+
+def tap(update_id: int, user_id: int, text: str = "⏰ Сейчас") -> Update:
+    return Update(
+        update_id=update_id,
+        message=Message(
+            message_id=update_id,
+            date=datetime.now(),
+            chat=Chat(id=user_id, type="private"),
+            from_user=User(id=user_id, is_bot=False, first_name="Test"),
+            text=text
+        )
+    )
+
+
+def recording_handler(events: list):
+    """Checkpoint handler: records one event per checkpoint, ignores taps after the last one."""
+    async def handler(message: Message, state: FSMContext):
+        index = (await state.get_data()).get("current_checkpoint_index", 0)
+        if index >= CHECKPOINTS:
+            return
+        await asyncio.sleep(ROUND_TRIP)  # journal write / journey read
+        events.append((message.from_user.id, index))
+        await state.update_data(current_checkpoint_index=index + 1)
+    return handler
+
+
+async def double_taps(dp: Dispatcher, bot: Bot, user_ids, taps: int) -> None:
+    """Every user taps `taps` times at once; all updates are handled concurrently, as in polling."""
+    updates = [tap(i * len(user_ids) + n, user_id) for i in range(taps) for n, user_id in enumerate(user_ids)]
+    await asyncio.gather(*(dp.feed_update(bot, update) for update in updates))
+
+
+async def test_double_taps_record_one_event_per_checkpoint(bot):
+    events = []
+    dp = create_dispatcher(recording_handler(events))
+
+    await double_taps(dp, bot, [1], taps=2 * CHECKPOINTS)
+
+    assert events == [(1, index) for index in range(CHECKPOINTS)]
+    state = await dp.storage.get_data(StorageKey(bot_id=bot.id, chat_id=1, user_id=1))
+    assert state["current_checkpoint_index"] == CHECKPOINTS
+
+
+async def test_double_taps_race_without_middleware(bot):
+    # Control: the handler above does race when updates are not sequenced
+    events = []
+    dp = create_dispatcher(recording_handler(events), sequencing=False)
+
+    await double_taps(dp, bot, [1], taps=2)
+
+    assert events == [(1, 0), (1, 0)]
+
+
+async def test_users_are_sequenced_independently(bot):
+    events = []
+    dp = create_dispatcher(recording_handler(events))
+
+    await double_taps(dp, bot, [1, 2, 3], taps=2 * CHECKPOINTS)
+
+    for user_id in (1, 2, 3):
+        assert [index for user, index in events if user == user_id] == list(range(CHECKPOINTS))
+
+
+async def test_users_run_in_parallel(bot):
+    # Each handler waits until both users are inside one: serializing users would deadlock
+    inside = asyncio.Barrier(2)
+
+    async def handler(message: Message):
+        await inside.wait()
+
+    dp = create_dispatcher(handler)
+    await asyncio.wait_for(double_taps(dp, bot, [1, 2], taps=1), timeout=5)
+
+
+async def test_locks_are_released(bot):
+    middleware = UserSequencingMiddleware()
+    dp = Dispatcher(storage=MemoryStorage())
+    dp.update.outer_middleware(middleware)
+    dp.message.register(recording_handler([]))
+
+    await double_taps(dp, bot, [1, 2], taps=3)
+
+    assert middleware.active_users == 0
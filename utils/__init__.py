@@ -14,7 +14,7 @@ from .calendar import (
     get_next_month,
     get_prev_month
 )
-from .time_keyboard import create_time_keyboard
+from .time_keyboard import create_time_keyboard, DEPARTURE_TIMES
 from .keyboards import (
     create_main_menu_keyboard,
     create_cancel_confirmation_keyboard,
@@ -35,6 +35,7 @@ __all__ = [
     "get_next_month",
     "get_prev_month",
     "create_time_keyboard",
+    "DEPARTURE_TIMES",
     "create_main_menu_keyboard",
     "create_cancel_confirmation_keyboard",
     "create_timezone_keyboard",